@@ -1,8 +1,24 @@
 from django.contrib import admin
 
-from base.models import Settings
+from base.models import Email, Job, Settings
 
 
 @admin.register(Settings)
 class SettingsAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "run_at", "created_on")
+    list_filter = ("status", "name")
+    readonly_fields = ("created_on", "updated_on")
+
+
+@admin.register(Email)
+class EmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "to", "status", "attempts", "sent_on", "created_on")
+    list_filter = ("status",)
+    search_fields = ("subject", "key")
+    readonly_fields = ("created_on", "updated_on", "sent_on")
+    exclude = ("message",)
@@ -0,0 +1,189 @@
+"""
+Static and media files fetched by WeasyPrint, read once per process.
+
+`django_url_fetcher` reads stylesheets, fonts and company covers from disk (or
+over HTTP) on every render although they are the same for every ticket, so:
+    - assets are kept in memory keyed by their URL and the mtime of their file,
+      editing or collecting a file again fetches it again, remote assets are
+      keyed by their URL only
+    - the least recently used assets are dropped beyond `PDF_ASSETS_CACHE_SIZE`
+      bytes
+    - company images are resized once to what the tickets print
+    - the assets referenced by the PDF templates are loaded up front by
+      `preload`, see `base.rendering.warm_up`
+"""
+
+import logging
+import mimetypes
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import find
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template.loader import get_template
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES = (
+    "orders/ticket.html",
+    "orders/invoice.html",
+    "trips/trip_passengers_pdf.html",
+)
+
+# Twice the size covers are printed at on the tickets, sharp enough on paper
+IMAGE_SIZE = (400, 200)
+IMAGES_DIR = "companies/"
+
+STATIC_RE = re.compile(r"""{%\s*static\s+['"]([^'"]+)['"]\s*%}""")
+
+_cache = OrderedDict()
+_size = 0
+_lock = threading.Lock()
+
+
+@lru_cache
+def get_reversed_hashed_files() -> dict:
+    return {v: k for k, v in staticfiles_storage.hashed_files.items()}
+
+
+def get_path(url) -> Path | None:
+    """The file of a static or media `file:` URL, if any"""
+
+    if not url.startswith("file:"):
+        return None
+
+    path = urlparse(url).path
+
+    if path.startswith(settings.MEDIA_URL):
+        path = Path(settings.MEDIA_ROOT) / path.removeprefix(settings.MEDIA_URL)
+        return path if path.is_file() else None
+
+    if settings.STATIC_URL and path.startswith(settings.STATIC_URL):
+        path = path.removeprefix(settings.STATIC_URL)
+
+        if not settings.DEBUG and hasattr(staticfiles_storage, "hashed_files"):
+            path = get_reversed_hashed_files().get(path, path)
+
+        path = find(path)
+        return Path(path) if path else None
+
+    return None
+
+
+def resize(data) -> bytes:
+    """Shrink an image to `IMAGE_SIZE`, keeping its format and aspect ratio"""
+
+    image = Image.open(BytesIO(data))
+
+    if image.width <= IMAGE_SIZE[0] and image.height <= IMAGE_SIZE[1]:
+        return data
+
+    image_format = image.format
+    image.thumbnail(IMAGE_SIZE)
+
+    out = BytesIO()
+    image.save(out, format=image_format)
+
+    return out.getvalue()
+
+
+def read(url, path, *args, **kwargs) -> bytes:
+    if path is None:
+        # Remote assets (e.g. a CDN), WeasyPrint is only imported to fetch them
+        from django_weasyprint.utils import django_url_fetcher
+
+        result = django_url_fetcher(url, *args, **kwargs)
+
+        if "file_obj" in result:
+            with result["file_obj"] as f:
+                return f.read()
+
+        return result["string"]
+
+    data = path.read_bytes()
+
+    media = Path(settings.MEDIA_ROOT) / IMAGES_DIR
+    if path.is_relative_to(media) and mimetypes.guess_type(path)[0] != "image/svg+xml":
+        data = resize(data)
+
+    return data
+
+
+def store(key, data) -> None:
+    global _size
+
+    with _lock:
+        if key in _cache:
+            return
+
+        _cache[key] = data
+        _size += len(data)
+
+        while _size > settings.PDF_ASSETS_CACHE_SIZE and len(_cache) > 1:
+            _, dropped = _cache.popitem(last=False)
+            _size -= len(dropped)
+
+
+def clear() -> None:
+    global _size
+
+    with _lock:
+        _cache.clear()
+        _size = 0
+
+
+def fetch(url, *args, **kwargs) -> dict:
+    """A WeasyPrint url fetcher serving assets from memory"""
+
+    path = get_path(url)
+    key = (url, path.stat().st_mtime_ns if path else None)
+
+    with _lock:
+        data = _cache.get(key)
+        if data is not None:
+            _cache.move_to_end(key)
+
+    if data is None:
+        data = read(url, path, *args, **kwargs)
+        store(key, data)
+
+    mime_type, encoding = mimetypes.guess_type(url)
+
+    return {
+        "string": data,
+        "mime_type": mime_type,
+        "encoding": encoding,
+        "filename": Path(urlparse(url).path).name,
+        "redirected_url": f"file://{path}" if path else url,
+    }
+
+
+def preload() -> int:
+    """Load the static files the PDF templates reference"""
+
+    loaded = 0
+
+    for template_name in TEMPLATES:
+        source = get_template(template_name).template.source
+
+        for name in STATIC_RE.findall(source):
+            url = f"file://{settings.STATIC_URL}{name}"
+
+            if get_path(url) is None:
+                logger.warning("asset %s not found(🖼️)" % name)
+                continue
+
+            fetch(url)
+            loaded += 1
+
+    logger.info("preloaded %s pdf assets(🖼️)" % loaded)
+
+    return loaded
@@ -0,0 +1,108 @@
+import time
+from multiprocessing import get_context
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class WorkerCommand(BaseCommand):
+    """
+    Base of the commands taking batches of queued rows (see `base.models.Queued`)
+    with a manager method, either once or in a loop and from one or several
+    forked processes.
+
+    Subclasses name the rows in `items`, report each batch with `output` and
+    return the manager method from `get_work`.
+    """
+
+    items = "rows"
+    output = "Rows:%s"
+    batch_size = 10
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=int,
+            default=self.batch_size,
+            help="Number of %s taken at once by a worker. Defaults to %s."
+            % (self.items, self.batch_size),
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes taking %s at once. Defaults to 1." % self.items,
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and take %s as they are queued." % self.items,
+        )
+        parser.add_argument(
+            "-i",
+            "--interval",
+            type=float,
+            default=1,
+            help="Seconds to sleep when there are no %s with --loop. Defaults to 1."
+            % self.items,
+        )
+
+    def get_work(self):
+        """The manager method called with `batch_size`, returning the rows taken"""
+        raise NotImplementedError
+
+    def idle(self) -> None:
+        """Called before sleeping with `--loop`"""
+
+    def close(self) -> None:
+        """Called once a worker is done"""
+
+    def work(self, batch_size, loop, interval):
+        work = self.get_work()
+        total = 0
+
+        try:
+            while True:
+                start = timer()
+                taken = work(batch_size=batch_size)
+                end = timer()
+
+                total += taken
+
+                if taken:
+                    self.stdout.write(self.output % taken)
+                    self.stdout.write("took:%0.2f seconds." % (end - start))
+                elif loop:
+                    self.idle()
+                    time.sleep(interval)
+                else:
+                    break
+        finally:
+            self.close()
+
+        return total
+
+    def handle(self, *args, **kwargs):
+        args = (kwargs["batch_size"], kwargs["loop"], kwargs["interval"])
+        workers = kwargs["workers"]
+
+        if workers > 1:
+            # Forked workers must open their own DB connections
+            connections.close_all()
+
+            context = get_context("fork")
+            processes = [
+                context.Process(target=self.work, args=args) for _ in range(workers)
+            ]
+
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+        else:
+            self.work(*args)
+
+        self.stdout.write("All done!")
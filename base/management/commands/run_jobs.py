@@ -0,0 +1,21 @@
+from base.commands import WorkerCommand
+from base.models import Job
+
+
+class Command(WorkerCommand):
+    """
+    Run the queued jobs, e.g. confirming orders and emailing their tickets.
+
+    Keep it running with `--loop` (systemd, supervisor...). Several processes or
+    instances can run at once as jobs taken by one worker are skipped by the
+    others, and jobs left running by a dead worker are taken again once their
+    `JOBS_TIMEOUT` is over.
+    """
+
+    help = "Runs the queued jobs"
+
+    items = "jobs"
+    output = "Jobs run:%s"
+
+    def get_work(self):
+        return Job.objects.work
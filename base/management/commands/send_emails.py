@@ -0,0 +1,33 @@
+from functools import partial
+
+from django.core import mail
+
+from base.commands import WorkerCommand
+from base.models import Email
+
+
+class Command(WorkerCommand):
+    """
+    Send the emails in the outbox, e.g. tickets of confirmed orders.
+
+    Each worker sends its batches over a single SMTP connection kept open while
+    there are emails to send. Failed emails are retried with a backoff, so an
+    SMTP outage only delays them. Keep it running with `--loop` like `run_jobs`.
+    """
+
+    help = "Sends the queued emails"
+
+    items = "emails"
+    output = "Emails sent:%s"
+    batch_size = 20
+
+    def get_work(self):
+        self.connection = mail.get_connection()
+        return partial(Email.objects.send, connection=self.connection)
+
+    def idle(self) -> None:
+        # Don't hold the SMTP connection while idle
+        self.connection.close()
+
+    def close(self) -> None:
+        self.connection.close()
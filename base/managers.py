@@ -0,0 +1,159 @@
+import logging
+import traceback
+from contextlib import suppress
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Now
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedManager(models.Manager):
+    def ready(self):
+        """Rows due to run, including those whose worker went away mid run"""
+
+        pending = Q(status=self.model.PENDING, run_at__lte=Now())
+        abandoned = Q(status=self.model.RUNNING, locked_until__lte=Now())
+
+        return self.filter(pending | abandoned)
+
+    def claim(self, batch_size=10, timeout=None, pks=None) -> list:
+        """
+        Take a batch of ready rows (among `pks` if given) for a worker without
+        waiting on other workers (SKIP LOCKED). Rows are hidden from the others
+        for `timeout` seconds and are taken again if not finished by then.
+        """
+
+        timeout = timeout or settings.JOBS_TIMEOUT
+        locked_until = timezone.now() + timedelta(seconds=timeout)
+
+        qs = self.ready()
+        if pks is not None:
+            qs = qs.filter(pk__in=pks)
+
+        with transaction.atomic():
+            qs = qs.select_for_update(skip_locked=True)
+            rows = list(qs.order_by("run_at")[:batch_size])
+
+            if rows:
+                self.filter(pk__in=[row.pk for row in rows]).update(
+                    status=self.model.RUNNING,
+                    attempts=F("attempts") + 1,
+                    locked_until=locked_until,
+                    updated_on=Now(),
+                )
+
+        # Together they tell this claim (lease) from later ones, see `has_lease`
+        for row in rows:
+            row.status = self.model.RUNNING
+            row.attempts += 1
+            row.locked_until = locked_until
+
+        return rows
+
+    def prune(self, days=30) -> int:
+        """Delete the rows done more than some days ago"""
+
+        done = self.filter(status=self.model.DONE)
+        deleted, _ = done.filter(updated_on__lte=Now() - timedelta(days=days)).delete()
+
+        return deleted
+
+
+class JobManager(QueuedManager):
+    def enqueue(self, name, run_at=None, **payload):
+        """
+        Queue a call to the function at the dotted path `name` with `payload` as
+        keyword arguments. Jobs queued inside a transaction only become visible to
+        the workers once it commits.
+        """
+
+        job = self.create(name=name, payload=payload, run_at=run_at or timezone.now())
+        logger.info("queued job(📥):%s..." % job)
+
+        return job
+
+    def work(self, batch_size=10, timeout=None) -> int:
+        """Run a batch of ready jobs and return how many were run"""
+
+        jobs = self.claim(batch_size=batch_size, timeout=timeout)
+
+        for job in jobs:
+            job.run()
+
+        return len(jobs)
+
+
+class EmailManager(QueuedManager):
+    def queue(self, message, key=None):
+        """
+        Put an `EmailMessage` in the outbox. Emails queued inside a transaction
+        are only sent once it commits, and only once per `key`.
+        """
+
+        email = self.model.from_message(message, key=key)
+
+        if key is None:
+            email.save()
+        else:
+            fields = ("subject", "from_email", "to", "message")
+            defaults = {name: getattr(email, name) for name in fields}
+
+            email, created = self.get_or_create(key=key, defaults=defaults)
+            if not created:
+                logger.info("email already queued(📭):%s..." % key)
+                return email
+
+        logger.info("queued email(📥):%s..." % email)
+
+        return email
+
+    def deliver(self, emails, connection=None) -> int:
+        """
+        Send some emails over a single connection and return how many were sent.
+        Failed emails are retried later. A given `connection` is left open for the
+        next ones, e.g. by the `send_emails` workers.
+        """
+
+        own_connection = connection is None
+        connection = connection or mail.get_connection()
+
+        sent = 0
+
+        for email in emails:
+            try:
+                # Does nothing while the connection is open
+                connection.open()
+                connection.send_messages([email.to_message()])
+            except Exception as e:
+                logger.exception("email failed(💥):%s %s..." % (email, e))
+                email.retry(traceback.format_exc())
+
+                # The server may have dropped us, the next email opens a new one
+                with suppress(Exception):
+                    connection.close()
+            else:
+                email.sent()
+                sent += 1
+
+        if own_connection:
+            connection.close()
+
+        logger.info("sent %s of %s emails(📧)..." % (sent, len(emails)))
+
+        return sent
+
+    def send(self, batch_size=10, timeout=None, connection=None, pks=None) -> int:
+        """Send a batch of ready emails and return how many were taken"""
+
+        emails = self.claim(batch_size=batch_size, timeout=timeout, pks=pks)
+
+        if emails:
+            self.deliver(emails, connection=connection)
+
+        return len(emails)
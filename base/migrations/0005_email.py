@@ -0,0 +1,68 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("base", "0004_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Email",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("run_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("locked_until", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True)),
+                ("created_on", models.DateTimeField(auto_now_add=True)),
+                ("updated_on", models.DateTimeField(auto_now=True)),
+                (
+                    "key",
+                    models.CharField(
+                        blank=True, max_length=200, null=True, unique=True
+                    ),
+                ),
+                ("subject", models.CharField(max_length=300)),
+                ("from_email", models.CharField(max_length=300)),
+                ("to", models.JSONField(default=list)),
+                ("message", models.JSONField(default=dict)),
+                ("sent_on", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "email",
+                "verbose_name_plural": "emails",
+                "ordering": ["-created_on"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_at"], name="base_email_status_c5e4b7_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,7 +1,19 @@
+import base64
+import logging
+import traceback
+from datetime import timedelta
+
+from django.core.mail import EmailMultiAlternatives
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _
 
+from base.managers import EmailManager, JobManager
+
+logger = logging.getLogger(__name__)
+
 
 class Settings(models.Model):
     """
@@ -30,3 +42,218 @@ class Settings(models.Model):
 
     def __str__(self):
         return f"{self.name}"
+
+
+class Queued(models.Model):
+    """
+    Work taken by background workers (see `base.managers.QueuedManager`). Failed
+    attempts are retried with an exponential backoff until MAX_ATTEMPTS.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (PENDING, _("Pending")),
+        (RUNNING, _("Running")),
+        (DONE, _("Done")),
+        (FAILED, _("Failed")),
+    ]
+
+    MAX_ATTEMPTS = 5
+
+    # Seconds before the first retry, doubled on every attempt
+    RETRY_DELAY = 30
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+
+    created_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def has_lease(self) -> bool:
+        """
+        Whether the claim of this row is still the current one, i.e. it wasn't
+        taken again by another worker once `locked_until` was over. Locks the row
+        so that it can't be until the transaction ends.
+        """
+
+        row = (
+            type(self)
+            .objects.select_for_update()
+            .filter(pk=self.pk)
+            .values("status", "attempts", "locked_until")
+            .first()
+        )
+
+        return row == {
+            "status": self.RUNNING,
+            "attempts": self.attempts,
+            "locked_until": self.locked_until,
+        }
+
+    def get_retry_delay(self) -> timedelta:
+        return timedelta(seconds=self.RETRY_DELAY * 2 ** (self.attempts - 1))
+
+    def retry(self, error) -> None:
+        """Record a failed attempt, trying again later unless it was the last one"""
+
+        self.last_error = error
+        self.locked_until = None
+
+        if self.attempts < self.MAX_ATTEMPTS:
+            self.status = self.PENDING
+            self.run_at = timezone.now() + self.get_retry_delay()
+        else:
+            self.status = self.FAILED
+
+        self.save(
+            update_fields=[
+                "status",
+                "run_at",
+                "locked_until",
+                "last_error",
+                "updated_on",
+            ]
+        )
+
+
+class Job(Queued):
+    """
+    A call to a function run later by the `run_jobs` workers, e.g. confirming an
+    order once its payment arrives.
+    """
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    objects = JobManager()
+
+    class Meta:
+        ordering = ["-created_on"]
+        verbose_name = _("job")
+        verbose_name_plural = _("jobs")
+        indexes = [
+            models.Index(fields=["status", "run_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
+
+    def run(self):
+        """
+        Call the function of a claimed job. Whatever it writes to the DB is only
+        committed along with the job being done. Jobs taken again by another
+        worker in the meantime are left to it.
+        """
+
+        logger.info("running job(⚙️):%s attempt:%s..." % (self, self.attempts))
+
+        try:
+            with transaction.atomic():
+                if not self.has_lease():
+                    logger.warning("job taken by another worker(⏰):%s..." % self)
+                    return False
+
+                import_string(self.name)(**self.payload)
+
+                self.status = self.DONE
+                self.locked_until = None
+                self.save(update_fields=["status", "locked_until", "updated_on"])
+
+        except Exception as e:
+            logger.exception("job failed(💥):%s %s..." % (self, e))
+            self.retry(traceback.format_exc())
+
+        return self.status == self.DONE
+
+
+class Email(Queued):
+    """
+    An email in the outbox, sent by the `send_emails` workers. Emails are queued
+    in the same transaction as whatever they tell about so they are only sent if
+    it commits, and a `key` keeps the same email from being queued twice.
+    """
+
+    key = models.CharField(max_length=200, unique=True, blank=True, null=True)
+    subject = models.CharField(max_length=300)
+    from_email = models.CharField(max_length=300)
+    to = models.JSONField(default=list)
+    # Everything else needed to build the message again, see `to_message`
+    message = models.JSONField(default=dict)
+    sent_on = models.DateTimeField(blank=True, null=True)
+
+    objects = EmailManager()
+
+    class Meta:
+        ordering = ["-created_on"]
+        verbose_name = _("email")
+        verbose_name_plural = _("emails")
+        indexes = [
+            models.Index(fields=["status", "run_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} #{self.pk}"
+
+    @classmethod
+    def from_message(cls, message, key=None) -> "Email":
+        """An unsaved email for an `EmailMessage`, attachments included"""
+
+        attachments = []
+
+        for filename, content, mimetype in message.attachments:
+            binary = isinstance(content, bytes)
+            content = base64.b64encode(content).decode() if binary else content
+            attachments.append([filename, content, mimetype, binary])
+
+        return cls(
+            key=key,
+            subject=message.subject,
+            from_email=message.from_email,
+            to=message.to,
+            message={
+                "body": message.body,
+                "cc": message.cc,
+                "bcc": message.bcc,
+                "reply_to": message.reply_to,
+                "headers": message.extra_headers,
+                "alternatives": getattr(message, "alternatives", []),
+                "attachments": attachments,
+            },
+        )
+
+    def to_message(self) -> EmailMultiAlternatives:
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.message["body"],
+            from_email=self.from_email,
+            to=self.to,
+            cc=self.message["cc"],
+            bcc=self.message["bcc"],
+            reply_to=self.message["reply_to"],
+            headers=self.message["headers"],
+        )
+
+        for content, mimetype in self.message["alternatives"]:
+            message.attach_alternative(content, mimetype)
+
+        for filename, content, mimetype, binary in self.message["attachments"]:
+            content = base64.b64decode(content) if binary else content
+            message.attach(filename=filename, content=content, mimetype=mimetype)
+
+        return message
+
+    def sent(self) -> None:
+        self.status = self.DONE
+        self.locked_until = None
+        self.sent_on = timezone.now()
+        self.save(update_fields=["status", "locked_until", "sent_on", "updated_on"])
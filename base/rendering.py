@@ -0,0 +1,136 @@
+"""
+Pool of warm WeasyPrint processes rendering PDFs out of the request workers.
+
+WeasyPrint is single threaded and slow to start (fonts, default stylesheets...)
+so `PDF_WORKERS` processes are started once per worker, warmed up with a tiny
+document and then render whatever they are sent, several PDFs at once:
+    - templates are rendered to HTML by the caller as they may hit the DB, only
+      the HTML goes to the pool
+    - at most `PDF_QUEUE_SIZE` PDFs wait for the pool, callers wait beyond that
+    - every PDF logs how long it waited and how long it took
+
+Without `PDF_WORKERS` (tests, dev) PDFs are rendered in process.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from base import assets
+
+logger = logging.getLogger(__name__)
+
+# Static and media files are read from disk and kept in memory, see `base.assets`
+BASE_URL = "file://"
+
+_pool = None
+_slots = None
+_lock = threading.Lock()
+
+
+def warm_up():
+    """Load WeasyPrint along with fonts and stylesheets once per pool process"""
+
+    from weasyprint import HTML
+
+    assets.preload()
+
+    HTML(string="<p>Warming up</p>").write_pdf()
+
+
+def write_pdf(html, queued) -> tuple[bytes, float, float]:
+    """The PDF of some HTML along with the seconds it waited and took"""
+
+    # WeasyPrint (and the libraries it loads) is only imported to actually render
+    from weasyprint import HTML
+
+    start = time.time()
+
+    pdf = HTML(string=html, url_fetcher=assets.fetch, base_url=BASE_URL)
+    pdf = pdf.write_pdf()
+
+    return pdf, start - queued, time.time() - start
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool, _slots
+
+    with _lock:
+        if _pool is None:
+            logger.info("starting %s pdf workers(🖨️)..." % settings.PDF_WORKERS)
+
+            # Workers never touch the DB, they only get HTML
+            _pool = ProcessPoolExecutor(
+                settings.PDF_WORKERS,
+                mp_context=get_context("fork"),
+                initializer=warm_up,
+            )
+            _slots = threading.BoundedSemaphore(settings.PDF_QUEUE_SIZE)
+
+    return _pool
+
+
+def shutdown():
+    """Stop the pool, it's started again when needed"""
+
+    global _pool
+
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def submit(html):
+    pool = get_pool()
+
+    if not _slots.acquire(timeout=settings.PDF_RENDER_TIMEOUT):
+        raise TimeoutError("Too many PDFs waiting to be rendered")
+
+    try:
+        future = pool.submit(write_pdf, html, time.time())
+    except BrokenProcessPool:
+        _slots.release()
+        shutdown()
+        raise
+
+    future.add_done_callback(lambda future: _slots.release())
+
+    return future
+
+
+def render_pdfs(jobs, request=None) -> list[bytes]:
+    """
+    Render `(template name, context)` jobs to PDFs, all at once when there's a
+    pool. The PDFs are returned in the order of the jobs.
+    """
+
+    jobs = [
+        (template_name, render_to_string(template_name, context, request=request))
+        for template_name, context in jobs
+    ]
+
+    if settings.PDF_WORKERS:
+        futures = [submit(html) for _, html in jobs]
+        results = [future.result(settings.PDF_RENDER_TIMEOUT) for future in futures]
+    else:
+        results = [write_pdf(html, time.time()) for _, html in jobs]
+
+    for (template_name, _), (_, waited, took) in zip(jobs, results):
+        logger.info(
+            "rendered %s(🖨️) waited: %0.2f took: %0.2f seconds!"
+            % (template_name, waited, took)
+        )
+
+    return [pdf for pdf, _, _ in results]
+
+
+def render_pdf(template_name, context, request=None) -> bytes:
+    """Renders a django template to a pdf file"""
+    return render_pdfs([(template_name, context)], request=request)[0]
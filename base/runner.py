@@ -0,0 +1,32 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the tests with uploads and rendered PDFs (see `orders.pdfs`) written to
+    a temporary directory deleted afterwards instead of the working tree.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+
+        self.files_dir = tempfile.mkdtemp(prefix="tests-")
+
+        storages = {**settings.STORAGES, "pdfs": {**settings.STORAGES["pdfs"]}}
+        storages["pdfs"]["OPTIONS"] = {"location": f"{self.files_dir}/pdfs"}
+
+        self.files_override = override_settings(
+            MEDIA_ROOT=f"{self.files_dir}/media", STORAGES=storages
+        )
+        self.files_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.files_override.disable()
+        shutil.rmtree(self.files_dir, ignore_errors=True)
+
+        super().teardown_test_environment(**kwargs)
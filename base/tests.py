@@ -1 +1,268 @@
-# Create your tests here.
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from PIL import Image
+
+from base import assets, rendering
+from base.models import Email, Job
+
+calls = []
+
+
+def record(**kwargs):
+    calls.append(kwargs)
+
+
+def explode(**kwargs):
+    raise ValueError("boom")
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_ready_jobs_are_run_once(self):
+        job = Job.objects.enqueue("base.tests.record", order_id="1")
+        Job.objects.enqueue("base.tests.record", run_at=timezone.now() + timedelta(1))
+
+        self.assertEqual(Job.objects.work(), 1)
+        self.assertEqual(Job.objects.work(), 0)
+
+        self.assertEqual(calls, [{"order_id": "1"}])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+
+    def test_failed_jobs_are_retried_with_backoff_until_max_attempts(self):
+        job = Job.objects.enqueue("base.tests.explode")
+
+        Job.objects.work()
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertIn("boom", job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=20))
+
+        # Not due yet
+        self.assertEqual(Job.objects.work(), 0)
+
+        Job.objects.filter(pk=job.pk).update(attempts=Job.MAX_ATTEMPTS - 1)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+        Job.objects.work()
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, Job.MAX_ATTEMPTS)
+
+    def test_claimed_jobs_are_hidden_until_their_timeout(self):
+        job = Job.objects.enqueue("base.tests.record")
+
+        self.assertEqual(Job.objects.claim(), [job])
+        self.assertEqual(Job.objects.claim(), [])
+
+        # The worker died while running it
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now())
+
+        self.assertEqual(Job.objects.work(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 2)
+
+    def test_jobs_taken_by_another_worker_are_left_to_it(self):
+        Job.objects.enqueue("base.tests.record")
+        [job] = Job.objects.claim()
+
+        # Our lease ran out and another worker took the job
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now())
+        Job.objects.claim()
+
+        self.assertFalse(job.run())
+        self.assertEqual(calls, [])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.attempts, 2)
+
+    def test_run_jobs_command(self):
+        Job.objects.enqueue("base.tests.record")
+        Job.objects.enqueue("base.tests.record")
+
+        out = StringIO()
+        call_command("run_jobs", stdout=out)
+
+        self.assertIn("Jobs run:2", out.getvalue())
+        self.assertEqual(len(calls), 2)
+
+
+class EmailTests(TestCase):
+    def get_message(self, subject="Tickets"):
+        message = EmailMultiAlternatives(
+            subject=subject, body="Hi", to=["user@example.com"], cc=["cc@example.com"]
+        )
+        message.attach_alternative("<p>Hi</p>", "text/html")
+        message.attach("Ticket.pdf", b"%PDF-1.7", "application/pdf")
+
+        return message
+
+    def test_emails_are_sent_as_queued(self):
+        Email.objects.queue(self.get_message())
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Email.objects.send(), 1)
+
+        message = mail.outbox[0]
+        self.assertEqual(message.subject, "Tickets")
+        self.assertEqual(message.cc, ["cc@example.com"])
+        self.assertEqual(message.alternatives, [("<p>Hi</p>", "text/html")])
+        self.assertEqual(
+            message.attachments, [("Ticket.pdf", b"%PDF-1.7", "application/pdf")]
+        )
+
+        email = Email.objects.get()
+        self.assertEqual(email.status, Email.DONE)
+        self.assertIsNotNone(email.sent_on)
+
+    def test_emails_are_queued_once_per_key(self):
+        Email.objects.queue(self.get_message(), key="order:1")
+        Email.objects.queue(self.get_message(), key="order:1")
+
+        self.assertEqual(Email.objects.count(), 1)
+
+    def test_batches_are_sent_over_one_connection(self):
+        for subject in ("First", "Second", "Third"):
+            Email.objects.queue(self.get_message(subject))
+
+        with mock.patch.object(
+            mail.get_connection().__class__, "open", autospec=True
+        ) as open_connection:
+            connection = mail.get_connection()
+            self.assertEqual(Email.objects.send(connection=connection), 3)
+
+        self.assertEqual(open_connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_emails_are_retried_later(self):
+        email = Email.objects.queue(self.get_message())
+
+        connection = mail.get_connection()
+        with mock.patch.object(connection, "send_messages", side_effect=OSError):
+            Email.objects.send(connection=connection)
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, Email.PENDING)
+        self.assertIn("OSError", email.last_error)
+        self.assertGreater(email.run_at, timezone.now())
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_send_emails_command(self):
+        Email.objects.queue(self.get_message())
+
+        out = StringIO()
+        call_command("send_emails", stdout=out)
+
+        self.assertIn("Emails sent:1", out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(PDF_WORKERS=2, PDF_QUEUE_SIZE=2)
+class RenderingTests(SimpleTestCase):
+    def tearDown(self):
+        rendering.shutdown()
+
+    def test_pdfs_are_rendered_by_the_pool_in_order(self):
+        jobs = [("some.html", {}) for _ in range(3)]
+
+        with mock.patch("base.rendering.render_to_string", side_effect=["a", "b", "c"]):
+            pdfs = rendering.render_pdfs(jobs)
+
+        self.assertEqual(len(pdfs), 3)
+        for pdf in pdfs:
+            self.assertTrue(pdf.startswith(b"%PDF"))
+
+    @override_settings(PDF_WORKERS=0)
+    def test_pdfs_are_rendered_in_process_without_workers(self):
+        with mock.patch("base.rendering.render_to_string", return_value="<p>Hi</p>"):
+            self.assertTrue(rendering.render_pdf("some.html", {}).startswith(b"%PDF"))
+
+        self.assertIsNone(rendering._pool)
+
+
+class AssetTests(SimpleTestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        assets.clear()
+        self.addCleanup(assets.clear)
+
+    def write(self, name, data) -> str:
+        path = Path(self.media) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+        return f"file:///media/{name}"
+
+    def test_assets_are_read_once_until_their_file_changes(self):
+        url = self.write("style.css", b"p { color: red }")
+
+        self.assertEqual(assets.fetch(url)["string"], b"p { color: red }")
+
+        with mock.patch.object(Path, "read_bytes") as read_bytes:
+            self.assertEqual(assets.fetch(url)["string"], b"p { color: red }")
+            read_bytes.assert_not_called()
+
+        self.write("style.css", b"p { color: blue }")
+        path = Path(self.media) / "style.css"
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+
+        self.assertEqual(assets.fetch(url)["string"], b"p { color: blue }")
+
+    def test_static_files_are_found(self):
+        result = assets.fetch("file:///static/assets/css/invoice.css")
+
+        self.assertEqual(result["mime_type"], "text/css")
+        self.assertTrue(result["redirected_url"].endswith("assets/css/invoice.css"))
+
+    @override_settings(PDF_ASSETS_CACHE_SIZE=10)
+    def test_least_recently_used_assets_are_dropped(self):
+        first = self.write("first.css", b"123456")
+        second = self.write("second.css", b"123456")
+
+        assets.fetch(first)
+        assets.fetch(second)
+
+        self.assertEqual([url for url, _ in assets._cache], [second])
+
+    def test_company_images_are_resized_once(self):
+        image = BytesIO()
+        Image.new("RGB", (1600, 800)).save(image, format="PNG")
+        url = self.write("companies/bus/covers/cover.png", image.getvalue())
+
+        with mock.patch("base.assets.resize", wraps=assets.resize) as resize:
+            assets.fetch(url)
+            data = assets.fetch(url)["string"]
+
+        self.assertEqual(resize.call_count, 1)
+        self.assertEqual(Image.open(BytesIO(data)).size, assets.IMAGE_SIZE)
+
+    def test_preload_loads_the_static_files_of_the_pdf_templates(self):
+        self.assertGreater(assets.preload(), 0)
+        self.assertTrue(assets._cache)
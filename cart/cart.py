@@ -1,10 +1,11 @@
 import logging
 from decimal import Decimal
+from functools import cached_property
 
 from django.conf import settings
 
 from coupons.models import Coupon
-from trips.models import Trip
+from trips.models import Location, Seat, Trip
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,17 @@ class CartException(Exception):
 
 
 class Cart:
+    """
+    The trips a user is about to book, kept in the session.
+
+    Everything derived from the session (trips, fares, coupon and totals) is
+    loaded once and memoized until the cart changes. Use `Cart.for_request` to
+    share a single cart by everything rendering a request.
+    """
+
+    # Memoized attributes dropped whenever the cart changes
+    MEMOIZED = ("coupon", "items", "total_price", "discount")
+
     def __init__(self, request):
         """
         Initialize a cart.
@@ -25,29 +37,82 @@ class Cart:
         self.cart = self.session.setdefault(settings.CART_SESSION_ID, {})
         self.coupon_id = self.session.get("coupon_id")
 
-    @property
+    @classmethod
+    def for_request(cls, request) -> "Cart":
+        """The cart of a request, built once per request"""
+
+        if getattr(request, "_cart", None) is None:
+            request._cart = cls(request)
+
+        return request._cart
+
+    def reset(self):
+        """Forget everything memoized from the session"""
+
+        for name in self.MEMOIZED:
+            self.__dict__.pop(name, None)
+
+    @cached_property
     def coupon(self):
         return Coupon.objects.filter(id=self.coupon_id).first()
 
-    def get_discount(self):
-        """Calculate the discount applied on the total cart by a valid coupon (if any)"""
+    @cached_property
+    def items(self) -> list[dict]:
+        """
+        The items of the cart along with their trips, all loaded in one query.
+        Items are copies so the session only ever holds JSON friendly values.
+        """
+
+        trips = Trip.objects.filter(id__in=self.cart.keys()).select_related(
+            "route", "origin", "destination", "company"
+        )
+        trips = {str(trip.id): trip for trip in trips}
+
+        items = []
 
-        if not self.coupon:
+        for trip_id, item in self.cart.items():
+            item = {**item, "price": Decimal(item["price"])}
+            item["total_price"] = item["price"] * item["quantity"]
+
+            if trip_id in trips:
+                # Show the fare the passenger is going to pay without looking it up
+                item["trip"] = trips[trip_id]
+                item["trip"].set_fare(
+                    item["origin"], item["destination"], item["price"]
+                )
+
+            items.append(item)
+
+        return items
+
+    @cached_property
+    def total_price(self) -> Decimal:
+        return sum(
+            (Decimal(item["price"]) * item["quantity"] for item in self.cart.values()),
+            Decimal(0),
+        )
+
+    @cached_property
+    def discount(self) -> Decimal:
+        coupon = self.coupon
+
+        if not coupon:
             return Decimal(0)
-        return (self.coupon.discount / Decimal(100)) * self.get_total_price()
+        return (coupon.discount / Decimal(100)) * self.total_price
+
+    def get_discount(self):
+        """Calculate the discount applied on the total cart by a valid coupon (if any)"""
+        return self.discount
 
     def get_total_price(self):
         """
         Calculate the total price across all trips and their quantities
         """
-
-        return sum(
-            Decimal(item["price"]) * item["quantity"] for item in self.cart.values()
-        )
+        return self.total_price
 
     def get_total_price_after_discount(self):
         """Calculate the final price after applying coupon discount (if any)"""
-        return self.get_total_price() - self.get_discount()
+        return self.total_price - self.discount
 
     def add(
         self, trip, origin, destination, price, quantity=1, override_quantity=False
@@ -97,6 +162,7 @@ class Cart:
 
         logger.debug("saving the cart...")
         self.session.modified = True
+        self.reset()
 
     def clear(self):
         """
@@ -106,41 +172,47 @@ class Cart:
         logger.debug("clearing the cart...")
 
         del self.session[settings.CART_SESSION_ID]
+        self.cart = {}
         self.save()
 
     def to_dict(self):
         """Builds a dict which is JSON serializable"""
 
-        return [
-            {
-                "id": x["trip"].id,
-                "quantity": x["quantity"],
-                "price": x["price"],
-                "booked_seats": x["trip"].get_booked_seats(),
-            }
-            for x in self
-        ]
+        items = [item for item in self if "trip" in item]
 
-    def __iter__(self):
-        """
-        Iterate over the items in the cart and get the trips from the database.
-        """
+        # Seats are only booked for the legs the passenger travels
+        stops = [Location.objects.parse_query(item) for item in items]
+        legs = {
+            item["trip"]: item["trip"].get_legs(origin, destination)
+            for item, (origin, destination) in zip(items, stops)
+        }
 
-        trip_ids = self.cart.keys()
+        # The seats taken on all the trips are looked up at once
+        taken = Seat.objects.taken_numbers(legs)
 
-        # Get all the trip objects from DB and add them to the cart
-        trips = Trip.objects.filter(id__in=trip_ids).select_related(
-            "route", "origin", "destination", "company"
-        )
-        cart = self.cart.copy()
+        data = []
+        for item, (origin, destination) in zip(items, stops):
+            trip = item["trip"]
 
-        for trip in trips:
-            cart[str(trip.id)]["trip"] = trip
+            data.append(
+                {
+                    "id": trip.id,
+                    "quantity": item["quantity"],
+                    "price": item["price"],
+                    "booked_seats": trip.get_seat_positions(taken[trip.pk]),
+                    "seats_url": trip.get_seats_url(origin, destination),
+                    "events_url": trip.get_events_url(),
+                }
+            )
 
-        for item in cart.values():
-            item["price"] = Decimal(item["price"])
-            item["total_price"] = item["price"] * item["quantity"]
-            yield item
+        return data
+
+    def __iter__(self):
+        """
+        Iterate over the items in the cart along with their trips.
+        """
+
+        return iter(self.items)
 
     def __len__(self):
         """
@@ -11,7 +11,7 @@ from trips.factories import (
     TripFactory,
     TripTomorrowFactory,
 )
-from trips.models import Price, Trip
+from trips.models import Location, Price, Trip
 
 
 class SessionDict(dict):
@@ -289,3 +289,60 @@ class CartTests(TestCase):
 
         self.assertEqual(len(cart), self.num_passengers)
         self.assertEqual(len(cart.cart), 1)  # num of trips
+
+    def test_cart_is_loaded_once_per_request(self):
+        cart = Cart.for_request(self.request)
+        self.assertIs(Cart.for_request(self.request), cart)
+
+        # The trips and the coupon
+        with self.assertNumQueries(2):
+            for _ in range(3):
+                list(cart)
+                cart.get_total_price_after_discount()
+
+        self.assertEqual(
+            cart.get_total_price(), self.price.amount * self.num_passengers
+        )
+        self.assertIsInstance(
+            self.request.session["cart"][str(self.trip.id)]["price"], str
+        )
+
+    def test_changing_the_cart_forgets_what_was_loaded(self):
+        cart = Cart(self.request)
+        self.assertEqual(len(list(cart)), 1)
+
+        cart.remove(trip=self.trip)
+
+        self.assertEqual(list(cart), [])
+        self.assertEqual(cart.get_total_price(), 0)
+
+        cart.add(
+            trip=self.trip,
+            origin=self.origin,
+            destination=self.destination,
+            price=10,
+            quantity=2,
+        )
+        self.assertEqual(cart.get_total_price(), 20)
+        self.assertEqual(list(cart)[0]["trip"], self.trip)
+
+        cart.clear()
+        self.assertEqual(list(cart), [])
+
+    def test_to_dict_looks_up_the_seats_taken_at_once(self):
+        self.trip.create_seats(1, 2, 3)
+        self.trip.hold_seats("2")
+
+        self.cart[str(self.trip.id)]["origin"] = self.origin.abbr
+        self.cart[str(self.trip.id)]["destination"] = self.destination.abbr
+
+        cart = Cart(self.request)
+        list(cart)
+        Location.objects.get_snapshot()
+
+        # The seats taken on the legs of every trip
+        with self.assertNumQueries(1):
+            data = cart.to_dict()
+
+        self.assertEqual(data[0]["id"], self.trip.id)
+        self.assertEqual(data[0]["booked_seats"], self.trip.get_booked_seats())
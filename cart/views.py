@@ -83,7 +83,7 @@ def cart_detail(request):
         messages.info(request, settings.SESSION_EXPIRED_MESSAGE)
         return redirect("pages:home")
 
-    cart = Cart(request)
+    cart = Cart.for_request(request)
     coupon_apply_form = CouponApplyForm()
 
     q = request.session.get("q")
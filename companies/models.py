@@ -98,6 +98,9 @@ class Company(models.Model):
     def get_live_status_url(self):
         return reverse_lazy("companies:live-status", kwargs={"slug": self.slug})
 
+    def get_live_events_url(self):
+        return reverse_lazy("companies:live-events", kwargs={"slug": self.slug})
+
 
 class SeatChart(models.Model):
     """
@@ -127,3 +130,11 @@ class SeatChart(models.Model):
             "companies:seatchart-detail",
             kwargs={"slug": self.company.slug, "id": self.id},
         )
+
+    def get_seat_numbers(self) -> list[int]:
+        """Enabled seat numbers of both floors"""
+
+        lower = self.json.get("lower", {}).get("enabledSeats", [])
+        upper = self.json.get("upper", {}).get("enabledSeats", [])
+
+        return [int(number) for number in lower + upper]
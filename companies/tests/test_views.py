@@ -4,6 +4,8 @@ from django.http.response import HttpResponseRedirect
 from django.test import SimpleTestCase, TestCase
 from django.urls import resolve, reverse_lazy
 
+from asgiref.sync import sync_to_async
+
 from companies.factories import CompanyFactory, SeatChartFactory
 from companies.models import Company, SeatChart
 from companies.views import (
@@ -513,4 +515,41 @@ class LiveStatusViewTests(TestCase):
 
         self.assertEqual(view.func.__name__, LiveStatusView.as_view().__name__)
 
+
+class LiveStatusEventsTests(TestCase):
+    """
+    Test suite for the stream of trip changes of the live status page
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CompanyOwnerFactory()
+        cls.company = CompanyFactory(owner=cls.owner)
+        cls.url = cls.company.get_live_events_url()
+
+    async def test_owner_gets_an_event_stream(self):
+        await self.async_client.aforce_login(self.owner)
+
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        await stream.aclose()
+
+    async def test_anonymous_user_is_redirected_to_login(self):
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    async def test_other_users_are_forbidden(self):
+        user = await sync_to_async(CompanyOwnerFactory)()
+        await self.async_client.aforce_login(user)
+
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
     # TODO WRITE PERMISSION TESTS
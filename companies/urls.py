@@ -60,6 +60,7 @@ company_admin_patterns = [
         name="checkin",
     ),
     path("live/", views.LiveStatusView.as_view(), name="live-status"),
+    path("live/events/", views.live_status_events, name="live-events"),
     path("orders/", views.OrderListView.as_view(), name="order-list"),
     path("passengers/", views.PassengerListView.as_view(), name="passengers"),
 ]
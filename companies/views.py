@@ -1,9 +1,16 @@
 import logging
 from typing import Any, Dict
 
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.http import require_GET
 from django.views.generic import DetailView, ListView, TemplateView
 
+from asgiref.sync import sync_to_async
+
 from orders.models import Order, Passenger
+from trips import events
 from trips.models import Trip
 
 from .mixins import OwnerMixin
@@ -104,6 +111,36 @@ class AgencyDetailView(OwnerMixin, TemplateView):
 class LiveStatusView(OwnerMixin, TemplateView):
     template_name = "companies/live_status.html"
 
+    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context["events_url"] = context["company"].get_live_events_url()
+
+        return context
+
+
+@require_GET
+async def live_status_events(request, slug):
+    """
+    Stream of the changes to all the trips of a company (see `trips.events`) for
+    the live status page. Same access rules as `OwnerMixin`.
+    """
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+
+    company = await aget_object_or_404(
+        Company.objects.select_related("owner"), slug=slug
+    )
+
+    is_owner = company.owner_id == user.pk
+    has_perm = await sync_to_async(user.has_perm)(OwnerMixin.permission_required)
+
+    if not (user.is_superuser or is_owner and has_perm):
+        raise PermissionDenied
+
+    return events.EventStreamResponse(events.stream(events.company_topic(company.pk)))
+
 
 class PassengerListView(OwnerMixin, ListView):
     template_name = "companies/passengers.html"
@@ -0,0 +1,49 @@
+# Gunicorn configuration file for the event streams only
+# https://docs.gunicorn.org/en/stable/settings.html
+#
+# Server-sent events (see `trips.events`) stay open for as long as a seat map or
+# the live status page is, so they are served by ASGI workers where every stream
+# is an idle coroutine. nginx routes only the `.../events/` URLs here, everything
+# else is served by the sync workers of gunicorn.conf.py.
+#
+# The events are published by the sync workers, set TRIP_EVENTS_BACKEND=postgres
+# so that they reach these ones.
+
+import gunicorn
+
+# Replace gunicorn server http header to avoid leaking info to attackers
+gunicorn.SERVER = ""
+
+wsgi_app = "main.asgi:application"
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Bind to a unix socket (created by systemd)
+bind = "unix:/run/falcon-events.sock"
+
+# A single async worker holds thousands of idle streams
+workers = 1
+
+# Access log - records incoming HTTP requests
+accesslog = "-"
+access_log_format = '%(h)s %(l)s %(u)s "%(r)s" %(s)s'
+
+# Error log - records Gunicorn server errors
+errorlog = "-"
+error_log_format = '%(h)s %(l)s %(u)s "%(r)s" %(s)s'
+
+log_file = "-"
+
+# Whether to send Django output to the error log
+capture_output = True
+
+# How verbose the Gunicorn error logs should be
+loglevel = "info"
+
+enable_stdio_inheritance = True
+
+# Restart workers whose event loop is blocked for 25 secs. Open streams don't
+# count, the loop keeps notifying the master while they wait.
+timeout = 25
+
+# Give open streams a moment to close on restarts, browsers reconnect on their own
+graceful_timeout = 5
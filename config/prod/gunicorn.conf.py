@@ -20,6 +20,10 @@ bind = "unix:/run/falcon-gunicorn.sock"
 # workers = multiprocessing.cpu_count() * 2 + 1
 workers = 1  # <-- Change this later but for testing 1 is enough
 
+# Event streams (see `trips.events`) are served by their own ASGI workers, see
+# gunicorn-events.conf.py, so that every other view keeps a sync worker and the
+# timeout below
+
 # Access log - records incoming HTTP requests
 accesslog = "-"
 access_log_format = '%(h)s %(l)s %(u)s "%(r)s" %(s)s'
@@ -41,5 +45,24 @@ enable_stdio_inheritance = True
 # Load app-prefork to save memory and worker startup time
 preload_app = True
 
-# Timeout after 25 secs
+# Timeout after 25 secs. Slow work (PDFs, emails...) belongs to the `run_jobs` and
+# `send_emails` workers
 timeout = 25
+
+
+def when_ready(server):
+    """
+    Load the locations in the master once the app is preloaded so that all the
+    forked workers start with them in memory.
+    """
+
+    from django.db import connections
+
+    from trips import autocomplete
+    from trips.models import Location
+
+    server.log.info("Warmed up %s locations" % Location.objects.warm_cache())
+    autocomplete.get_index()
+
+    # Don't share the master's DB connection with the workers
+    connections.close_all()
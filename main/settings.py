@@ -91,6 +91,31 @@ CART_SESSION_ID = "cart"
 # SESSION_COOKIE_AGE = 10 * 60  # 10 mins
 SESSION_EXPIRED_MESSAGE = _("Your session has expired. Please search again 🙏")
 
+# Seconds seats stay on hold for an unpaid order before being released
+SEAT_HOLD_TIMEOUT = int(os.getenv("SEAT_HOLD_TIMEOUT", default=15 * 60))
+
+# How trip changes reach the event streams of all the ASGI workers. Use "postgres"
+# (LISTEN/NOTIFY) as soon as there's more than one process. See `trips.events`.
+TRIP_EVENTS_BACKEND = os.getenv("TRIP_EVENTS_BACKEND", default="local")
+
+# Lay out new trips from their seat chart and only store the seats once taken
+LAZY_SEATS = int(os.getenv("LAZY_SEATS", default=0))
+
+# Seconds a worker has to finish a job before other workers take it again. Keep it
+# well over the slowest job, rendering the PDFs of an order (see PDF_RENDER_TIMEOUT)
+# and emailing them, as jobs run past it are not committed. See `Job.run`.
+JOBS_TIMEOUT = int(os.getenv("JOBS_TIMEOUT", default=15 * 60))
+
+# Processes rendering PDFs for each worker, none renders them in process. Renders
+# wait for the pool beyond PDF_QUEUE_SIZE and fail after PDF_RENDER_TIMEOUT secs.
+# See `base.rendering`.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", default=0))
+PDF_QUEUE_SIZE = int(os.getenv("PDF_QUEUE_SIZE", default=16))
+PDF_RENDER_TIMEOUT = int(os.getenv("PDF_RENDER_TIMEOUT", default=20))
+# Bytes of stylesheets, fonts and images kept in memory by each process rendering
+# PDFs, see `base.assets`
+PDF_ASSETS_CACHE_SIZE = int(os.getenv("PDF_ASSETS_CACHE_SIZE", default=32 * 1024**2))
+
 AUTHENTICATION_BACKENDS = (
     # Needed to login by username in Django admin, regardless of `allauth`
     "django.contrib.auth.backends.ModelBackend",
@@ -190,6 +215,38 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Search results are shared by all gunicorn workers only with the file or db backend.
+# The db backend needs `python manage.py createcachetable` to be run once.
+
+SEARCH_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "search",
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv(
+            "SEARCH_CACHE_LOCATION", default="/var/tmp/falcon/search"
+        ),
+    },
+    "db": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "search_cache",
+    },
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "search": {
+        **SEARCH_CACHE_BACKENDS[os.getenv("SEARCH_CACHE_BACKEND", default="locmem")],
+        "TIMEOUT": int(os.getenv("SEARCH_CACHE_TIMEOUT", default=300)),
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -247,6 +304,24 @@ STATICFILES_FINDERS = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+    # Rendered tickets and invoices (see `orders.pdfs`), kept out of the public
+    # media as they hold the passengers' data
+    "pdfs": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": os.getenv("PDFS_ROOT", default=BASE_DIR / "pdfs")},
+    },
+}
+
+# Keeps the files written by the tests out of MEDIA_ROOT and PDFS_ROOT
+TEST_RUNNER = "base.runner.TestRunner"
+
 # Mailpit
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "127.0.0.1"
@@ -155,6 +155,21 @@ class PassengerForm(forms.ModelForm):
             "gender": forms.Select(attrs=select),
         }
 
+    def validate_unique(self):
+        """
+        Returning passengers are matched by document number when the order is
+        placed, see `PassengerManager.upsert`. Duplicates within the same order
+        are still caught by the formset.
+        """
+
+        exclude = self._get_validation_exclusions()
+        exclude.add("document_number")
+
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as e:
+            self._update_errors(e)
+
     def clean_first_name(self):
         """Make sure passenger first name is title case"""
 
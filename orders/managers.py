@@ -0,0 +1,68 @@
+import logging
+
+from django.apps import apps
+from django.db import models, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class PassengerManager(models.Manager):
+    def upsert(self, passengers) -> list:
+        """
+        Save passengers in a single query. Passengers travelling again (same
+        document number) are reused as they were first saved instead of failing on
+        the unique document number. Anybody can enter someone else's document
+        number, so their details are never overwritten.
+        """
+
+        logger.info("saving %s passengers(🧍)..." % len(passengers))
+
+        return self.bulk_create(
+            passengers,
+            update_conflicts=True,
+            unique_fields=["document_number"],
+            update_fields=["updated_on"],
+        )
+
+
+class OrderManager(models.Manager):
+    def place(self, order, passengers, items):
+        """
+        Save a new order along with its passengers and items and hold the seats
+        of every item on behalf of the order, all or nothing.
+
+        Everything is inserted in bulk. Returns the hold that failed, in which
+        case nothing was saved, or `None` when the order was placed.
+        """
+
+        Passenger = apps.get_model("orders", "Passenger")
+        OrderItem = apps.get_model("orders", "OrderItem")
+
+        with transaction.atomic():
+            order.save()
+
+            passengers = Passenger.objects.upsert(passengers)
+            self.model.passengers.through.objects.bulk_create(
+                [
+                    self.model.passengers.through(order=order, passenger=passenger)
+                    for passenger in passengers
+                ]
+            )
+
+            for item in items:
+                held = item.trip.try_hold_seats(
+                    item.seats, item.origin, item.destination, order
+                )
+
+                if not held.ok:
+                    # Someone else got some of the seats first
+                    transaction.set_rollback(True)
+                    return held
+
+                item.order = order
+
+            OrderItem.objects.bulk_create(items)
+
+        logger.info("placed order %s(🧾)..." % order)
+
+        return None
@@ -5,7 +5,7 @@ from decimal import Decimal
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
-from django.db import models
+from django.db import models, transaction
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
@@ -13,6 +13,8 @@ from django.utils.translation import gettext_lazy as _
 from django_countries.fields import CountryField
 
 from base.models import Settings
+from orders.managers import OrderManager, PassengerManager
+from trips.models import Seat
 
 from .validators import validate_birth_date
 
@@ -49,6 +51,8 @@ class Order(models.Model):
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
 
+    objects = OrderManager()
+
     class Meta:
         ordering = ["-created_on"]
         verbose_name = _("order")
@@ -102,18 +106,35 @@ class Order(models.Model):
                 code="invalid",
             )
 
-        passengers = self.passengers.all()
+        passengers = self.passengers.order_by("pk")
         order_items = self.items.select_related("origin", "destination", "trip")
 
-        for order_item in order_items:
-            order_item.trip.book_seats_with_passengers(
-                seat_numbers=order_item.seats, passengers=passengers
+        # Every order item books one seat per passenger of the order
+        bookings = [
+            item.trip.get_seat_booking(
+                seat_numbers=item.seats,
+                passengers=passengers,
+                origin=item.origin,
+                destination=item.destination,
+                order=self,
             )
+            for item in order_items
+        ]
+
+        with transaction.atomic():
+            result = Seat.objects.book(bookings)
 
-        logger.info("marking order %s as paid...(💰)" % self)
-        self.paid = True
-        self.payment_id = payment_id
-        self.save(update_fields=["paid", "payment_id"])
+            if not result.ok:
+                raise ValidationError(
+                    "Order: %(order)s cannot be confirmed: %(conflicts)s",
+                    params={"order": self, "conflicts": result.conflicts},
+                    code="seats_taken",
+                )
+
+            logger.info("marking order %s as paid...(💰)" % self)
+            self.paid = True
+            self.payment_id = payment_id
+            self.save(update_fields=["paid", "payment_id"])
 
         return self
 
@@ -225,6 +246,8 @@ class Passenger(models.Model):
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
 
+    objects = PassengerManager()
+
     class Meta:
         ordering = ["-created_on"]
         verbose_name = _("passenger")
@@ -0,0 +1,127 @@
+"""
+Rendered tickets and invoices, cached by what they show.
+
+A WeasyPrint render costs hundreds of milliseconds of CPU so every PDF is
+rendered once and stored in the "pdfs" storage under a fingerprint of its
+inputs: the template source, the language and the order along with its item,
+trip, passengers and company. Anything changing the PDF changes the fingerprint,
+which doubles as the ETag of the PDF views. The PDFs of an order are deleted
+whenever the order is saved, see `orders.signals`.
+"""
+
+import hashlib
+import logging
+from functools import lru_cache
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.template.loader import get_template
+from django.utils import translation
+
+from base.rendering import render_pdfs
+
+logger = logging.getLogger(__name__)
+
+PDFS_DIR = "orders"
+
+# Bump to render all the PDFs again, e.g. after upgrading WeasyPrint
+VERSION = 1
+
+
+def get_storage():
+    return storages["pdfs"]
+
+
+@lru_cache
+def get_template_digest(template_name) -> str:
+    """Changes whenever the template does (e.g. on deploys)"""
+
+    source = get_template(template_name).template.source
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def get_fingerprint(template_name, context) -> str:
+    """Hash of everything a ticket or invoice shows"""
+
+    order, item, trip = context["order"], context["item"], context["trip"]
+
+    inputs = [
+        VERSION,
+        template_name,
+        get_template_digest(template_name),
+        translation.get_language(),
+        context.get("payment_id"),
+        (order.pk, order.updated_on, order.name, order.paid, order.discount),
+        (item.pk, item.seats, item.price, item.origin_id, item.destination_id),
+        # Trips are updated on every seat taken, only what's printed matters
+        (trip.pk, trip.schedule, trip.category, trip.status),
+        (context["company"].pk, context["company"].name, str(context["company"].cover)),
+        [(passenger.pk, passenger.updated_on) for passenger in context["passengers"]],
+    ]
+
+    return hashlib.sha256(repr(inputs).encode()).hexdigest()
+
+
+def get_path(order_id, template_name, fingerprint) -> str:
+    name = template_name.rsplit("/", 1)[-1].removesuffix(".html")
+    return f"{PDFS_DIR}/{order_id}/{name}-{fingerprint}.pdf"
+
+
+def get_pdfs(template_names, context) -> list[bytes]:
+    """
+    The PDFs of an order for some templates, rendering the ones not stored
+    already all at once. See `base.rendering`.
+    """
+
+    storage = get_storage()
+
+    paths = [
+        get_path(context["order"].pk, name, get_fingerprint(name, context))
+        for name in template_names
+    ]
+
+    stored = {}
+    missing = []
+
+    for name, path in zip(template_names, paths):
+        if storage.exists(path):
+            with storage.open(path) as f:
+                stored[path] = f.read()
+        else:
+            missing.append((name, path))
+
+    if not missing:
+        return [stored[path] for path in paths]
+
+    rendered = render_pdfs([(name, context) for name, _ in missing])
+
+    for (_, path), pdf in zip(missing, rendered):
+        stored[path] = pdf
+
+        # Concurrent renders of the same PDF store identical files
+        if not storage.exists(path):
+            storage.save(path, ContentFile(pdf))
+
+    return [stored[path] for path in paths]
+
+
+def get_pdf(template_name, context) -> bytes:
+    """The PDF of an order, only rendered when not stored already"""
+    return get_pdfs([template_name], context)[0]
+
+
+def forget_pdfs(order_id) -> int:
+    """Delete the stored PDFs of an order"""
+
+    storage = get_storage()
+    directory = f"{PDFS_DIR}/{order_id}"
+
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return 0
+
+    for name in files:
+        storage.delete(f"{directory}/{name}")
+
+    return len(files)
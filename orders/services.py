@@ -2,14 +2,13 @@ import logging
 from timeit import default_timer as timer
 
 from django.conf import settings
-from django.core import mail
+from django.core.exceptions import ValidationError
 from django.core.mail import EmailMultiAlternatives
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 
-from django_weasyprint.utils import django_url_fetcher
-from weasyprint import HTML
-
+from base.models import Email, Job
+from orders import pdfs
 from orders.models import Order
 
 logger = logging.getLogger(__name__)
@@ -17,16 +16,11 @@ logger = logging.getLogger(__name__)
 
 def burn_pdf(template_name, context) -> bytes:
     """
-    Renders a django template to a pdf file.
+    Renders a django template to a pdf file, or reuses the one rendered last time
+    if nothing it shows has changed. See `orders.pdfs`.
     """
 
-    pdf = HTML(
-        string=render_to_string(template_name, context),
-        url_fetcher=django_url_fetcher,
-        base_url="file://",
-    ).write_pdf()
-
-    return pdf
+    return pdfs.get_pdf(template_name, context)
 
 
 def build_context(order_id) -> dict:
@@ -55,6 +49,7 @@ def build_context(order_id) -> dict:
         company=company,
         code=str(order.id).split("-")[-1],
         trip_code=str(trip.id).split("-")[-1],
+        price=item.price,
         passengers=passengers,
         qr_url=qr_url,
     )
@@ -89,9 +84,10 @@ def prepare_user_email(context):
     # Attach html version as an alternative
     user_email.attach_alternative(content=html_message, mimetype="text/html")
 
-    # Create pdfs for ticket and invoice
-    ticket = burn_pdf(template_name="orders/ticket.html", context=context)
-    invoice = burn_pdf(template_name="orders/invoice.html", context=context)
+    # Create pdfs for ticket and invoice (at once)
+    ticket, invoice = pdfs.get_pdfs(
+        ["orders/ticket.html", "orders/invoice.html"], context=context
+    )
 
     # Attach pdfs to email
     user_email.attach(
@@ -131,31 +127,84 @@ def prepare_company_email(context):
     return company_email
 
 
-def order_confirmed(order_id, payment_id):
+def prepare_seats_taken_email(order, payment_id, conflicts):
     """
-    When an order is successfully confirmed / paid we
-        - book all seats in an order with passengers
-        - send tickets via e-mail to the payer.
-        - send notification email to the bus company
+    Prepare email message telling the staff a paid order could not be booked.
+    """
+
+    context = dict(order=order, payment_id=payment_id, conflicts=conflicts)
+
+    subject_path = "orders/emails/seats_taken_subject.txt"
+    body_path = "orders/emails/seats_taken_message.txt"
+
+    subject = render_to_string(subject_path, context).strip()
+    body = render_to_string(body_path, context).strip()
+
+    return EmailMultiAlternatives(
+        subject=subject,
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email for _, email in settings.ADMINS],
+    )
+
+
+def confirm_order(order_id, payment_id):
+    """
+    Book the seats of a paid order and queue the tickets to be sent.
+    Run by the job workers for payment webhooks, see
+    `payments.services.process_webhook_message`.
+
+    Seats taken by someone else stay taken however many times the job is retried,
+    the staff is told about the order instead (e.g. to refund it).
+    """
+
+    order = get_object_or_404(Order, id=order_id)
+
+    # Providers may tell us about the same payment more than once
+    if order.paid:
+        logger.info("order %s is already confirmed..." % order)
+        return
+
+    try:
+        order.confirm(payment_id=payment_id)
+    except ValidationError as e:
+        if e.code != "seats_taken":
+            raise
+
+        conflicts = e.params["conflicts"]
+        logger.error("paid order %s has no seats(🚨):%s" % (order, conflicts))
+
+        message = prepare_seats_taken_email(order, payment_id, conflicts)
+        Email.objects.queue(message, key=f"order:{order_id}:seats-taken")
+        return
+
+    Job.objects.enqueue(
+        "orders.services.send_tickets", order_id=order_id, payment_id=payment_id
+    )
+
+
+def send_tickets(order_id, payment_id):
+    """
+    Render the ticket and invoice of a confirmed order and queue them in the
+    outbox for the user along with a notification to the bus company. They're
+    sent by the `send_emails` workers once the job commits.
     """
 
     start = timer()
 
     context = build_context(order_id=order_id)
     context["payment_id"] = payment_id
-    order = context["order"]
-
-    # Confirm the order
-    order.confirm(payment_id=payment_id)
 
     user_email = prepare_user_email(context=context)
     company_email = prepare_company_email(context=context)
 
-    # Send both emails in one go
-    logger.info("sending booking emails...")
+    logger.info("queueing booking emails...")
 
-    connection = mail.get_connection()
-    mails_sent = connection.send_messages([user_email, company_email])
+    # Keyed by order so a job run twice doesn't email the tickets twice
+    emails = [
+        Email.objects.queue(user_email, key=f"order:{order_id}:tickets"),
+        Email.objects.queue(company_email, key=f"order:{order_id}:company"),
+    ]
 
     # Send whatsapp message to user
     # wa_context = dict()
@@ -167,6 +216,32 @@ def order_confirmed(order_id, payment_id):
     # data = get_document_payload(recipient="54111550254191", context=wa_context)
     # send_wa_message(data=data)
 
+    end = timer()
+    logger.info("send_tickets(📧) took: %0.2f seconds!" % (end - start))
+
+    return emails
+
+
+def order_confirmed(order_id, payment_id):
+    """
+    When an order is successfully confirmed / paid we
+        - book all seats in an order with passengers
+        - send tickets via e-mail to the payer.
+        - send notification email to the bus company
+
+    This does it all right away, outbox included. Payments go through the
+    webhooks instead, see `WebhookMessageManager.receive`.
+    """
+
+    start = timer()
+
+    order = get_object_or_404(Order, id=order_id)
+
+    # Confirm the order
+    order.confirm(payment_id=payment_id)
+    emails = send_tickets(order_id=order_id, payment_id=payment_id)
+    mails_sent = Email.objects.send(pks=[email.pk for email in emails])
+
     end = timer()
     logger.info("order_confirmed(🔒) took: %0.2f seconds!" % (end - start))
 
@@ -0,0 +1,27 @@
+import logging
+
+from django.db.models.signals import post_delete, post_save
+
+from orders.models import Order
+from orders.pdfs import forget_pdfs
+
+logger = logging.getLogger(__name__)
+
+
+def order_changed_receiver(sender, instance, **kwargs):
+    """Render the ticket and invoice of the order again next time"""
+
+    logger.debug("order %s changed, forgetting its pdfs..." % instance)
+    forget_pdfs(instance.pk)
+
+
+post_save.connect(
+    order_changed_receiver,
+    sender=Order,
+    dispatch_uid="order_post_save_receiver",
+)
+post_delete.connect(
+    order_changed_receiver,
+    sender=Order,
+    dispatch_uid="order_post_delete_receiver",
+)
@@ -3,6 +3,7 @@ from django.test import SimpleTestCase, TestCase
 from django_countries import countries
 from faker import Faker
 
+from orders.factories import PassengerFactory
 from orders.forms import OrderForm, OrderSearchForm, PassengerForm
 from orders.models import Passenger
 
@@ -125,6 +126,12 @@ class PassengerFormTests(TestCase):
 
         self.assertTrue(form.is_valid())
 
+    def test_passenger_form_is_valid_for_returning_passengers(self):
+        PassengerFactory(document_number=self.form_data["document_number"])
+        form = PassengerForm(data=self.form_data)
+
+        self.assertTrue(form.is_valid())
+
     def test_empty_passenger_form_raises_valid_errors(self):
         form = PassengerForm(data={})
         self.assertEqual(form.errors["document_type"][0], self.field_required_msg)
@@ -0,0 +1,74 @@
+from django.test import TestCase
+
+from orders.factories import OrderFactory, PassengerFactory
+from orders.models import Order, OrderItem, Passenger
+from trips.factories import TripTomorrowFactory
+from trips.models import Seat
+
+
+class PassengerManagerTests(TestCase):
+    def test_upsert_reuses_returning_passengers_without_overwriting_them(self):
+        returning = PassengerFactory(document_number="30111222", last_name="Old")
+
+        passengers = [
+            PassengerFactory.build(document_number="30111222", last_name="New"),
+            PassengerFactory.build(document_number="30333444"),
+        ]
+
+        with self.assertNumQueries(1):
+            saved = Passenger.objects.upsert(passengers)
+
+        self.assertEqual(saved[0].pk, returning.pk)
+        self.assertIsNotNone(saved[1].pk)
+        self.assertEqual(Passenger.objects.count(), 2)
+
+        returning.refresh_from_db()
+        self.assertEqual(returning.last_name, "Old")
+
+
+class OrderManagerTests(TestCase):
+    def setUp(self):
+        self.trip = TripTomorrowFactory()
+        self.trip.create_seats(1, 2, 3)
+
+        self.passengers = PassengerFactory.build_batch(size=2)
+        self.order = OrderFactory.build(paid=False, payment_id="")
+
+    def build_item(self, seats):
+        return OrderItem(
+            trip=self.trip,
+            origin=self.trip.origin,
+            destination=self.trip.destination,
+            price=10,
+            quantity=2,
+            seats=seats,
+        )
+
+    def test_place_saves_the_order_and_holds_its_seats(self):
+        held = Order.objects.place(
+            self.order, self.passengers, [self.build_item("1,2")]
+        )
+
+        self.assertIsNone(held)
+
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual(order.passengers.count(), 2)
+        self.assertEqual(order.items.get().seats, "1,2")
+
+        seats = self.trip.seats.filter(seat_status=Seat.ONHOLD)
+        self.assertEqual(sorted(seats.values_list("seat_number", flat=True)), [1, 2])
+
+    def test_place_saves_nothing_when_seats_are_taken(self):
+        self.trip.hold_seats("2")
+
+        held = Order.objects.place(
+            self.order, self.passengers, [self.build_item("1,2")]
+        )
+
+        self.assertFalse(held.ok)
+        self.assertEqual(held.conflicts[0].seat_number, 2)
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(Passenger.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(self.trip.seats.filter(seat_status=Seat.ONHOLD).count(), 1)
@@ -182,6 +182,88 @@ class OrderModelTests(TestCase):
         self.assertIn(seat_1.passenger, passengers)
         self.assertIn(seat_2.passenger, passengers)
 
+    def test_confirming_an_order_books_all_items_at_once(self):
+        # Arrange: a round trip for 5 passengers
+        outbound, inbound = TripTomorrowFactory(), TripTomorrowFactory()
+        for trip in (outbound, inbound):
+            trip.create_seats(*range(1, 8))
+
+        passengers = PassengerFactory.create_batch(size=5)
+        order = OrderFactory(passengers=passengers, paid=False)
+        OrderItemFactory(order=order, trip=outbound, quantity=5, seats="1,2,3,4,5")
+        OrderItemFactory(order=order, trip=inbound, quantity=5, seats="3,4,5,6,7")
+
+        # Act: items, passengers, seat lock, seats UPDATE, 2 trip counters, order
+        with self.assertNumQueries(7 + 4):  # <-- and two savepoints
+            order.confirm(payment_id=fake.bban())
+
+        # Assert
+        for trip in (outbound, inbound):
+            trip.refresh_from_db()
+            self.assertEqual(trip.booked_count, 5)
+            self.assertEqual(trip.available_count, 2)
+
+        seats = Seat.objects.filter(trip=outbound).order_by("seat_number")
+        passenger_ids = sorted(passenger.pk for passenger in passengers)
+        self.assertEqual(
+            [seat.passenger_id for seat in seats[:5]],
+            passenger_ids,
+        )
+
+        # A retried confirmation does not book anything twice
+        order.confirm(payment_id=order.payment_id)
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.booked_count, 5)
+
+    def test_confirming_an_order_with_taken_seats_books_nothing(self):
+        trip = TripTomorrowFactory()
+        trip.create_seats(1, 2)
+
+        other = PassengerFactory()
+        trip.book_seats_with_passengers("2", Passenger.objects.filter(pk=other.pk))
+
+        passengers = PassengerFactory.create_batch(size=2)
+        order = OrderFactory(passengers=passengers, paid=False)
+        OrderItemFactory(order=order, trip=trip, quantity=2, seats="1, 2")
+
+        with self.assertRaises(ValidationError):
+            order.confirm(payment_id=fake.bban())
+
+        order.refresh_from_db()
+        self.assertFalse(order.paid)
+        self.assertEqual(trip.seats.get(seat_number=1).seat_status, Seat.AVAILABLE)
+        self.assertEqual(trip.seats.get(seat_number=2).passenger, other)
+
+    def test_confirming_an_order_over_the_hold_of_another_order_books_nothing(self):
+        trip = TripTomorrowFactory()
+        trip.create_seats(1)
+
+        # Order A holds the seat while checking out
+        order_a = OrderFactory(passengers=PassengerFactory.create_batch(size=1))
+        self.assertEqual(trip.hold_seats("1", order=order_a), 1)
+
+        # Order B paid late for the same seat
+        order_b = OrderFactory(
+            passengers=PassengerFactory.create_batch(size=1), paid=False
+        )
+        OrderItemFactory(order=order_b, trip=trip, quantity=1, seats="1")
+
+        with self.assertRaises(ValidationError):
+            order_b.confirm(payment_id=fake.bban())
+
+        seat = trip.seats.get(seat_number=1)
+        self.assertEqual(seat.seat_status, Seat.ONHOLD)
+        self.assertEqual(seat.hold_order_id, order_a.pk)
+        self.assertIsNone(seat.passenger)
+
+        # Order A books its own hold
+        OrderItemFactory(order=order_a, trip=trip, quantity=1, seats="1")
+        order_a.confirm(payment_id=fake.bban())
+
+        seat.refresh_from_db()
+        self.assertEqual(seat.seat_status, Seat.BOOKED)
+        self.assertIn(seat.passenger, order_a.passengers.all())
+
     def test_order_ticket_pdf_url_works(self):
         order = Order.objects.first()
 
@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from orders import pdfs
+from orders.factories import OrderFactory, OrderItemFactory, PassengerFactory
+from orders.services import build_context
+
+TICKET = "orders/ticket.html"
+
+
+def render_pdfs(jobs, request=None):
+    return [b"%PDF-1.7" for _ in jobs]
+
+
+class CachedPDFTests(TestCase):
+    def setUp(self):
+        self.order = OrderFactory(passengers=PassengerFactory.create_batch(size=2))
+        OrderItemFactory(order=self.order)
+
+        patcher = mock.patch("orders.pdfs.render_pdfs", side_effect=render_pdfs)
+        self.render = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_context(self):
+        return build_context(order_id=self.order.id)
+
+    def test_pdfs_are_rendered_once(self):
+        self.assertEqual(pdfs.get_pdf(TICKET, self.get_context()), b"%PDF-1.7")
+        self.assertEqual(pdfs.get_pdf(TICKET, self.get_context()), b"%PDF-1.7")
+
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_fingerprint_changes_with_what_the_pdf_shows(self):
+        fingerprint = pdfs.get_fingerprint(TICKET, self.get_context())
+
+        self.assertEqual(pdfs.get_fingerprint(TICKET, self.get_context()), fingerprint)
+
+        passenger = self.order.passengers.first()
+        passenger.last_name = "Other"
+        passenger.save()
+
+        self.assertNotEqual(
+            pdfs.get_fingerprint(TICKET, self.get_context()), fingerprint
+        )
+        self.assertNotEqual(
+            pdfs.get_fingerprint("orders/invoice.html", self.get_context()), fingerprint
+        )
+
+    def test_seats_taken_on_the_trip_keep_the_pdfs(self):
+        context = self.get_context()
+        fingerprint = pdfs.get_fingerprint(TICKET, context)
+
+        context["trip"].update_inventory()
+
+        self.assertEqual(pdfs.get_fingerprint(TICKET, self.get_context()), fingerprint)
+
+    def test_saving_the_order_forgets_its_pdfs(self):
+        pdfs.get_pdf(TICKET, self.get_context())
+
+        self.order.save()
+        self.assertEqual(pdfs.forget_pdfs(self.order.pk), 0)
+
+        pdfs.get_pdf(TICKET, self.get_context())
+        self.assertEqual(self.render.call_count, 2)
@@ -5,8 +5,10 @@ from django.core import mail
 from django.http import Http404
 from django.test import TestCase
 
-from orders.factories import OrderFactory, OrderItemFactory
-from orders.services import order_confirmed
+from base.models import Email, Job
+from orders.factories import OrderFactory, OrderItemFactory, PassengerFactory
+from orders.services import confirm_order, order_confirmed, send_tickets
+from trips.factories import TripTomorrowFactory
 
 
 class OrderConfirmedTests(TestCase):
@@ -83,3 +85,77 @@ class OrderConfirmedTests(TestCase):
         self.assertEqual(company_email.to, [self.order_items[0].trip.company.email])
         self.assertEqual(company_email.from_email, settings.DEFAULT_FROM_EMAIL)
         self.assertIsNotNone(company_email.body)
+
+
+class ConfirmOrderJobTests(TestCase):
+    """Orders are confirmed and their tickets sent by the job workers"""
+
+    def setUp(self):
+        self.order = OrderFactory(paid=False, payment_id="")
+        OrderItemFactory(order=self.order)
+
+    def test_confirmation_job_queues_the_tickets(self):
+        Job.objects.enqueue(
+            "orders.services.confirm_order",
+            order_id=str(self.order.id),
+            payment_id="12345",
+        )
+
+        self.order.refresh_from_db()
+        self.assertFalse(self.order.paid)
+        self.assertEqual(len(mail.outbox), 0)
+
+        # Confirming the order queues the tickets
+        self.assertEqual(Job.objects.work(), 1)
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.paid)
+        self.assertEqual(len(mail.outbox), 0)
+
+        # Sending the tickets queues them in the outbox
+        self.assertEqual(Job.objects.work(), 1)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+        self.assertEqual(Email.objects.send(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(Email.objects.exclude(status=Email.DONE).exists())
+
+    def test_tickets_are_queued_once_per_order(self):
+        confirm_order(order_id=str(self.order.id), payment_id="12345")
+
+        send_tickets(order_id=str(self.order.id), payment_id="12345")
+        send_tickets(order_id=str(self.order.id), payment_id="12345")
+
+        self.assertEqual(Email.objects.count(), 2)
+
+    def test_confirming_an_order_twice_does_nothing(self):
+        confirm_order(order_id=str(self.order.id), payment_id="12345")
+        confirm_order(order_id=str(self.order.id), payment_id="12345")
+
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_orders_paid_for_seats_taken_are_reported_once(self):
+        trip = TripTomorrowFactory()
+        trip.create_seats(1)
+        trip.hold_seats("1", order=OrderFactory())
+
+        order = OrderFactory(passengers=[PassengerFactory()], paid=False)
+        OrderItemFactory(order=order, trip=trip, quantity=1, seats="1")
+
+        Job.objects.enqueue(
+            "orders.services.confirm_order", order_id=str(order.id), payment_id="1"
+        )
+
+        # Retrying would not free the seats
+        self.assertEqual(Job.objects.work(), 1)
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+        order.refresh_from_db()
+        self.assertFalse(order.paid)
+
+        self.assertEqual(Email.objects.send(), 1)
+        [message] = mail.outbox
+
+        self.assertEqual(message.to, [email for _, email in settings.ADMINS])
+        self.assertIn(str(order.id), message.subject)
+        self.assertIn("seat 1 of", message.body)
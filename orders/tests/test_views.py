@@ -1,5 +1,6 @@
 import uuid
 from http import HTTPStatus
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.messages import get_messages
@@ -233,16 +234,17 @@ class OrderCreatePostTests(TestCase):
             str(self.trip.id): {
                 "quantity": self.num_of_passengers,
                 "price": str(self.price.amount),
-                "origin": self.origin.name,
-                "destination": self.destination.name,
+                "origin": self.origin.abbr,
+                "destination": self.destination.abbr,
             }
         }
 
+        # Locations are looked up by their abbr code, see `parse_query`
         self.q = {
             "trip_type": "one_way",
             "num_of_passengers": str(self.num_of_passengers),
-            "origin": self.origin.name,
-            "destination": self.destination.name,
+            "origin": self.origin.abbr,
+            "destination": self.destination.abbr,
             "departure": self.trip.departure.strftime("%d-%m-%Y"),
             "return": "",
         }
@@ -367,6 +369,27 @@ class OrderCreatePostTests(TestCase):
         self.assertEqual(seat_2.seat_status, Seat.ONHOLD)
         self.assertEqual(response.status_code, HTTPStatus.OK)
 
+    def test_order_with_seats_just_taken_asks_for_other_seats(self):
+        # Someone else got seat 2 while the user was filling the form
+        self.trip.hold_seats("2")
+
+        response = self.client.post(self.url, data=self.data)
+
+        # The form is shown again, not redirected to payments
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTemplateUsed(response, self.template_name)
+
+        # Because seat 2 was taken
+        messages = [str(message) for message in get_messages(response.wsgi_request)]
+        self.assertEqual(len(messages), 1)
+        self.assertIn("seats 2 of", messages[0])
+        self.assertIn("were just taken", messages[0])
+
+        # Nothing was created or held for this order
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.trip.seats.get(seat_number=1).seat_status, Seat.AVAILABLE)
+        self.assertIn("cart", self.client.session)
+
     def test_order_success_clears_the_cart(self):
         response = self.client.post(self.url, data=self.data, follow=True)
 
@@ -637,3 +660,46 @@ class OrderCheckInTests(TestCase):
         # Assert user is forbidden access
         self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
         self.assertTemplateNotUsed(response, self.template_name)
+
+
+def render_pdfs(jobs, request=None):
+    return [b"%PDF-1.7" for _ in jobs]
+
+
+@mock.patch("orders.pdfs.render_pdfs", side_effect=render_pdfs)
+class TicketPDFViewTests(TestCase):
+    def setUp(self):
+        self.order = OrderFactory()
+        OrderItemFactory(order=self.order)
+
+        self.url = reverse_lazy("orders:ticket_pdf", args=[self.order.id])
+
+    def test_ticket_is_rendered_once_and_revalidated(self, render):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertIn("inline", response["Content-Disposition"])
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertEqual(response.content, b"%PDF-1.7")
+
+        etag = response["ETag"]
+
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.content, b"%PDF-1.7")
+        self.assertEqual(render.call_count, 1)
+
+    def test_changing_the_order_renders_the_ticket_again(self, render):
+        etag = self.client.get(self.url)["ETag"]
+
+        self.order.name = "Someone Else"
+        self.order.save()
+
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(render.call_count, 2)
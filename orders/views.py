@@ -8,16 +8,18 @@ from django.forms import modelformset_factory
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.utils.translation import gettext_lazy as _
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.views.generic import CreateView, DetailView, FormView
 
-from django_weasyprint import WeasyTemplateResponseMixin
-
 from cart.cart import Cart
 from companies.mixins import OwnerMixin
 from trips.models import Location
 
+from . import pdfs
 from .forms import OrderCancelForm, OrderForm, OrderResendForm, PassengerForm
 from .models import Order, OrderItem, Passenger
 from .services import build_context
@@ -84,7 +86,7 @@ class OrderCreateView(CreateView):
 
         origin, destination = Location.objects.parse_query(q)
 
-        context["cart"] = Cart(self.request)
+        context["cart"] = Cart.for_request(self.request)
         context["formset"] = self.get_formset()
         context["origin"] = origin
         context["destination"] = destination
@@ -96,12 +98,13 @@ class OrderCreateView(CreateView):
         Order form is already validated at this point.
         Now we need to run logic to
             - validate and process formset
+            - place the order and hold its seats in one go
             - proceed to payment
         """
 
         logger.info("order form is valid...")
 
-        cart = Cart(self.request)
+        cart = Cart.for_request(self.request)
         formset = self.get_formset()
 
         if not formset.is_valid():
@@ -109,28 +112,17 @@ class OrderCreateView(CreateView):
 
         logger.info("passenger formset is valid...")
 
-        # Get the http response that this method has to return
-        # this also sets the self.object (order)
-        response = super().form_valid(form)
-
-        # Create an order object thats saved to the DB
-        order = self.object
+        order = form.save(commit=False)
 
         # Apply coupon to order if needed
         if cart.coupon:
             logger.info("attaching coupon %s..." % cart.coupon)
             order.coupon = cart.coupon
             order.discount = cart.coupon.discount
-            order.save()
 
-        # Create passenger objects
-        passengers = formset.save()
-        logger.info("passengers created %s..." % passengers)
-
-        # Create and save order -> passenger m2m
-        order.passengers.add(*passengers)
-        order.save()
+        passengers = formset.save(commit=False)
 
+        items = []
         for item in cart:
             trip = item["trip"]
 
@@ -138,25 +130,30 @@ class OrderCreateView(CreateView):
 
             # Extract seat numbers from POST data and clean them
             seat_numbers = self.request.POST.get(f"seats{trip.id}", "")
-
-            # Mark the seats for hold for each trip
-            seats = trip.hold_seats(seat_numbers)
-
             logger.info("Trip: %s selected seats: %s" % (trip, seat_numbers))
-            logger.info("seats held %s...", seats)
-
-            # Create order item objects (order, trip, seatnos) combo
-            order_item = OrderItem.objects.create(
-                order=order,
-                trip=trip,
-                origin=origin,
-                destination=destination,
-                price=item["price"],
-                quantity=item["quantity"],
-                seats=seat_numbers,
+
+            # Order item objects (order, trip, seatnos) combo
+            items.append(
+                OrderItem(
+                    trip=trip,
+                    origin=origin,
+                    destination=destination,
+                    price=item["price"],
+                    quantity=item["quantity"],
+                    seats=seat_numbers,
+                )
             )
 
-            logger.info("order_item %s...", order_item)
+        # Saves the order, passengers and items and holds the seats, all or nothing
+        held = Order.objects.place(order, passengers, items)
+
+        if held is not None:
+            # Someone else got some of the seats first. Let the user pick other
+            # seats right away.
+            return self.seats_taken(form, held.conflicts[0].trip, held)
+
+        self.object = order
+        logger.info("order %s placed with passengers %s..." % (order, passengers))
 
         cart.clear()
 
@@ -166,7 +163,25 @@ class OrderCreateView(CreateView):
 
         # TODO: Should we add any success message to request here?
         # Redirect to payment
-        return response
+        return redirect(self.get_success_url())
+
+    def seats_taken(self, form, trip, held) -> HttpResponse:
+        """Show the order form again asking the user to choose other seats"""
+
+        seats = ", ".join(str(conflict.seat_number) for conflict in held.conflicts)
+        message = _(
+            "Sorry, seats %(seats)s of %(trip)s were just taken. "
+            "Please choose other seats."
+        ) % {"seats": seats, "trip": trip}
+
+        logger.warning("seats taken: %s..." % held.conflicts)
+        messages.error(self.request, message)
+
+        # The trips of the cart were changed by the rolled back hold
+        Cart.for_request(self.request).reset()
+
+        self.object = None
+        return self.form_invalid(form)
 
 
 @require_POST
@@ -189,11 +204,16 @@ def order_cancel(request, order_id=None):
         logger.info("removed order from session...")
 
     order = get_object_or_404(Order, id=order_id)
-    for item in order.items.all():
+    for item in order.items.select_related("trip", "origin", "destination"):
         trip, seat_numbers = item.trip, item.seats
 
         logger.info("trip:%s, seats:%s" % (trip, seat_numbers))
-        trip.release_seats(seat_numbers=seat_numbers)
+        trip.release_seats(
+            seat_numbers=seat_numbers,
+            origin=item.origin,
+            destination=item.destination,
+            order=order,
+        )
 
     logger.info("cancelled order:%s..." % order)
 
@@ -202,6 +222,42 @@ def order_cancel(request, order_id=None):
     return redirect("pages:home")
 
 
+class PDFResponseMixin:
+    """
+    Serves the PDF of an order, rendered once and then stored (see `orders.pdfs`).
+    Browsers keep it and only ask whether it changed, which is answered with a
+    304 without reading the PDF at all.
+    """
+
+    pdf_filename = None
+    pdf_attachment = True
+
+    def get_pdf_filename(self):
+        return self.pdf_filename
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        context = self.get_context_data(object=self.object)
+
+        fingerprint = pdfs.get_fingerprint(self.template_name, context)
+        etag = quote_etag(fingerprint)
+
+        response = get_conditional_response(request, etag=etag)
+
+        if response is None:
+            pdf = pdfs.get_pdf(self.template_name, context)
+            response = HttpResponse(pdf, content_type="application/pdf")
+
+            if filename := self.get_pdf_filename():
+                display = "attachment" if self.pdf_attachment else "inline"
+                response["Content-Disposition"] = f'{display};filename="{filename}"'
+
+        response.headers["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+
+        return response
+
+
 class InvoiceView(DetailView):
     model = Order
     pk_url_kwarg = "order_id"
@@ -213,7 +269,7 @@ class InvoiceView(DetailView):
         return context
 
 
-class InvoicePDFView(WeasyTemplateResponseMixin, InvoiceView):
+class InvoicePDFView(PDFResponseMixin, InvoiceView):
     pass
 
 
@@ -228,7 +284,7 @@ class TicketView(DetailView):
         return context
 
 
-class TicketPDFView(WeasyTemplateResponseMixin, TicketView):
+class TicketPDFView(PDFResponseMixin, TicketView):
     pdf_attachment = False
 
     def get_pdf_filename(self):
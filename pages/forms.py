@@ -2,11 +2,13 @@ import logging
 
 from django import forms
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
 from django.utils.translation import gettext_lazy as _
 
 from captcha.fields import CaptchaField, CaptchaTextInput
 
+from base.models import Email
+
 logger = logging.getLogger(__name__)
 
 
@@ -46,12 +48,13 @@ class FeedbackForm(forms.Form):
         message = "Email: {email}\n\n{message}".format(**self.cleaned_data)
 
         logger.info("sending feedback...")
-        send_mail(
-            subject=self.subject,
-            message=message,
-            from_email=from_email,
-            recipient_list=[settings.DEFAULT_TO_EMAIL],
-            fail_silently=False,
+        Email.objects.queue(
+            EmailMessage(
+                subject=self.subject,
+                body=message,
+                from_email=from_email,
+                to=[settings.DEFAULT_TO_EMAIL],
+            )
         )
 
 
@@ -105,10 +108,11 @@ class ContactForm(forms.Form):
         )
 
         logger.info("sending contact form email...")
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=from_email,
-            recipient_list=[settings.DEFAULT_TO_EMAIL],
-            fail_silently=False,
+        Email.objects.queue(
+            EmailMessage(
+                subject=subject,
+                body=message,
+                from_email=from_email,
+                to=[settings.DEFAULT_TO_EMAIL],
+            )
         )
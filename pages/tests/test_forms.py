@@ -5,6 +5,7 @@ from django.test import TestCase
 
 from captcha.conf import settings as captcha_settings
 
+from base.models import Email
 from pages.forms import ContactForm, FeedbackForm
 
 logger = logging.getLogger(__name__)
@@ -47,6 +48,10 @@ class FeedbackFormTests(TestCase):
         with self.assertLogs(logger="pages.forms", level="INFO") as cm:
             form.send_mail()
 
+        # Emails go out through the outbox
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Email.objects.send(), 1)
+
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject, FeedbackForm.subject)
 
@@ -137,6 +142,10 @@ class ContactFormTests(TestCase):
         with self.assertLogs("pages.forms", level="INFO") as cm:
             form.send_mail()
 
+        # Emails go out through the outbox
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Email.objects.send(), 1)
+
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject, self.form_data["subject"])
         self.assertGreaterEqual(len(cm.output), 1)
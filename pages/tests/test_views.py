@@ -7,6 +7,7 @@ from django.urls import resolve, reverse
 
 from captcha.conf import settings as captcha_settings
 
+from base.models import Email
 from pages.forms import ContactForm, FeedbackForm
 from pages.views import (
     AboutPageView,
@@ -180,6 +181,10 @@ class ContactPageTests(TestCase):
         # Test that an email has been sent.
         # Verify that the subject of the first message is correct.
         # Check page redirected to home after success
+        # Emails go out through the outbox
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Email.objects.send(), 1)
+
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject, self.valid_data.get("subject"))
         self.assertEqual(response["Location"], reverse("pages:home"))
@@ -254,6 +259,10 @@ class FeedbackPageTests(TestCase):
         # Test that an email has been sent.
         # Verify that the subject of the first message is correct.
         # Check page redirected to home after success
+        # Emails go out through the outbox
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Email.objects.send(), 1)
+
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject, FeedbackForm.subject)
         self.assertEqual(response["Location"], reverse("pages:home"))
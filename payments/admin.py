@@ -5,7 +5,8 @@ from .models import ModoToken, WebhookMessage
 
 @admin.register(WebhookMessage)
 class WebhookMessage(admin.ModelAdmin):
-    list_display = ("received_at", "provider")
+    list_display = ("received_at", "provider", "event_id", "processed_at")
+    list_filter = ("provider",)
 
 
 @admin.register(ModoToken)
@@ -0,0 +1,74 @@
+import time
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+
+from payments.models import WebhookMessage
+
+
+class Command(BaseCommand):
+    """
+    Delete the webhook messages received more than some days ago, in batches so
+    webhooks being received never wait on a large delete.
+
+    Run it from a scheduler or keep it running with `--loop`.
+    """
+
+    help = "Deletes old webhook messages"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "-d",
+            "--days",
+            type=int,
+            default=7,
+            help="Delete messages received more than these days ago. Defaults to 7.",
+        )
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of messages deleted per transaction. Defaults to 1000.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and prune messages as they get old.",
+        )
+        parser.add_argument(
+            "-i",
+            "--interval",
+            type=float,
+            default=60 * 60,
+            help="Seconds to sleep between runs with --loop. Defaults to an hour.",
+        )
+
+    def prune(self, days, batch_size) -> int:
+        total = 0
+
+        while deleted := WebhookMessage.objects.prune(days=days, batch_size=batch_size):
+            total += deleted
+
+            if deleted < batch_size:
+                break
+
+        return total
+
+    def handle(self, *args, **kwargs):
+        days, batch_size = kwargs["days"], kwargs["batch_size"]
+
+        while True:
+            start = timer()
+            deleted = self.prune(days, batch_size)
+            end = timer()
+
+            self.stdout.write("Webhook messages deleted:%s" % deleted)
+            self.stdout.write("took:%0.2f seconds." % (end - start))
+
+            if not kwargs["loop"]:
+                break
+
+            time.sleep(kwargs["interval"])
+
+        self.stdout.write("All done!")
@@ -0,0 +1,46 @@
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from base.models import Job
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookMessageManager(models.Manager):
+    def receive(self, provider, event_id, payload):
+        """
+        Store a webhook message and queue its processing, once per provider event
+        so retries of the same event are only acknowledged. Returns the message,
+        or None for an event received already.
+        """
+
+        try:
+            with transaction.atomic():
+                message = self.create(
+                    provider=provider,
+                    event_id=event_id,
+                    received_at=timezone.now(),
+                    payload=payload,
+                )
+                Job.objects.enqueue(
+                    "payments.services.process_webhook_message", message_id=message.pk
+                )
+        except IntegrityError:
+            logger.info("webhook event received already(🔁):%s..." % event_id)
+            return None
+
+        return message
+
+    def prune(self, days=7, batch_size=1000) -> int:
+        """Delete a batch of the messages received more than some days ago"""
+
+        old = self.filter(received_at__lte=Now() - timedelta(days=days))
+        pks = old.order_by("received_at").values("pk")[:batch_size]
+
+        deleted, _ = self.filter(pk__in=pks).delete()
+
+        return deleted
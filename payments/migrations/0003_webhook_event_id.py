@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0002_modotoken"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhookmessage",
+            name="event_id",
+            field=models.CharField(
+                blank=True, max_length=100, null=True, verbose_name="event id"
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhookmessage",
+            name="processed_at",
+            field=models.DateTimeField(
+                blank=True, help_text="When we processed the message", null=True
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="webhookmessage",
+            constraint=models.UniqueConstraint(
+                fields=("provider", "event_id"), name="unique_webhook_event"
+            ),
+        ),
+    ]
@@ -2,10 +2,13 @@ from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils.text import gettext_lazy as _
 
+from payments.managers import WebhookMessageManager
+
 
 class WebhookMessage(models.Model):
     """
-    Generic table to store webhook json response in the DB
+    Generic table to store webhook json response in the DB. Messages are processed
+    by the job workers, see `payments.services`.
     """
 
     MERCADOPAGO = "MP"
@@ -17,6 +20,13 @@ class WebhookMessage(models.Model):
     )
     received_at = models.DateTimeField(help_text=_("When we received the message"))
     payload = models.JSONField(_("payload"), default=dict, encoder=DjangoJSONEncoder)
+    # Id of the event at the provider, the same event is only stored once
+    event_id = models.CharField(_("event id"), max_length=100, blank=True, null=True)
+    processed_at = models.DateTimeField(
+        blank=True, null=True, help_text=_("When we processed the message")
+    )
+
+    objects = WebhookMessageManager()
 
     class Meta:
         verbose_name = _("webhook message")
@@ -24,6 +34,11 @@ class WebhookMessage(models.Model):
         indexes = [
             models.Index(fields=["received_at"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "event_id"], name="unique_webhook_event"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.get_provider_display()}:{self.received_at}"
@@ -0,0 +1,45 @@
+import logging
+
+from django.utils import timezone
+
+from orders.services import confirm_order
+from payments.models import WebhookMessage
+
+logger = logging.getLogger(__name__)
+
+
+def get_payment(message) -> tuple[str, str] | None:
+    """The order id and payment id of a message confirming a payment, if any"""
+
+    payload = message.payload
+
+    if message.provider == WebhookMessage.STRIPE:
+        session = payload["data"]["object"]
+        return session["client_reference_id"], session["payment_intent"]
+
+    # Mercado pago redirects to `mercadopago_success` with the payment, its
+    # notifications to `mercadopago_webhook` are only stored for now
+    if payload.get("status") == "approved" and payload.get("external_reference"):
+        return payload["external_reference"], payload.get("payment_id")
+
+    return None
+
+
+def process_webhook_message(message_id):
+    """
+    Confirm the order paid in a webhook message, at most once per message.
+    Run by the job workers, see `WebhookMessageManager.receive`.
+    """
+
+    message = WebhookMessage.objects.select_for_update().get(pk=message_id)
+
+    if message.processed_at:
+        logger.info("webhook message %s is already processed..." % message)
+        return
+
+    if payment := get_payment(message):
+        order_id, payment_id = payment
+        confirm_order(order_id=order_id, payment_id=payment_id)
+
+    message.processed_at = timezone.now()
+    message.save(update_fields=["processed_at"])
@@ -1,10 +1,12 @@
+from datetime import timedelta
 from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
 
-from payments.models import ModoToken
+from payments.models import ModoToken, WebhookMessage
 from payments.tests.utils import mock_token
 
 # Remember: patch the func where its used not where its defined
@@ -19,3 +21,21 @@ class FetchModoTokenTests(TestCase):
         call_command("fetch_modo_token", stdout=out)
         self.assertIn("token fetch successful", out.getvalue())
         self.assertTrue(ModoToken.objects.exists())
+
+
+class PruneWebhookMessagesTests(TestCase):
+    def test_old_messages_are_deleted_in_batches(self):
+        now = timezone.now()
+
+        for days in (10, 9, 8, 1):
+            WebhookMessage.objects.create(
+                provider=WebhookMessage.STRIPE,
+                received_at=now - timedelta(days=days),
+                payload={},
+            )
+
+        out = StringIO()
+        call_command("prune_webhook_messages", batch_size=2, stdout=out)
+
+        self.assertIn("Webhook messages deleted:3", out.getvalue())
+        self.assertEqual(WebhookMessage.objects.count(), 1)
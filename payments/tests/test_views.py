@@ -1,15 +1,19 @@
 import uuid
 from http import HTTPStatus
+from io import StringIO
 from unittest.mock import patch
 
 from django.conf import settings
 from django.contrib.messages import get_messages
 from django.core import mail
-from django.test import Client, SimpleTestCase, TestCase
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
 from django.urls import resolve, reverse
 from django.utils import translation
 
+from base.models import Job
 from orders.factories import OrderFactory, OrderItemFactory, PassengerFactory
+from orders.models import Order
 from payments.models import ModoToken, WebhookMessage
 from payments.views import (
     ModoView,
@@ -204,6 +208,11 @@ class MercadoPagoSuccessView(TestCase):
         self.assertRedirects(response, reverse("payments:success"), HTTPStatus.FOUND)
         self.assertTemplateUsed(response, PaymentSuccessView.template_name)
 
+        # the order is confirmed and its tickets sent by the job and email workers
+        self.assertFalse(Order.objects.get(pk=self.order.pk).paid)
+        call_command("run_jobs", stdout=StringIO())
+        call_command("send_emails", stdout=StringIO())
+
         self.order.refresh_from_db()
         self.seats[0].refresh_from_db()
         self.seats[1].refresh_from_db()
@@ -287,6 +296,25 @@ class MercadoPagoSuccessView(TestCase):
         self.assertEqual(msg.provider, WebhookMessage.MERCADOPAGO)
         self.assertEqual(msg.payload, data)
 
+    def test_payment_redirected_twice_is_processed_once(self):
+        data = {
+            "collection_id": "54650347595",
+            "payment_id": "54650347595",
+            "status": "approved",
+            "external_reference": str(self.order.id),
+        }
+
+        self.client.get(self.url, data=data)
+        self.client.get(self.url, data=data)
+
+        self.assertEqual(WebhookMessage.objects.count(), 1)
+
+        call_command("run_jobs", stdout=StringIO())
+
+        message = WebhookMessage.objects.get()
+        self.assertIsNotNone(message.processed_at)
+        self.assertTrue(Order.objects.get(pk=self.order.pk).paid)
+
 
 class PaymentSuccessViewTests(TestCase):
     """Test suite for payment success view"""
@@ -639,3 +667,54 @@ class MercadoPagoWebhookTests(TestCase):
         self.assertEqual(
             response.content.decode(), "Incorrect token in MP webhook header."
         )
+
+
+@override_settings(STRIPE_WEBHOOK_SIGNING_SECRET="secret")
+class StripeWebhookTests(TestCase):
+    """Stripe events are stored once and processed by the job workers"""
+
+    def setUp(self):
+        self.url = reverse("payments:stripe-webhook")
+        self.order = OrderFactory(paid=False, payment_id="")
+        OrderItemFactory(order=self.order)
+
+        self.event = {
+            "id": "evt_1",
+            "type": "checkout.session.completed",
+            "data": {
+                "object": {
+                    "client_reference_id": str(self.order.id),
+                    "payment_intent": "pi_1",
+                }
+            },
+        }
+
+    def post(self):
+        with patch("stripe.Webhook.construct_event", return_value=self.event):
+            return self.client.post(
+                self.url,
+                data="{}",
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="t=1",
+            )
+
+    def test_event_is_only_stored_on_receipt(self):
+        response = self.post()
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(WebhookMessage.objects.get().event_id, "evt_1")
+        self.assertFalse(Order.objects.get(pk=self.order.pk).paid)
+
+    def test_retried_event_is_processed_once(self):
+        self.post()
+        self.post()
+
+        self.assertEqual(WebhookMessage.objects.count(), 1)
+        self.assertEqual(Job.objects.count(), 1)
+
+        call_command("run_jobs", stdout=StringIO())
+
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.paid)
+        self.assertEqual(self.order.payment_id, "pi_1")
+        self.assertIsNotNone(WebhookMessage.objects.get().processed_at)
@@ -2,7 +2,6 @@ import hashlib
 import hmac
 import json
 import logging
-from datetime import timedelta
 from http import HTTPStatus
 from typing import Any, Dict
 
@@ -12,7 +11,6 @@ from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbid
 from django.shortcuts import get_object_or_404, redirect
 from django.templatetags.static import static
 from django.urls import reverse_lazy
-from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
@@ -22,7 +20,6 @@ import mercadopago
 import stripe
 
 from orders.models import Order
-from orders.services import order_confirmed
 
 from .models import WebhookMessage
 from .modo import create_payment_intent
@@ -294,19 +291,12 @@ def stripe_webhook(request):
         logger.info("Stripe:Payment confirmed!")
         logger.info("Stripe:Webhook event(💶): %s", event)
 
-        last_week = timezone.now() - timedelta(days=7)
-        WebhookMessage.objects.filter(received_at__lte=last_week).delete()
-
-        WebhookMessage.objects.create(
-            provider=WebhookMessage.STRIPE,
-            received_at=timezone.now(),
-            payload=event,
+        # Stored and acknowledged right away, the order is confirmed by the job
+        # workers. Stripe retries of the same event are only acknowledged.
+        WebhookMessage.objects.receive(
+            provider=WebhookMessage.STRIPE, event_id=event["id"], payload=event
         )
 
-        order_id = event.data.object.client_reference_id
-        payment_id = event.data.object.payment_intent
-        order_confirmed(order_id=order_id, payment_id=payment_id)
-
     return HttpResponse(
         "Message received okay.", content_type="text/plain", status=HTTPStatus.OK
     )
@@ -344,15 +334,12 @@ def mercadopago_webhook(request):
         )
 
     payload = json.loads(request.body)
+    notification_id = payload.get("id")
 
-    # Remove webhook messages more than 1 week old
-    last_week = timezone.now() - timedelta(days=7)
-    WebhookMessage.objects.filter(received_at__lte=last_week).delete()
-
-    # Save webhook message to DB
-    WebhookMessage.objects.create(
+    # Save webhook message to DB, once per notification
+    WebhookMessage.objects.receive(
         provider=WebhookMessage.MERCADOPAGO,
-        received_at=timezone.now(),
+        event_id=f"notification:{notification_id}" if notification_id else None,
         payload=payload,
     )
 
@@ -392,21 +379,17 @@ def mercadopago_success(request):
 
     logger.info("mercado pago says(🤝):%s" % mp_response)
 
-    # Remove webhook messages more than 1 week old
-    last_week = timezone.now() - timedelta(days=7)
-    WebhookMessage.objects.filter(received_at__lte=last_week).delete()
-
-    # Save webhook message to DB irrespective of status
-    WebhookMessage.objects.create(
+    # Save webhook message to DB irrespective of status, once per payment. Approved
+    # payments are confirmed by the job workers, see `payments.services`.
+    WebhookMessage.objects.receive(
         provider=WebhookMessage.MERCADOPAGO,
-        received_at=timezone.now(),
+        event_id=f"payment:{payment_id}" if payment_id else None,
         payload=mp_response,
     )
 
     # TODO: confirm order in webhook instead of this view for security.
     if (status == "approved") and order_id:
         logger.info("mercadopago(🤝) payment successful!!!")
-        order_confirmed(order_id=order_id, payment_id=payment_id)
         return redirect(reverse_lazy("payments:success"))
 
     return redirect(reverse_lazy("payments:fail"))
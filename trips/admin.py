@@ -3,13 +3,13 @@ from datetime import date, timedelta
 from typing import Any
 
 from django.contrib import admin
-from django.db.models import Count, Q, QuerySet
+from django.db.models import QuerySet
 from django.http import HttpRequest
 from django.urls import reverse_lazy
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
-from .models import Location, Price, Route, Seat, Stop, Trip
+from .models import Location, Price, Route, Stop, Trip
 
 logger = logging.getLogger(__name__)
 
@@ -82,12 +82,13 @@ class PassengerSeatInline(admin.TabularInline):
     extra = 0
     can_delete = False
     classes = ("collapse",)
-    fields = ("seat_number", "passenger", "seat_status", "seat_type")
+    fields = ("seat_number", "passenger", "seat_status", "seat_type", "held_until")
     readonly_fields = (
         "seat_number",
         # "seat_status",
         "passenger",
         "seat_type",
+        "held_until",
     )
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Any]:
@@ -141,13 +142,12 @@ class TripAdmin(admin.ModelAdmin):
     def get_queryset(self, request: HttpRequest) -> QuerySet[Any]:
         qs = super().get_queryset(request)
         qs = qs.select_related("route", "origin", "destination", "company")
-        _availability = Count("seats", filter=Q(seats__seat_status=Seat.AVAILABLE))
-        qs = qs.annotate(_availability=_availability)
 
         return qs
 
+    @admin.display(ordering="available_count")
     def availability(self, obj):
-        return obj._availability
+        return obj.available_count
 
 
 class StopInline(admin.TabularInline):
@@ -0,0 +1,206 @@
+"""
+In-process autocomplete for locations (bus terminals) used by the search form.
+
+The index is built from all the locations once per worker and answers lookups from
+memory:
+    - accents and case are folded so "cordoba" finds "Córdoba"
+    - every word of a query must be a prefix of some word of the location
+    - typos fall back to trigram similarity
+    - important locations rank first
+
+The index is built from the cached locations (see `LocationManager`) and rebuilt
+along with them whenever a location changes.
+"""
+
+import logging
+import unicodedata
+from collections import Counter
+
+from trips.models import Location
+from trips.terminals import IMP_LOCATIONS
+
+logger = logging.getLogger(__name__)
+
+# Fraction of the query trigrams a location must share to be a fuzzy match
+MIN_SIMILARITY = 0.5
+
+
+def fold(text: str) -> str:
+    """Lowercase, strip accents and replace punctuation with spaces"""
+
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+    return "".join(c if c.isalnum() else " " for c in text)
+
+
+def trigrams(text: str) -> set[str]:
+    text = f"  {text} "
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class Entry:
+    __slots__ = ("label", "value")
+
+    def __init__(self, label, value):
+        self.label = label
+        self.value = value
+
+    def to_dict(self):
+        return {"label": self.label, "value": self.value}
+
+
+class TrieNode:
+    """Ids of the entries having a word with this prefix, best ranked first"""
+
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = []
+
+
+class Trie:
+    def __init__(self):
+        self.root = TrieNode()
+
+    def insert(self, word, id):
+        node = self.root
+        for char in word:
+            node = node.children.setdefault(char, TrieNode())
+            if not node.ids or node.ids[-1] != id:
+                node.ids.append(id)
+
+    def find(self, prefix) -> list[int]:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.ids
+
+
+class LocationIndex:
+    """
+    Immutable index over a list of locations.
+
+    Entries are sorted by rank once so that an entry's id is also its rank and
+    lookups never have to sort all the matches.
+    """
+
+    def __init__(self, locations, version=None):
+        boost = {abbr: i for i, abbr in enumerate(IMP_LOCATIONS)}
+        locations = sorted(
+            locations, key=lambda x: (boost.get(x.abbr, len(boost)), fold(x.name))
+        )
+
+        self.version = version
+        self.entries = []
+        self.abbrs = {}
+
+        # Words a location starts with and all the words describing it
+        self.heads = Trie()
+        self.words = Trie()
+
+        self.trigrams = {}
+
+        for id, x in enumerate(locations):
+            label = f"({x.abbr}) {x.name} ({x.state}) ({x.country.name})"
+            self.entries.append(Entry(label=label, value=x.abbr))
+
+            name = fold(x.name)
+            abbr = fold(x.abbr).strip()
+            self.abbrs[abbr] = id
+
+            for word in name.split()[:1] + [abbr]:
+                self.heads.insert(word, id)
+
+            words = f"{name} {abbr} {fold(x.city)} {fold(x.state)}".split()
+            for word in sorted(set(words)):
+                self.words.insert(word, id)
+
+            for trigram in trigrams(name):
+                self.trigrams.setdefault(trigram, []).append(id)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, q, limit=10) -> list[Entry]:
+        words = fold(q).split()
+
+        if not words:
+            ids = range(min(limit, len(self.entries)))
+        elif len(words) == 1:
+            ids = self.match_word(words[0], limit)
+        else:
+            ids = self.match_words(words, limit)
+
+        ids = list(ids)
+        if len(ids) < limit:
+            ids += self.match_fuzzy(" ".join(words), limit - len(ids), exclude=ids)
+
+        return [self.entries[id] for id in ids]
+
+    def match_word(self, word, limit) -> list[int]:
+        """Exact abbr first, then locations starting with the word, then the rest"""
+
+        ids = {}
+
+        if word in self.abbrs:
+            ids[self.abbrs[word]] = None
+
+        for trie in (self.heads, self.words):
+            for id in trie.find(word):
+                if len(ids) >= limit:
+                    break
+                ids.setdefault(id)
+
+        return list(ids)[:limit]
+
+    def match_words(self, words, limit) -> list[int]:
+        """Locations where every word of the query prefixes one of its words"""
+
+        matches = sorted((self.words.find(word) for word in words), key=len)
+        ids = set(matches[0]).intersection(*matches[1:])
+
+        return sorted(ids)[:limit]
+
+    def match_fuzzy(self, text, limit, exclude=()) -> list[int]:
+        """Locations sharing most of the trigrams of the query"""
+
+        if not limit or len(text) < 3:
+            return []
+
+        grams = trigrams(text)
+
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.trigrams.get(gram, ()))
+
+        for id in exclude:
+            shared.pop(id, None)
+
+        threshold = MIN_SIMILARITY * len(grams)
+        ids = [id for id, count in shared.items() if count >= threshold]
+
+        return sorted(ids, key=lambda id: (-shared[id], id))[:limit]
+
+
+_index = None
+
+
+def get_index() -> LocationIndex:
+    """The index of this worker, rebuilt whenever the cached locations are"""
+
+    global _index
+
+    snapshot = Location.objects.get_snapshot()
+    if _index is None or _index.version is not snapshot:
+        logger.info("building location autocomplete index(🔤)...")
+        _index = LocationIndex(snapshot.locations, version=snapshot)
+
+    return _index
+
+
+def search(q, limit=10) -> list[dict]:
+    return [entry.to_dict() for entry in get_index().search(q, limit=limit)]
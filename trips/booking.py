@@ -0,0 +1,113 @@
+"""
+Value objects for booking the seats of one or more trips in a single go, see
+`SeatManager.book`.
+"""
+
+
+class SeatBooking:
+    """
+    Seats of a trip to book for the legs `legs`, one per passenger, on behalf of
+    `order` whose holds on the seats (if any) are turned into the booking.
+    """
+
+    __slots__ = ("trip", "seat_numbers", "passengers", "legs", "order")
+
+    def __init__(self, trip, seat_numbers, passengers, legs, order=None):
+        self.trip = trip
+        self.seat_numbers = sorted(int(number) for number in seat_numbers)
+        self.passengers = list(passengers)
+        self.legs = legs
+        self.order = order
+
+    def __repr__(self):
+        return f"<SeatBooking {self.trip} seats:{self.seat_numbers}>"
+
+    def __iter__(self):
+        """Seats are allotted to the passengers in order of seat number"""
+        return zip(self.seat_numbers, self.passengers)
+
+
+class SeatConflict:
+    """A seat that could not be booked"""
+
+    MISSING = "missing"
+    TAKEN = "taken"
+    LOCKED = "locked"  # <-- being taken by someone else right now
+
+    __slots__ = ("trip", "seat_number", "reason")
+
+    def __init__(self, trip, seat_number, reason):
+        self.trip = trip
+        self.seat_number = seat_number
+        self.reason = reason
+
+    def __repr__(self):
+        return f"<SeatConflict {self.trip} seat:{self.seat_number} {self.reason}>"
+
+    def __str__(self):
+        return f"seat {self.seat_number} of {self.trip} is {self.reason}"
+
+
+class BookingResult:
+    """
+    The seats booked and the conflicts found. Bookings are all or nothing so no
+    seats are booked when there are conflicts.
+
+    Iterating over it gives the booked seats.
+    """
+
+    __slots__ = ("seats", "conflicts")
+
+    def __init__(self, seats=None, conflicts=None):
+        self.seats = seats or []
+        self.conflicts = conflicts or []
+
+    def __repr__(self):
+        return f"<BookingResult seats:{len(self.seats)} conflicts:{self.conflicts}>"
+
+    def __iter__(self):
+        return iter(self.seats)
+
+    def __len__(self):
+        return len(self.seats)
+
+    @property
+    def ok(self) -> bool:
+        return not self.conflicts
+
+
+class HoldResult:
+    """
+    The seats held out of the ones requested along with the conflicts for those
+    that couldn't be held. Seats held instead of the conflicting ones (when asked
+    to fall back to the nearest free seats) are the `substitutes`.
+    """
+
+    __slots__ = ("requested", "seats", "conflicts")
+
+    def __init__(self, requested, seats=None, conflicts=None):
+        self.requested = requested
+        self.seats = seats or []
+        self.conflicts = conflicts or []
+
+    def __repr__(self):
+        return f"<HoldResult seats:{self.seat_numbers} conflicts:{self.conflicts}>"
+
+    def __iter__(self):
+        return iter(self.seats)
+
+    def __len__(self):
+        return len(self.seats)
+
+    @property
+    def seat_numbers(self) -> list[int]:
+        return sorted(seat.seat_number for seat in self.seats)
+
+    @property
+    def substitutes(self) -> list:
+        return [seat for seat in self.seats if seat.seat_number not in self.requested]
+
+    @property
+    def ok(self) -> bool:
+        """As many seats as requested were held"""
+        return len(self.seats) == len(self.requested)
@@ -0,0 +1,180 @@
+"""
+Cache for trip search results.
+
+Results are keyed on the search query and a stamp of the inventory of all the trips
+stopping on that date. Any change to the seats, trips or prices of that date moves
+the stamp, so stale results are never read again and simply expire. Holds expiring
+don't move the stamp, results expire along with the first hold on their seats.
+
+Only plain values are cached (the trip ids with their availability and fare) and
+the trips are read again by id, which is cheap next to the search itself.
+"""
+
+import hashlib
+import logging
+import math
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from trips.managers import day_bounds
+from trips.models import Seat, Trip, TripStop
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE = "search"
+
+HITS_KEY = "trips:search:hits"
+MISSES_KEY = "trips:search:misses"
+
+# Heavy fields the search results page never shows
+DEFERRED_FIELDS = ("description", "route__description", "company__description")
+
+
+def get_search_cache():
+    return caches[SEARCH_CACHE]
+
+
+def get_inventory_stamp(departure) -> str:
+    """
+    Cheap fingerprint of all the trips stopping on a date. It changes when a trip is
+    added, removed or edited or when any of their seats change.
+    """
+
+    day_start, day_end = day_bounds(departure)
+    stops = TripStop.objects.filter(departure__gte=day_start, departure__lt=day_end)
+
+    stamp = Trip.objects.filter(pk__in=stops.values("trip")).aggregate(
+        trips=Count("id"),
+        version=Sum("inventory_version"),
+        updated=Max("updated_on"),
+    )
+
+    return "%(trips)s:%(version)s:%(updated)s" % stamp
+
+
+def get_search_key(origin, destination, departure, company_slug=None, ordering=None):
+    stamp = get_inventory_stamp(departure)
+    query = f"{origin.pk}:{destination.pk}:{departure}:{company_slug}:{ordering}"
+
+    digest = hashlib.md5(f"{query}:{stamp}".encode(), usedforsecurity=False)
+    return "trips:search:%s" % digest.hexdigest()
+
+
+def count(key):
+    """Increment a counter shared by all the workers using the cache"""
+
+    cache = get_search_cache()
+    cache.add(key, 0, timeout=None)
+
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Counter was evicted in between
+        return 0
+
+
+def get_stats() -> dict:
+    cache = get_search_cache()
+    hits, misses = cache.get(HITS_KEY, 0), cache.get(MISSES_KEY, 0)
+    total = hits + misses
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "ratio": hits / total if total else 0,
+    }
+
+
+def reset_stats():
+    get_search_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def get_timeout(trips):
+    """Seconds until the first hold on the seats of some trips expires, if any"""
+
+    expiry = Seat.objects.filter(trip__in=trips, held_until__gt=Now()).aggregate(
+        first=Min("held_until")
+    )["first"]
+
+    if expiry is None:
+        return DEFAULT_TIMEOUT
+
+    timeout = math.ceil((expiry - timezone.now()).total_seconds())
+    default = get_search_cache().default_timeout
+
+    return timeout if default is None else min(timeout, default)
+
+
+def get_trips(results) -> list[Trip]:
+    """The trips of cached results, in the same order and annotated the same way"""
+
+    # Trips keep departing while the results are cached
+    results = [x for x in results if x["departure"] > timezone.now()]
+
+    qs = Trip.objects.select_related("company", "route", "origin", "destination")
+    trips = qs.defer(*DEFERRED_FIELDS).in_bulk([x["id"] for x in results])
+
+    found = []
+
+    for result in results:
+        trip = trips.get(result["id"])
+        if trip is None:
+            continue
+
+        trip.availability, trip.fare = result["availability"], result["fare"]
+        found.append(trip)
+
+    return found
+
+
+def search(origin, destination, departure, company_slug=None, ordering=None):
+    """
+    Same as `Trip.future.search` but the results come from the cache whenever
+    the inventory for that date has not changed since.
+
+    Returns a list of trips (annotated with availability) instead of a queryset.
+    """
+
+    cache = get_search_cache()
+    key = get_search_key(origin, destination, departure, company_slug, ordering)
+
+    results = cache.get(key)
+
+    if results is None:
+        logger.info("search cache miss(🐢)...")
+        count(MISSES_KEY)
+
+        qs = Trip.future.search(
+            origin=origin,
+            destination=destination,
+            departure=departure,
+            company_slug=company_slug,
+            ordering=ordering,
+        )
+        trips = list(qs.defer(*DEFERRED_FIELDS))
+
+        results = [
+            {
+                "id": trip.pk,
+                "departure": trip.departure,
+                "availability": trip.availability,
+                "fare": trip.fare,
+            }
+            for trip in trips
+        ]
+        cache.set(key, results, get_timeout(trips))
+    else:
+        logger.info("search cache hit(🐇)...")
+        count(HITS_KEY)
+
+        trips = get_trips(results)
+
+    # The results page doesn't have to look the fares up per trip
+    for trip in trips:
+        trip.set_fare(origin, destination, trip.fare)
+
+    return [trip for trip in trips if trip.is_active]
@@ -0,0 +1,230 @@
+"""
+Server-sent events for trip changes: seats taken or released and trip updates.
+
+Changes are published by the (sync) code that makes them and only once their
+transaction commits. The ASGI workers fan them out to the streams they hold open,
+which cost an idle coroutine each instead of a worker:
+    - "local": in-process pub/sub for tests and a single process (runserver)
+    - "postgres": NOTIFY on commit and a single LISTEN connection per worker
+
+Events carry just enough to tell what changed. Seat maps fetch the taken seats
+again from `trips:trip-seats`, which is a cheap conditional GET.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.http import StreamingHttpResponse
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+logger = logging.getLogger(__name__)
+
+LOCAL = "local"
+POSTGRES = "postgres"
+
+CHANNEL = "trip_events"
+
+# Seconds between comments keeping idle streams (and proxies) from timing out
+KEEPALIVE = 15
+
+# Milliseconds browsers wait before reconnecting a dropped stream
+RETRY = 5000
+
+# Events a slow stream can fall behind before newer ones are dropped
+QUEUE_SIZE = 100
+
+SEATS = "seats"
+TRIP = "trip"
+
+
+def trip_topic(trip_id) -> str:
+    return f"trip:{trip_id}"
+
+
+def company_topic(company_id) -> str:
+    return f"company:{company_id}"
+
+
+def publish(event, trip_id, company_id=None, **data):
+    """Publish an event about a trip once the current transaction commits"""
+
+    payload = {
+        "event": event,
+        "trip": str(trip_id),
+        "company": str(company_id) if company_id else None,
+        **data,
+    }
+
+    if settings.TRIP_EVENTS_BACKEND == POSTGRES:
+        # Notifications are only delivered on commit
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, json.dumps(payload)])
+    else:
+        transaction.on_commit(partial(broker.dispatch, payload))
+
+
+class Subscription:
+    """Queue of the events of some topics for a single stream"""
+
+    __slots__ = ("topics", "queue", "loop")
+
+    def __init__(self, topics):
+        self.topics = topics
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.loop = asyncio.get_running_loop()
+
+    def put(self, event):
+        """Can be called from any thread"""
+        self.loop.call_soon_threadsafe(self.put_nowait, event)
+
+    def put_nowait(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("dropping event(📭):%s..." % event)
+
+    async def get(self, timeout=None) -> dict:
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Broker:
+    """The subscriptions of this process by topic"""
+
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+
+    def __len__(self):
+        return len(set().union(*self.subscriptions.values()))
+
+    def subscribe(self, *topics) -> Subscription:
+        subscription = Subscription(topics)
+
+        for topic in topics:
+            self.subscriptions[topic].add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        for topic in subscription.topics:
+            self.subscriptions[topic].discard(subscription)
+
+            if not self.subscriptions[topic]:
+                del self.subscriptions[topic]
+
+    def dispatch(self, event):
+        topics = [trip_topic(event["trip"])]
+        if event.get("company"):
+            topics.append(company_topic(event["company"]))
+
+        for topic in topics:
+            for subscription in list(self.subscriptions.get(topic, ())):
+                subscription.put(event)
+
+
+class PostgresListener:
+    """
+    A connection of its own LISTENing for the events published by any process
+    and dispatching them to the broker from the event loop.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.conn = None
+        self.loop = None
+
+    def start(self, loop):
+        logger.info("listening to trip events(👂)...")
+
+        params = connections["default"].get_connection_params()
+
+        self.loop = loop
+        self.conn = psycopg2.connect(**params)
+        self.conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+
+        loop.add_reader(self.conn.fileno(), self.receive)
+
+    def ensure_started(self):
+        loop = asyncio.get_running_loop()
+
+        if self.conn is None or self.conn.closed or self.loop is not loop:
+            self.stop()
+            self.start(loop)
+
+    def stop(self):
+        if self.conn is None:
+            return
+
+        if not self.loop.is_closed():
+            self.loop.remove_reader(self.conn.fileno())
+
+        self.conn.close()
+        self.conn = None
+
+    def receive(self):
+        try:
+            self.conn.poll()
+        except Exception as e:
+            logger.error("lost trip events connection(💔):%s..." % e)
+            self.stop()
+            return
+
+        while self.conn.notifies:
+            notify = self.conn.notifies.pop(0)
+            self.broker.dispatch(json.loads(notify.payload))
+
+
+broker = Broker()
+listener = PostgresListener(broker)
+
+
+def subscribe(*topics) -> Subscription:
+    if settings.TRIP_EVENTS_BACKEND == POSTGRES:
+        listener.ensure_started()
+
+    return broker.subscribe(*topics)
+
+
+def format_event(event) -> str:
+    return "event: %s\ndata: %s\n\n" % (event["event"], json.dumps(event))
+
+
+async def stream(*topics):
+    """Server-sent events for the topics until the client goes away"""
+
+    subscription = subscribe(*topics)
+    logger.info("streaming events(📡):%s..." % (topics,))
+
+    try:
+        yield "retry: %s\n\n" % RETRY
+
+        while True:
+            try:
+                event = await subscription.get(timeout=KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+class EventStreamResponse(StreamingHttpResponse):
+    """Needs the ASGI app, sync workers would be tied up by every stream"""
+
+    def __init__(self, streaming_content, *args, **kwargs):
+        kwargs.setdefault("content_type", "text/event-stream")
+        super().__init__(streaming_content, *args, **kwargs)
+
+        self.headers["Cache-Control"] = "no-cache"
+        self.headers["X-Accel-Buffering"] = "no"  # <-- nginx buffering
@@ -6,7 +6,6 @@ from django import forms
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.http.request import QueryDict
-from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -58,7 +57,7 @@ class TripSearchForm:
         if isinstance(origin, list):
             origin = origin[0]
 
-        return get_object_or_404(Location, abbr__iexact=origin)
+        return Location.objects.get_cached_or_404(abbr=origin)
 
     def clean_destination(self):
         """Only allow destinations present in our database"""
@@ -68,7 +67,7 @@ class TripSearchForm:
         if isinstance(destination, list):
             destination = destination[0]
 
-        return get_object_or_404(Location, abbr__iexact=destination)
+        return Location.objects.get_cached_or_404(abbr=destination)
 
     def clean_departure(self):
         """
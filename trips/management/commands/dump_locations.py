@@ -6,11 +6,10 @@ from django.core.management.base import BaseCommand
 from django.db.models import Value
 
 from trips.models import Location
+from trips.terminals import IMP_LOCATIONS
 
 logger = logging.getLogger(__name__)
 
-IMP_LOCATIONS = ["BUE", "DELE", "ROS", "MDP", "CBA", "MZA", "IGU", "SFE", "POS"]
-
 
 class Command(BaseCommand):
     """
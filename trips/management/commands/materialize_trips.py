@@ -0,0 +1,104 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from timeit import default_timer as timer
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from trips.models import Route
+
+
+def materialize_company(company_id, days) -> tuple[int | None, int, list[str]]:
+    """
+    Materialize the trips of all the active routes of a company. Routes that fail
+    are left out and their errors returned.
+    """
+
+    created, errors = 0, []
+
+    for route in Route.objects.filter(company_id=company_id, active=True):
+        try:
+            created += len(route.materialize_trips(days=days))
+        except ValidationError as e:
+            errors.extend(e.messages)
+
+    return company_id, created, errors
+
+
+class Command(BaseCommand):
+    """
+    Keep the trips of all the active routes materialized a number of days ahead.
+
+    Meant to be run daily by a scheduler (cron, systemd timer...). Only the missing
+    departures are created and every route is committed on its own so the command
+    can be run again at any time, e.g. after being interrupted.
+    """
+
+    help = "Creates the missing trips of active routes for the next days"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "-d",
+            "--days",
+            type=int,
+            default=30,
+            help="Number of days ahead to keep materialized. Defaults to 30.",
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes working on different companies at once.",
+        )
+        parser.add_argument(
+            "-c",
+            "--company",
+            action="append",
+            help="Slug of a company to materialize. Defaults to all.",
+        )
+
+    def handle(self, *args, **kwargs):
+        start = timer()
+
+        days, workers = kwargs["days"], kwargs["workers"]
+
+        routes = Route.objects.filter(active=True)
+        if kwargs["company"]:
+            routes = routes.filter(company__slug__in=kwargs["company"])
+
+        companies = list(routes.values_list("company", flat=True).distinct())
+
+        self.stdout.write("Companies:%s" % len(companies))
+        self.stdout.write("Materializing %s days ahead..." % days)
+
+        if workers > 1:
+            # Forked workers must open their own DB connections
+            connections.close_all()
+
+            with ProcessPoolExecutor(workers, mp_context=get_context("fork")) as pool:
+                results = list(
+                    pool.map(materialize_company, companies, [days] * len(companies))
+                )
+        else:
+            results = [materialize_company(company, days) for company in companies]
+
+        total, failed = 0, []
+        for company_id, created, errors in results:
+            self.stdout.write("company:%s trips created:%s" % (company_id, created))
+            total += created
+
+            for error in errors:
+                self.stderr.write("company:%s %s" % (company_id, error))
+            failed += errors
+
+        end = timer()
+
+        self.stdout.write("Trips created:%s" % total)
+        self.stdout.write("took:%0.2f seconds." % (end - start))
+
+        if failed:
+            raise CommandError("Routes not materialized:%s" % len(failed))
+
+        self.stdout.write("All done!")
@@ -0,0 +1,86 @@
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from trips.models import Seat, Trip
+
+
+def count_seats(*statuses):
+    """Subquery counting the seats of the outer trip in any of these statuses"""
+
+    qs = Seat.objects.filter(trip=OuterRef("pk"), seat_status__in=statuses)
+    qs = qs.order_by().values("trip").annotate(total=Count("pk")).values("total")
+
+    return Coalesce(Subquery(qs, output_field=IntegerField()), Value(0))
+
+
+class Command(BaseCommand):
+    """
+    Recalculate the denormalized seat counters of trips from their seats in case
+    they drift.
+    """
+
+    help = "Rebuilds the available, held and booked seat counters of trips"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild past trips as well. By default only future trips.",
+        )
+
+    def handle(self, *args, **kwargs):
+        start = timer()
+
+        qs = Trip.objects.all() if kwargs["all"] else Trip.future.all()
+
+        # Lazy trips don't store the seats that were never taken
+        available = Case(
+            When(
+                capacity__gt=0,
+                then=F("capacity")
+                - count_seats(Seat.ONHOLD, Seat.BOOKED, Seat.RESERVED),
+            ),
+            default=count_seats(Seat.AVAILABLE),
+        )
+
+        qs = qs.annotate(
+            new_available=available,
+            new_held=count_seats(Seat.ONHOLD),
+            new_booked=count_seats(Seat.BOOKED, Seat.RESERVED),
+        )
+
+        # Cached searches and seat maps go by the inventory version, so only the
+        # trips that drifted are written and their version bumped
+        drifted = qs.exclude(
+            available_count=F("new_available"),
+            held_count=F("new_held"),
+            booked_count=F("new_booked"),
+        )
+
+        # Single UPDATE with one correlated subquery per counter
+        updated = drifted.update(
+            available_count=F("new_available"),
+            held_count=F("new_held"),
+            booked_count=F("new_booked"),
+            inventory_version=F("inventory_version") + 1,
+            updated_on=timezone.now(),
+        )
+
+        end = timer()
+
+        self.stdout.write("Trips updated:%s" % updated)
+        self.stdout.write("took:%0.2f seconds." % (end - start))
+        self.stdout.write("All done!")
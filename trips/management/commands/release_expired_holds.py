@@ -0,0 +1,67 @@
+import time
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+
+from trips.models import Seat
+
+
+class Command(BaseCommand):
+    """
+    Release the seats held by orders that were never paid once their hold expires.
+
+    Run it from a scheduler or keep it running with `--loop`. Several instances can
+    run at once as seats locked by another one are skipped.
+    """
+
+    help = "Releases seats whose hold has expired"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of seats released per transaction. Defaults to 500.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and release holds as they expire.",
+        )
+        parser.add_argument(
+            "-i",
+            "--interval",
+            type=float,
+            default=30,
+            help="Seconds to sleep between runs with --loop. Defaults to 30.",
+        )
+
+    def release(self, batch_size) -> int:
+        total = 0
+
+        while released := Seat.objects.release_expired_holds(batch_size=batch_size):
+            total += released
+
+            if released < batch_size:
+                break
+
+        return total
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs["batch_size"]
+
+        while True:
+            start = timer()
+            released = self.release(batch_size)
+            end = timer()
+
+            self.stdout.write("Seats released:%s" % released)
+            self.stdout.write("took:%0.2f seconds." % (end - start))
+
+            if not kwargs["loop"]:
+                break
+
+            time.sleep(kwargs["interval"])
+
+        self.stdout.write("All done!")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from trips import cache as search_cache
+
+
+class Command(BaseCommand):
+    """
+    Show how well the trip search cache is doing across all the workers.
+    """
+
+    help = "Shows the hits and misses of the trip search cache"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counters after showing them.",
+        )
+
+    def handle(self, *args, **kwargs):
+        stats = search_cache.get_stats()
+
+        self.stdout.write("Hits:%(hits)s" % stats)
+        self.stdout.write("Misses:%(misses)s" % stats)
+        self.stdout.write("Hit ratio:%0.2f%%" % (100 * stats["ratio"]))
+
+        if kwargs["reset"]:
+            search_cache.reset_stats()
+            self.stdout.write("Counters reset.")
+
+        self.stdout.write("All done!")
@@ -0,0 +1,209 @@
+"""
+Stress test for seat holds under contention, e.g. a flash sale of a popular
+departure.
+
+Creates a throwaway trip and lets many threads (each with its own DB connection)
+race to hold random seats of it at the same time. Fails if any seat ends up held
+by more than one of them.
+"""
+
+import random
+import string
+import threading
+import traceback
+from collections import Counter
+from datetime import timedelta as td
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from companies.models import Company
+from trips.models import Location, Route, Seat, Stop, Trip
+
+
+class Command(BaseCommand):
+    help = "Checks that concurrent seat holds never allocate a seat twice"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "-t",
+            "--threads",
+            type=int,
+            default=20,
+            help="Number of concurrent users. Defaults to 20.",
+        )
+        parser.add_argument(
+            "-s",
+            "--seats",
+            type=int,
+            default=40,
+            help="Number of seats of the trip. Defaults to 40.",
+        )
+        parser.add_argument(
+            "-p",
+            "--per-user",
+            type=int,
+            default=2,
+            help="Number of seats every user tries to hold. Defaults to 2.",
+        )
+        parser.add_argument(
+            "--fallback",
+            action="store_true",
+            help="Hold the nearest free seats when the requested ones are taken.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the trip used for the test instead of deleting it.",
+        )
+
+    def create_trip(self, seats) -> Trip:
+        """A throwaway trip departing tomorrow with three stops"""
+
+        tag = get_random_string(4, allowed_chars=string.ascii_lowercase + string.digits)
+
+        company = Company.objects.create(
+            name=f"Stress test {tag}",
+            slug=f"stress-test-{tag}",
+            address="-",
+            phone="-",
+            email=f"stress-test-{tag}@example.com",
+        )
+        locations = [
+            Location.objects.create(name=f"Stress test {tag} {n}", abbr=f"st{tag}{n}")
+            for n in range(3)
+        ]
+
+        route = Route.objects.create(
+            company=company,
+            name=f"{locations[0]} - {locations[-1]}",
+            origin=locations[0],
+            destination=locations[-1],
+        )
+
+        tomorrow = timezone.now() + td(days=1)
+        stops = [
+            Stop.objects.create(
+                route=route,
+                name=location,
+                arrival=tomorrow + td(hours=n),
+                departure=tomorrow + td(hours=n, minutes=10),
+            )
+            for n, location in enumerate(locations)
+        ]
+
+        trip = Trip.objects.create(
+            route=route,
+            company=company,
+            name=route.name,
+            origin=route.origin,
+            destination=route.destination,
+            departure=stops[0].departure,
+            arrival=stops[-1].arrival,
+            status=Trip.ACTIVE,
+            schedule=route.get_schedule_for_date(tomorrow.date()),
+        )
+        trip.create_seats(*range(1, seats + 1))
+
+        return trip
+
+    def user(self, trip_id, options, barrier, results, errors):
+        """A user retrying to hold seats until they get them or the trip is full"""
+
+        try:
+            trip = Trip.objects.get(pk=trip_id)
+            attempts = 0
+            barrier.wait()
+
+            while True:
+                numbers = random.sample(
+                    range(1, options["seats"] + 1), options["per_user"]
+                )
+                held = trip.try_hold_seats(
+                    ",".join(map(str, numbers)), fallback=options["fallback"]
+                )
+                attempts += 1
+
+                if held.ok or not held.seats and not self.has_free_seats(trip, options):
+                    break
+
+                # Give back a partial hold and try again, like the checkout does
+                if held.seats:
+                    trip.release_seats(",".join(map(str, held.seat_numbers)))
+
+            results.append((attempts, held.seat_numbers if held.ok else []))
+        except Exception as e:
+            errors.append(e)
+            # Don't leave the other users waiting for this one
+            barrier.abort()
+        finally:
+            connection.close()
+
+    def has_free_seats(self, trip, options) -> bool:
+        free = trip.seats.filter(seat_status=Seat.AVAILABLE).count()
+        return free >= options["per_user"]
+
+    def handle(self, *args, **options):
+        trip = self.create_trip(options["seats"])
+
+        threads, results, errors = options["threads"], [], []
+        barrier = threading.Barrier(threads)
+
+        self.stdout.write("Trip:%s seats:%s" % (trip.pk, options["seats"]))
+        self.stdout.write("Users:%s seats per user:%s" % (threads, options["per_user"]))
+
+        workers = [
+            threading.Thread(
+                target=self.user, args=(trip.pk, options, barrier, results, errors)
+            )
+            for _ in range(threads)
+        ]
+
+        start = timer()
+
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        end = timer()
+
+        attempts = sum(attempts for attempts, _ in results)
+        allotted = Counter(number for _, numbers in results for number in numbers)
+        held = set(
+            trip.seats.filter(seat_status=Seat.ONHOLD).values_list(
+                "seat_number", flat=True
+            )
+        )
+
+        self.stdout.write("Attempts:%s" % attempts)
+        self.stdout.write("Users served:%s" % sum(1 for _, seats in results if seats))
+        self.stdout.write("Seats held:%s" % len(held))
+        self.stdout.write("took:%0.2f seconds." % (end - start))
+        self.stdout.write("Throughput:%0.1f holds/second" % (attempts / (end - start)))
+
+        if not options["keep"]:
+            locations = list(trip.route.stops.values_list("name", flat=True))
+
+            trip.route.delete()
+            trip.company.delete()
+            Location.objects.filter(pk__in=locations).delete()
+
+        for error in errors:
+            self.stderr.write("".join(traceback.format_exception(error)))
+
+        doubles = sorted(number for number, count in allotted.items() if count > 1)
+
+        # A user failing halfway may leave seats held without reporting them
+        lost = [] if errors else sorted(held ^ set(allotted))
+
+        if doubles or lost:
+            raise CommandError("Seats allotted twice:%s lost:%s" % (doubles, lost))
+
+        if errors:
+            raise CommandError("%s of %s users failed" % (len(errors), threads))
+
+        self.stdout.write("No seat was allotted twice. All done!")
@@ -1,32 +1,586 @@
+import copy
 import logging
-from datetime import timedelta
+import time
+from collections import Counter
+from datetime import datetime, timedelta
 
 from django.apps import apps
-from django.db import models
-from django.db.models import Case, Count, F, Q, Sum, When
-from django.db.models.fields import FloatField, IntegerField
-from django.db.models.fields.json import KT
-from django.db.models.functions import Cast, Round
-from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    FilteredRelation,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.fields import (
+    BigIntegerField,
+    DecimalField,
+    FloatField,
+    IntegerField,
+)
+from django.db.models.functions import Abs, Cast, Coalesce, Now, Round
+from django.http import Http404
 from django.utils import timezone
 
+from trips import events
+from trips.booking import BookingResult, HoldResult, SeatConflict
+
 logger = logging.getLogger(__name__)
 
+# Bumped whenever a location changes so every worker drops its cached locations
+LOCATIONS_VERSION_KEY = "trips:locations:version"
+
+# Rebuild the cached locations at least this often (in seconds) in case the
+# version bump was missed, e.g. with a cache that is not shared by all workers
+LOCATIONS_MAX_AGE = 300
+
+# Look the version up at most this often (in seconds), it costs a query with the
+# db cache. Changes made by other workers are picked up that much later.
+LOCATIONS_VERSION_INTERVAL = 5
+
+_locations = None
+
+
+def day_bounds(day) -> tuple[datetime, datetime]:
+    """Start and end of a date in the current timezone, to filter on ranges"""
+
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, start + timedelta(days=1)
+
+
+def legs_between(start, end):
+    """SQL counterpart of `Seat.get_legs_mask` for stop orders from a query"""
+
+    one = Cast(Value(1), BigIntegerField())
+    start, end = Cast(start, IntegerField()), Cast(end, IntegerField())
+
+    return one.bitleftshift(end) - one.bitleftshift(start)
+
+
+def taken_legs():
+    """Legs a seat is booked or held on. Expired holds are free."""
+
+    held = Case(
+        When(held_until__lte=Now(), then=Value(0)),
+        default=F("held_legs"),
+        output_field=BigIntegerField(),
+    )
+    return held.bitor(F("booked_legs"))
+
+
+class LocationSnapshot:
+    """All the locations of the DB indexed by case-folded abbr, slug and pk"""
+
+    __slots__ = ("version", "created", "checked", "locations", "abbr", "slug", "pk")
+
+    def __init__(self, locations, version=None):
+        self.version = version
+        self.created = self.checked = time.monotonic()
+
+        self.locations = list(locations)
+        self.abbr = {x.abbr.casefold(): x for x in self.locations}
+        self.slug = {x.slug: x for x in self.locations}
+        self.pk = {x.pk: x for x in self.locations}
+
+    def is_stale(self, version) -> bool:
+        age = time.monotonic() - self.created
+        return self.version != version or age > LOCATIONS_MAX_AGE
+
+    def needs_check(self) -> bool:
+        return time.monotonic() - self.checked > LOCATIONS_VERSION_INTERVAL
+
 
 class LocationManager(models.Manager):
+    """
+    Locations almost never change but are resolved several times on every step of
+    the booking flow. They are kept in memory once per worker and looked up from
+    there with `get_cached`.
+    """
+
+    LOOKUPS = {"abbr": "abbr__iexact", "slug": "slug", "pk": "pk"}
+
     def get_by_natural_key(self, abbr):
         return self.get(abbr=abbr)
 
+    def get_cache_version(self):
+        from trips.cache import get_search_cache
+
+        return get_search_cache().get(LOCATIONS_VERSION_KEY, 0)
+
+    def invalidate_cache(self):
+        """Ask all the workers to reload the locations, this one right away"""
+
+        global _locations
+
+        from trips.cache import get_search_cache
+
+        _locations = None
+
+        cache = get_search_cache()
+        cache.add(LOCATIONS_VERSION_KEY, 0, timeout=None)
+
+        try:
+            cache.incr(LOCATIONS_VERSION_KEY)
+        except ValueError:
+            cache.set(LOCATIONS_VERSION_KEY, 1, timeout=None)
+
+    def get_snapshot(self) -> LocationSnapshot:
+        global _locations
+
+        if _locations is not None and not _locations.needs_check():
+            return _locations
+
+        version = self.get_cache_version()
+        if _locations is None or _locations.is_stale(version):
+            logger.info("loading locations cache(📍)...")
+            _locations = LocationSnapshot(self.all(), version=version)
+        else:
+            _locations.checked = time.monotonic()
+
+        return _locations
+
+    def warm_cache(self) -> int:
+        """Load the locations up front e.g. before forking the workers"""
+        return len(self.get_snapshot().locations)
+
+    def get_cached(self, **kwargs):
+        """
+        Same as `get` for a single `abbr` (case insensitive), `slug` or `pk` lookup
+        but served from memory.
+
+        Returns a copy so callers are free to modify it.
+        """
+
+        [(field, value)] = kwargs.items()
+        if field not in self.LOOKUPS:
+            raise TypeError("Unsupported location lookup:%s" % field)
+
+        if value is None:
+            raise self.model.DoesNotExist("Location matching query does not exist.")
+
+        key = str(value).casefold() if field == "abbr" else value
+        if field == "pk":
+            key = self.model._meta.pk.to_python(value)
+
+        location = getattr(self.get_snapshot(), field).get(key)
+
+        if location is None:
+            # Could have been added by another worker in the meantime
+            location = self.get(**{self.LOOKUPS[field]: value})
+            self.invalidate_cache()
+
+        return copy.copy(location)
+
+    def get_cached_or_404(self, **kwargs):
+        try:
+            return self.get_cached(**kwargs)
+        except (self.model.DoesNotExist, ValidationError):
+            raise Http404("No location matches the given query.")
+
     def parse_query(self, q):
         """
         Handy method to find locations based on abbr code used in search query.
         """
-        origin = get_object_or_404(self, abbr__iexact=q["origin"])
-        destination = get_object_or_404(self, abbr__iexact=q["destination"])
+        origin = self.get_cached_or_404(abbr=q["origin"])
+        destination = self.get_cached_or_404(abbr=q["destination"])
 
         return origin, destination
 
 
+class TripStopManager(models.Manager):
+    """
+    Manager for the normalized trip stops which act as our search index.
+
+    The rows are derived from `Trip.schedule` so they must be rebuilt every time
+    a trip's schedule is written.
+    """
+
+    def get_model(self, name=None):
+        return apps.get_model("trips", name)
+
+    def build(self, trips, locations=None):
+        """
+        Build (unsaved) trip stops for all the trips from their schedules.
+        Locations are resolved in a single query for all trips unless a map of
+        abbr -> location id is given.
+        """
+
+        if locations is None:
+            Location = self.get_model("Location")
+
+            codes = {code for trip in trips for code in trip.schedule}
+            locations = dict(
+                Location.objects.filter(abbr__in=codes).values_list("abbr", "id")
+            )
+
+        objs = []
+        for trip in trips:
+            for stop in trip.parsed_schedule:
+                if stop.code not in locations:
+                    logger.warning("trip:%s unknown location:%s..." % (trip, stop.code))
+                    continue
+
+                obj = self.model(
+                    trip=trip,
+                    location_id=locations[stop.code],
+                    order=stop.order,
+                    arrival=stop.arrival,
+                    departure=stop.departure,
+                )
+                objs.append(obj)
+
+        return objs
+
+    def sync(self, trips):
+        """
+        Replace the trip stops of all the trips in one go.
+        """
+
+        logger.info("syncing trip stops for %s trips(🗂️)..." % len(trips))
+
+        objs = self.build(trips)
+
+        with transaction.atomic():
+            self.filter(trip__in=trips).delete()
+            return self.bulk_create(objs)
+
+
+class SeatManager(models.Manager):
+    """
+    Set based operations on the seats of many trips at once.
+    """
+
+    def materialize(self, trip_seats):
+        """
+        Store the seats of lazy trips (see `Trip.layout_seats`) that are not stored
+        yet so they can be locked. Takes `(trip, seat_numbers)` pairs and inserts
+        all the missing seats in one go. Numbers outside a trip's seat chart are
+        ignored and so are trips with stored seats.
+
+        The new seats are available, as they were counted, so no counter moves.
+        """
+
+        objs = []
+
+        for trip, seat_numbers in trip_seats:
+            if not trip.has_lazy_seats:
+                continue
+
+            numbers = set(trip.seat_numbers).intersection(map(int, seat_numbers))
+            objs += [self.model(trip=trip, seat_number=n) for n in sorted(numbers)]
+
+        if objs:
+            logger.info("materializing %s seats(🪑)..." % len(objs))
+            self.bulk_create(objs, ignore_conflicts=True)
+
+        return objs
+
+    def book(self, bookings) -> BookingResult:
+        """
+        Book the seats of all the bookings (see `SeatBooking`) together.
+
+        All the seats are locked in a single query (in a fixed order so concurrent
+        bookings can't deadlock), checked and written back with a single UPDATE.
+        Booking is all or nothing: if any seat is missing, booked or held (by
+        another order than the booking's) on the booked legs nothing is written
+        and the conflicts are returned.
+
+        Seats already booked for the same passenger are left untouched so booking
+        twice (e.g. a retried payment webhook) is harmless.
+        """
+
+        result = BookingResult()
+
+        for booking in bookings:
+            if len(booking.seat_numbers) != len(booking.passengers):
+                raise ValidationError(
+                    "Seats count %(seats)s does not match passengers count "
+                    "%(passengers)s",
+                    code="invalid",
+                    params={
+                        "seats": len(booking.seat_numbers),
+                        "passengers": len(booking.passengers),
+                    },
+                )
+
+        lookup = Q()
+        for booking in bookings:
+            lookup |= Q(trip=booking.trip, seat_number__in=booking.seat_numbers)
+
+        if not lookup:
+            return result
+
+        with transaction.atomic():
+            self.materialize((b.trip, b.seat_numbers) for b in bookings)
+
+            qs = self.select_for_update().filter(lookup).order_by("trip", "seat_number")
+            seats = {(seat.trip_id, seat.seat_number): seat for seat in qs}
+
+            updated, deltas = [], {}
+
+            for booking in bookings:
+                for seat_number, passenger in booking:
+                    seat = seats.get((booking.trip.pk, seat_number))
+
+                    if seat is None:
+                        conflict = SeatConflict(
+                            booking.trip, seat_number, SeatConflict.MISSING
+                        )
+                        result.conflicts.append(conflict)
+                        continue
+
+                    # Checked on the locked row: booked or held by another order
+                    taken = seat.get_taken_legs(booking.order) & booking.legs
+                    booked = seat.booked_legs & booking.legs
+
+                    if taken == booked and booked and seat.passenger_id == passenger.pk:
+                        logger.info("seat %s already booked..." % seat)
+                        result.seats.append(seat)
+                        continue
+
+                    if taken:
+                        conflict = SeatConflict(
+                            booking.trip, seat_number, SeatConflict.TAKEN
+                        )
+                        result.conflicts.append(conflict)
+                        continue
+
+                    from_status = seat.seat_status
+
+                    seat.booked_legs |= booking.legs
+
+                    # The hold of the order (or an expired one) turns into the booking
+                    if seat.hold_expired or seat.is_held_by(booking.order):
+                        seat.held_legs &= ~booking.legs
+
+                    seat.passenger = passenger
+                    seat.sync_hold()
+                    seat.seat_status = seat.get_status_for_legs()
+                    seat._loaded_status = seat.seat_status
+
+                    logger.info("allotted seat %s: to %s..." % (seat, passenger))
+
+                    trip_deltas = deltas.setdefault(booking.trip, Counter())
+                    trip_deltas.update(
+                        self.model.get_counter_deltas(from_status, seat.seat_status)
+                    )
+
+                    updated.append(seat)
+                    result.seats.append(seat)
+
+            if result.conflicts:
+                logger.warning("booking conflicts:%s..." % result.conflicts)
+                return BookingResult(conflicts=result.conflicts)
+
+            if updated:
+                fields = [*self.model.LEGS_FIELDS, "passenger"]
+                self.bulk_update(updated, fields=fields)
+
+            for trip, trip_deltas in deltas.items():
+                trip.update_inventory(trip_deltas)
+
+        return result
+
+    def taken_numbers(self, trip_legs) -> dict:
+        """
+        Numbers of the seats taken on some legs of many trips in a single query.
+        Takes a `{trip: legs}` dict and answers `{trip id: [seat numbers]}`.
+        """
+
+        taken = {trip.pk: [] for trip in trip_legs}
+        if not trip_legs:
+            return taken
+
+        legs = Case(
+            *[When(trip=trip, then=Value(legs)) for trip, legs in trip_legs.items()],
+            output_field=BigIntegerField(),
+        )
+
+        qs = self.filter(trip__in=list(trip_legs))
+        qs = qs.alias(taken=taken_legs().bitand(legs)).exclude(taken=0)
+        qs = qs.order_by("trip_id", "seat_number").values_list("trip_id", "seat_number")
+
+        for trip_id, seat_number in qs:
+            taken[trip_id].append(seat_number)
+
+        return taken
+
+    def hold(self, trip, seat_numbers, legs, order=None, fallback=False) -> HoldResult:
+        """
+        Hold the requested seats of a trip for the legs without waiting on anyone.
+
+        Seats being held or booked by a concurrent request are skipped (SKIP
+        LOCKED) and reported as conflicts straight away instead of blocking, so
+        the user can pick other seats right away. With `fallback` the free seats
+        nearest to the requested ones are held in place of the conflicting ones.
+
+        Seats of lazy trips are stored first. Falling back on a lazy trip stores
+        all of its seats since any of them could be the nearest free one.
+        """
+
+        requested = sorted({int(number) for number in seat_numbers})
+        result = HoldResult(requested)
+
+        with transaction.atomic():
+            self.materialize([(trip, requested)])
+
+            qs = self.select_for_update(skip_locked=True).filter(trip=trip)
+            seats = {
+                seat.seat_number: seat
+                for seat in qs.filter(seat_number__in=requested).order_by("seat_number")
+            }
+
+            skipped = [number for number in requested if number not in seats]
+            existing = set()
+
+            if skipped:
+                # Plain reads don't wait on the locks
+                existing = self.filter(trip=trip, seat_number__in=skipped)
+                existing = set(existing.values_list("seat_number", flat=True))
+
+            for number in requested:
+                seat = seats.get(number)
+
+                if seat is not None and seat.is_free(legs):
+                    result.seats.append(seat)
+                    continue
+
+                if seat is not None:
+                    reason = SeatConflict.TAKEN
+                elif number in existing:
+                    reason = SeatConflict.LOCKED
+                else:
+                    reason = SeatConflict.MISSING
+
+                result.conflicts.append(SeatConflict(trip, number, reason))
+
+            if fallback and result.conflicts:
+                self.materialize([(trip, trip.seat_numbers)])
+
+                needed = len(requested) - len(result.seats)
+                pivot = requested[0]
+
+                taken = taken_legs().bitand(Value(legs, output_field=BigIntegerField()))
+
+                substitutes = qs.exclude(seat_number__in=requested)
+                substitutes = substitutes.alias(taken=taken).filter(taken=0)
+                substitutes = substitutes.annotate(
+                    distance=Abs(F("seat_number") - pivot)
+                )
+                result.seats += substitutes.order_by("distance", "seat_number")[:needed]
+
+            deltas = Counter()
+
+            for seat in result.seats:
+                from_status = seat.seat_status
+
+                seat.hold(legs, order=order)
+                seat.seat_status = seat.get_status_for_legs()
+                seat._loaded_status = seat.seat_status
+
+                deltas.update(
+                    self.model.get_counter_deltas(from_status, seat.seat_status)
+                )
+
+            if result.seats:
+                self.bulk_update(result.seats, fields=self.model.LEGS_FIELDS)
+                trip.update_inventory(deltas)
+
+        logger.info("held seats:%s..." % result)
+
+        return result
+
+    def expired_holds(self):
+        return self.filter(held_until__lte=Now())
+
+    def release_expired_holds(self, batch_size=500) -> int:
+        """
+        Release a batch of seats whose hold has expired and fix the counters of
+        their trips. Returns the number of seats released.
+
+        Seats locked by someone else (e.g. being booked right now) are skipped so
+        that many reapers can run at once without waiting on each other.
+        """
+
+        Trip = self.get_model("Trip")
+
+        with transaction.atomic():
+            qs = self.expired_holds().select_for_update(skip_locked=True)
+            seats = list(qs.order_by("held_until")[:batch_size])
+
+            deltas = {}
+
+            for seat in seats:
+                from_status = seat.seat_status
+
+                seat.held_legs = 0
+                seat.sync_hold()
+                seat.seat_status = seat.get_status_for_legs()
+
+                trip_deltas = deltas.setdefault(seat.trip_id, Counter())
+                trip_deltas.update(
+                    self.model.get_counter_deltas(from_status, seat.seat_status)
+                )
+
+            if seats:
+                self.bulk_update(seats, fields=self.model.LEGS_FIELDS)
+
+            # Streams of the company live status are told as well
+            companies = Trip.objects.filter(pk__in=list(deltas))
+            companies = dict(companies.values_list("pk", "company")) if deltas else {}
+
+            for trip_id, trip_deltas in deltas.items():
+                trip_deltas["inventory_version"] = 1
+                Trip.objects.filter(pk=trip_id).update(
+                    **{field: F(field) + delta for field, delta in trip_deltas.items()},
+                    updated_on=Now(),
+                )
+                events.publish(events.SEATS, trip_id, companies.get(trip_id))
+
+        logger.info("released %s expired holds(⏰)..." % len(seats))
+
+        return len(seats)
+
+    def get_model(self, name=None):
+        return apps.get_model("trips", name)
+
+
+class PriceManager(models.Manager):
+    """
+    Resolve fares for many trips at once instead of one query per trip.
+    """
+
+    def get_fares(self, routes, origin, destination) -> dict:
+        """Fares between origin and destination by (route, category)"""
+
+        qs = self.filter(route__in=routes, origin=origin, destination=destination)
+        qs = qs.values_list("route", "category", "amount")
+
+        return {(route, category): amount for route, category, amount in qs}
+
+    def prefetch_fares(self, trips, origin, destination):
+        """
+        Set the fare from origin to destination on all the trips in one query so
+        that `Trip.get_price` reads it from memory.
+        """
+
+        routes = {trip.route_id for trip in trips}
+        fares = self.get_fares(routes, origin, destination)
+
+        for trip in trips:
+            fare = fares.get((trip.route_id, trip.category), 0)
+            trip.set_fare(origin, destination, fare)
+
+        return trips
+
+
 class PastManager(models.Manager):
     """
     Trip Model manager to work with past trips.
@@ -132,52 +686,102 @@ class FutureManager(models.Manager):
             - departure date
         """
 
-        Seat = self.get_model("Seat")
-
-        origin_lookup = f"schedule__{origin.abbr}__order"
-        destination_lookup = f"schedule__{destination.abbr}__order"
-
-        origin_order = Cast(KT(origin_lookup), IntegerField())
-        destination_order = Cast(KT(destination_lookup), IntegerField())
-
         logger.info(
             "searching from:%s to:%s on:%s company:%s"
             % (origin, destination, departure, company_slug)
         )
 
+        # Join the trip stops index once for the origin and once for the destination
+        origin_stop = FilteredRelation(
+            "trip_stops", condition=Q(trip_stops__location=origin)
+        )
+        destination_stop = FilteredRelation(
+            "trip_stops", condition=Q(trip_stops__location=destination)
+        )
+
         qs = self.active()
 
-        qs = qs.filter(departure__date=departure)
-        qs = qs.filter(schedule__has_keys=[origin.abbr, destination.abbr])
+        # A range on the departure from the origin stop is served by the index on
+        # (location, departure) of the trip stops
+        day_start, day_end = day_bounds(departure)
 
-        qs = qs.alias(origin_order=origin_order, destination_order=destination_order)
-        qs = qs.filter(origin_order__lt=F("destination_order"))
+        qs = qs.alias(origin_stop=origin_stop, destination_stop=destination_stop)
+        qs = qs.filter(
+            origin_stop__departure__gte=day_start, origin_stop__departure__lt=day_end
+        )
+        qs = qs.filter(origin_stop__order__lt=F("destination_stop__order"))
 
         qs = qs.filter(company__slug=company_slug) if company_slug else qs
 
-        availability = Count("seats", filter=Q(seats__seat_status=Seat.AVAILABLE))
-
-        qs = qs.annotate(availability=availability)
+        qs = qs.annotate(
+            availability=self.free_seats("origin_stop", "destination_stop"),
+            fare=self.fare(origin, destination),
+        )
 
         qs = qs.select_related("company", "route", "origin", "destination")
         qs = qs.order_by(ordering) if ordering else qs
 
         return qs
 
-    def for_company(self, company_slug=None, active=True):
+    def free_seats(self, origin_stop, destination_stop):
         """
-        Build the Queryset with relevant stats for only one company
+        Subquery counting the seats of each trip that are free on all the legs
+        between two trip stops joined in the outer query. This answers the
+        availability of all the trips in a search in the same query.
         """
 
         Seat = self.get_model("Seat")
 
+        legs = legs_between(
+            OuterRef(f"{origin_stop}__order"), OuterRef(f"{destination_stop}__order")
+        )
+        taken = taken_legs().bitand(legs)
+
+        qs = Seat.objects.filter(trip=OuterRef("pk"))
+        qs = qs.alias(taken=taken).order_by().values("trip")
+
+        free = qs.filter(taken=0).annotate(total=Count("pk")).values("total")
+        occupied = qs.exclude(taken=0).annotate(total=Count("pk")).values("total")
+
+        # Lazy trips only store the seats that were taken at some point
+        return Case(
+            When(
+                capacity__gt=0,
+                then=F("capacity")
+                - Coalesce(Subquery(occupied, output_field=IntegerField()), Value(0)),
+            ),
+            default=Coalesce(Subquery(free, output_field=IntegerField()), Value(0)),
+            output_field=IntegerField(),
+        )
+
+    def fare(self, origin, destination):
+        """Subquery for the fare of each trip's route and category"""
+
+        Price = self.get_model("Price")
+
+        qs = Price.objects.filter(
+            route=OuterRef("route"),
+            category=OuterRef("category"),
+            origin=origin,
+            destination=destination,
+        )
+        qs = qs.values("amount")[:1]
+
+        return Coalesce(Subquery(qs), Value(0), output_field=DecimalField())
+
+    def for_company(self, company_slug=None, active=True):
+        """
+        Build the Queryset with relevant stats for only one company
+        """
+
         logger.info("showing only trips for company(🚌):%s..." % company_slug)
 
-        availability = Count("seats", filter=Q(seats__seat_status=Seat.AVAILABLE))
-        occupied = Cast(
-            Count("seats", filter=~Q(seats__seat_status=Seat.AVAILABLE)), FloatField()
+        # Read the denormalized seat counters instead of joining all the seats
+        availability = F("available_count")
+        occupied = Cast(F("held_count") + F("booked_count"), FloatField())
+        total = Cast(
+            F("available_count") + F("held_count") + F("booked_count"), FloatField()
         )
-        total = Cast(Count("seats"), FloatField())
 
         occupancy = Case(
             When(total=0, then=0),
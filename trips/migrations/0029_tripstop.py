@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0028_alter_stop_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripStop',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField(verbose_name='order')),
+                ('arrival', models.DateTimeField(verbose_name='arrival')),
+                ('departure', models.DateTimeField(verbose_name='departure')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trip_stops', to='trips.location')),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trip_stops', to='trips.trip')),
+            ],
+            options={
+                'verbose_name': 'trip stop',
+                'verbose_name_plural': 'trip stops',
+                'ordering': ('order',),
+                'indexes': [models.Index(fields=['location', 'departure'], name='trips_trips_locatio_ab528b_idx')],
+                'unique_together': {('trip', 'location')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:15
+
+from django.db import migrations
+from django.utils.dateparse import parse_datetime
+
+
+def populate_trip_stops(apps, schema_editor):
+    """Build the trip stops search index for all existing trips"""
+
+    Location = apps.get_model("trips", "Location")
+    Trip = apps.get_model("trips", "Trip")
+    TripStop = apps.get_model("trips", "TripStop")
+
+    locations = dict(Location.objects.values_list("abbr", "id"))
+
+    objs = []
+    for trip in Trip.objects.exclude(schedule={}).only("id", "schedule").iterator():
+        for code, stop in trip.schedule.items():
+            if code not in locations:
+                continue
+
+            objs.append(
+                TripStop(
+                    trip_id=trip.id,
+                    location_id=locations[code],
+                    order=stop["order"],
+                    arrival=parse_datetime(stop["arrival"]),
+                    departure=parse_datetime(stop["departure"]),
+                )
+            )
+
+    TripStop.objects.bulk_create(objs, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0029_tripstop"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_trip_stops, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0030_populate_tripstops"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="available_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="available seats"
+            ),
+        ),
+        migrations.AddField(
+            model_name="trip",
+            name="booked_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="booked seats"
+            ),
+        ),
+        migrations.AddField(
+            model_name="trip",
+            name="held_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="held seats"
+            ),
+        ),
+    ]
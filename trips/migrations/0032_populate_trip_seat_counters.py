@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:40
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_seat_counters(apps, schema_editor):
+    """Calculate the seat counters of all existing trips from their seats"""
+
+    Seat = apps.get_model("trips", "Seat")
+    Trip = apps.get_model("trips", "Trip")
+
+    def count_seats(*statuses):
+        qs = Seat.objects.filter(trip=OuterRef("pk"), seat_status__in=statuses)
+        qs = qs.order_by().values("trip").annotate(total=Count("pk")).values("total")
+        return Coalesce(Subquery(qs, output_field=IntegerField()), Value(0))
+
+    Trip.objects.update(
+        available_count=count_seats("A"),
+        held_count=count_seats("H"),
+        booked_count=count_seats("B", "R"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0031_trip_seat_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_seat_counters, migrations.RunPython.noop),
+    ]
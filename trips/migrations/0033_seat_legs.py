@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0032_populate_trip_seat_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="seat",
+            name="booked_legs",
+            field=models.BigIntegerField(
+                default=0, editable=False, verbose_name="booked legs"
+            ),
+        ),
+        migrations.AddField(
+            model_name="seat",
+            name="held_legs",
+            field=models.BigIntegerField(
+                default=0, editable=False, verbose_name="held legs"
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:05
+
+from django.db import migrations
+
+# Every bit set so that the seat is taken on any leg of the trip
+ALL_LEGS = -1
+
+
+def populate_seat_legs(apps, schema_editor):
+    """Existing held or booked seats take all the legs of their trip"""
+
+    Seat = apps.get_model("trips", "Seat")
+
+    Seat.objects.filter(seat_status="H").update(held_legs=ALL_LEGS)
+    Seat.objects.filter(seat_status__in=["B", "R"]).update(booked_legs=ALL_LEGS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0033_seat_legs"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_seat_legs, migrations.RunPython.noop),
+    ]
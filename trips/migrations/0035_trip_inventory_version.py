@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0034_populate_seat_legs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="inventory_version",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="inventory version"
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0011_alter_passenger_document_number"),
+        ("trips", "0035_trip_inventory_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="seat",
+            name="held_until",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="held until"
+            ),
+        ),
+        migrations.AddField(
+            model_name="seat",
+            name="hold_order",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="held_seats",
+                to="orders.order",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="seat",
+            index=models.Index(
+                condition=models.Q(("held_until__isnull", False)),
+                fields=["held_until"],
+                name="seat_hold_expiry_idx",
+            ),
+        ),
+    ]
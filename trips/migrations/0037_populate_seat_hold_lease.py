@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:05
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+def populate_hold_lease(apps, schema_editor):
+    """
+    Existing holds have no expiry and would never be released. Give them a full
+    hold timeout from now.
+    """
+
+    Seat = apps.get_model("trips", "Seat")
+
+    held_until = timezone.now() + timedelta(seconds=settings.SEAT_HOLD_TIMEOUT)
+    Seat.objects.exclude(held_legs=0).update(held_until=held_until)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0036_seat_hold_lease"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_hold_lease, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0008_alter_seatchart_json"),
+        ("trips", "0037_populate_seat_hold_lease"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="capacity",
+            field=models.PositiveSmallIntegerField(
+                default=0, editable=False, verbose_name="capacity"
+            ),
+        ),
+        migrations.AddField(
+            model_name="trip",
+            name="seat_numbers",
+            field=models.JSONField(
+                blank=True, default=list, editable=False, verbose_name="seat numbers"
+            ),
+        ),
+        migrations.AddField(
+            model_name="trip",
+            name="seatchart",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="trips",
+                to="companies.seatchart",
+            ),
+        ),
+    ]
@@ -1,23 +1,38 @@
 import logging
 import uuid
+from collections import Counter
 from datetime import datetime, timedelta
+from itertools import islice
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.urls import reverse_lazy
+from django.db import models, transaction
+from django.db.models import F
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
 from django_countries.fields import CountryField
 
+from trips import events
+from trips.booking import BookingResult, HoldResult, SeatBooking
 from trips.exceptions import SeatException, TripException
 from trips.fields import OrderField
-from trips.managers import FutureManager, LocationManager, PastManager
-from trips.seat_map import SEAT_MAP
+from trips.managers import (
+    FutureManager,
+    LocationManager,
+    PastManager,
+    PriceManager,
+    SeatManager,
+    TripStopManager,
+)
+from trips.schedule import Schedule, ScheduleStop
+from trips.seat_map import SeatLayout, get_layout
 
 logger = logging.getLogger(__name__)
 
@@ -154,16 +169,21 @@ class Route(models.Model):
         else:
             return origin_stop.order < destination_stop.order
 
-    def get_schedule_for_date(self, departure_date) -> dict:
+    def get_schedule_for_date(self, departure_date, stops=None) -> dict:
         """
         Builds a dict with departure datetimes for any arbitrary date for all the
         stops on the route.
 
         We use this as a json field on the trip model for fast querying.
+
+        Pass the route's `stops` (ordered) when building schedules for many dates
+        to avoid querying them every time.
         """
 
-        stops = self.stops.select_related("name")
-        start = stops.first().departure
+        if stops is None:
+            stops = self.stops.select_related("name")
+
+        start = stops[0].departure
 
         delta = departure_date - start.date()
         schedule = dict()
@@ -179,11 +199,66 @@ class Route(models.Model):
 
         return schedule
 
+    def get_departures(self, start_date, days) -> list[datetime]:
+        """
+        Daily departures of the route from its first stop for `days` days from
+        `start_date` on.
+        """
+
+        first = self.stops.first()
+        if first is None:
+            return []
+
+        start = first.departure + (start_date - first.departure.date())
+        return [start + timedelta(days=day) for day in range(days)]
+
+    def materialize_trips(self, days, start_date=None) -> list["Trip"]:
+        """
+        Make sure the route has a trip every day for the next `days` days by
+        copying its latest future active trip (seats included). Raises a
+        ValidationError when there is no such trip to copy.
+
+        Days with a trip already are skipped so running it again is a no-op.
+        """
+
+        start_date = start_date or timezone.localdate()
+        now = timezone.now()
+
+        with transaction.atomic():
+            # Serialize concurrent runs for the same route
+            Route.objects.select_for_update().get(pk=self.pk)
+
+            trips = self.trips.filter(status=Trip.ACTIVE, departure__gt=now)
+            trip = trips.order_by("-departure").first()
+
+            if trip is None:
+                raise ValidationError(
+                    "Route %(route)s has no future trip to copy from",
+                    code="no_template",
+                    params={"route": self},
+                )
+
+            departures = self.get_departures(start_date, days)
+            departures = [departure for departure in departures if departure > now]
+            dates = [timezone.localdate(departure) for departure in departures]
+
+            # Trips moved off the timetable still count for their day
+            qs = self.trips.filter(departure__date__in=dates)
+            existing = set(qs.values_list("departure__date", flat=True))
+
+            missing = [x for x, date in zip(departures, dates) if date not in existing]
+            logger.info("route:%s missing %s trips..." % (self, len(missing)))
+
+            if not missing:
+                return []
+
+            return trip.create_occurrences(departures=missing)
+
     def get_price(self, origin, destination, category):
+        qs = self.prices.values_list("amount", flat=True)
+
         try:
-            price = self.prices.get(
-                origin=origin, destination=destination, category=category
-            )
+            price = qs.get(origin=origin, destination=destination, category=category)
         except Price.DoesNotExist:
             logger.warning(
                 "Price not set from %s to %s for category %s"
@@ -265,6 +340,8 @@ class Price(models.Model):
         _("category"), max_length=2, choices=CATEGORY_CHOICES, default=SEMICAMA
     )
 
+    objects = PriceManager()
+
     class Meta:
         ordering = ("route",)
         unique_together = ("route", "origin", "destination", "category")
@@ -319,6 +396,9 @@ class Trip(models.Model):
         (OTHER, "Other"),
     ]
 
+    # Occurrences of a recurrence are inserted this many at a time
+    OCCURRENCES_BATCH_SIZE = 200
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     route = models.ForeignKey(
         to="trips.Route", on_delete=models.CASCADE, null=True, related_name="trips"
@@ -362,6 +442,36 @@ class Trip(models.Model):
     )
     image = models.ImageField(_("image"), upload_to="trips/%Y/%m/%d", blank=True)
     description = models.TextField(_("description"), blank=True)
+
+    # Denormalized seat counters so listings don't need to join the seats table.
+    # Maintained by the seat methods below. See `rebuild_seat_counts` if they drift.
+    available_count = models.IntegerField(
+        _("available seats"), default=0, editable=False
+    )
+    held_count = models.IntegerField(_("held seats"), default=0, editable=False)
+    booked_count = models.IntegerField(_("booked seats"), default=0, editable=False)
+
+    # Trips laid out lazily from a seat chart have no seat rows up front. Their seats
+    # are only stored once held or booked and all the others are available.
+    seatchart = models.ForeignKey(
+        to="companies.SeatChart",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="trips",
+    )
+    seat_numbers = models.JSONField(
+        _("seat numbers"), default=list, blank=True, editable=False
+    )
+    capacity = models.PositiveSmallIntegerField(
+        _("capacity"), default=0, editable=False
+    )
+
+    # Bumped on every change to the seats so that caches know when to refresh
+    inventory_version = models.PositiveIntegerField(
+        _("inventory version"), default=0, editable=False
+    )
+
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
 
@@ -369,6 +479,12 @@ class Trip(models.Model):
     future = FutureManager()
     past = PastManager()
 
+    # Fares by (origin, destination) abbr codes resolved in bulk or already looked up
+    _fares = None
+
+    # See `parsed_schedule`
+    _schedule = None
+
     class Meta:
         ordering = ["departure"]
         verbose_name = _("trip")
@@ -382,7 +498,18 @@ class Trip(models.Model):
             logger.debug("slugifying %s:%s..." % (self.name, slugify(self.name)))
             self.slug = slugify(self.name)
 
-        return super().save(*args, **kwargs)
+        super().save(*args, **kwargs)
+
+        # The schedule might have been edited in place
+        self._schedule = None
+
+        # Keep the search index in sync whenever the schedule could have changed
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "schedule" in update_fields:
+            self.sync_stops()
+
+        if update_fields is None or "status" in update_fields:
+            events.publish(events.TRIP, self.pk, self.company_id, status=self.status)
 
     def clean(self):
         # Don't allow arrival date to be less than departure date
@@ -395,6 +522,22 @@ class Trip(models.Model):
     def get_absolute_url(self):
         return reverse_lazy("trips:trip-detail", kwargs={"id": self.id})
 
+    def get_seats_url(self, origin=None, destination=None):
+        """Live seat map of the trip, for the legs between origin and destination"""
+
+        url = reverse("trips:trip-seats", kwargs={"id": self.id})
+
+        if origin is None or destination is None:
+            return url
+
+        return "%s?%s" % (
+            url,
+            urlencode({"origin": origin.abbr, "destination": destination.abbr}),
+        )
+
+    def get_events_url(self):
+        return reverse("trips:trip-events", kwargs={"id": self.id})
+
     def get_add_to_cart_url(self):
         return reverse_lazy("cart:cart_add", kwargs={"trip_id": self.id})
 
@@ -423,24 +566,52 @@ class Trip(models.Model):
         else:
             seat.book()
 
-    def hold_seats(self, seat_numbers: list[str | int]):
-        """Update seat status to ONHOLD"""
+    def hold_seats(
+        self, seat_numbers: list[str | int], origin=None, destination=None, order=None
+    ) -> int:
+        """
+        Put seats ONHOLD for the legs between origin and destination (the whole trip
+        by default) on behalf of an order. Seats taken on any of those legs are
+        skipped. The hold expires after SEAT_HOLD_TIMEOUT.
+
+        Returns the number of seats held, see `try_hold_seats` for the details.
+        """
+
+        return len(self.try_hold_seats(seat_numbers, origin, destination, order))
+
+    def try_hold_seats(
+        self,
+        seat_numbers: list[str | int],
+        origin=None,
+        destination=None,
+        order=None,
+        fallback=False,
+    ) -> HoldResult:
+        """
+        Same as `hold_seats` but returns exactly which seats were held and which
+        ones were taken. See `Seat.objects.hold`.
+        """
         # TODO: Change the argument seat_number from list to *args or *seat_numbers
         # We should not use lists as function arguments!
 
         if not seat_numbers:
             raise ValidationError("Seat numbers cannot be null 💣💥💣")
 
-        seat_numbers = [s.strip() for s in seat_numbers.split(",")]
+        seat_numbers = [s.strip() for s in seat_numbers.split(",") if s.strip()]
+        legs = self.get_legs(origin, destination)
 
-        logger.info("holding seats:%s..." % seat_numbers)
+        logger.info("holding seats:%s legs:%s..." % (seat_numbers, bin(legs)))
 
-        return self.seats.filter(
-            seat_status=Seat.AVAILABLE, seat_number__in=seat_numbers
-        ).update(seat_status=Seat.ONHOLD)
+        return Seat.objects.hold(self, seat_numbers, legs, order, fallback=fallback)
 
-    def release_seats(self, seat_numbers: list[str | int]):
-        """Update seat status to AVAILABLE"""
+    def release_seats(
+        self, seat_numbers: list[str | int], origin=None, destination=None, order=None
+    ):
+        """
+        Make seats held for the legs between origin and destination (the whole trip
+        by default) available again. Only the holds of `order` (or no order) are
+        released, seats held again by another order since are left alone.
+        """
         # TODO: Change the argument seat_number from list to *args or *seat_numbers
         # We should not use lists as function arguments!
 
@@ -448,67 +619,177 @@ class Trip(models.Model):
             raise ValidationError("Seat numbers cannot be null 💣💥💣")
 
         seat_numbers = [s.strip() for s in seat_numbers.split(",")]
+        legs = self.get_legs(origin, destination)
+
+        logger.info("releasing seats:%s legs:%s..." % (seat_numbers, bin(legs)))
 
-        logger.info("releasing seats:%s..." % seat_numbers)
+        def release(seat):
+            if not seat.held_legs & legs:
+                return False
+            if not seat.hold_expired and not seat.is_held_by(order):
+                return False
+            seat.held_legs &= ~legs
+            return True
 
-        return self.seats.filter(
-            seat_status=Seat.ONHOLD, seat_number__in=seat_numbers
-        ).update(seat_status=Seat.AVAILABLE)
+        return len(self.update_seats(seat_numbers, release))
 
-    def book_seats_with_passengers(self, seat_numbers: list[str | int], passengers):
+    def book_seats_with_passengers(
+        self, seat_numbers: list[str | int], passengers, origin=None, destination=None
+    ) -> BookingResult:
         """
-        TODO: Please refactor this method to be more precise and optimal.
-        Update seat status to Booked and link a passenger to it
+        Update seat status to Booked for the legs between origin and destination
+        (the whole trip by default) and link a passenger to each, in order of seat
+        number.
+
+        Returns the result of `Seat.objects.book` which lists the conflicts (if any)
+        instead of booking seats taken by someone else.
         """
 
         if not seat_numbers.strip() or not passengers:
             raise ValidationError("seat numbers or passengers cannot be null")
 
-        seat_numbers = [s.strip() for s in seat_numbers.split(",")]
-        seats = self.seats.filter(seat_number__in=seat_numbers)
+        booking = self.get_seat_booking(seat_numbers, passengers, origin, destination)
 
-        logger.info("checking these seats...%s", seats)
+        logger.info("booking seats...%s", booking)
 
-        # verify that seats count and passenger count match
-        # this is suboptimal logic in my opinion.
-        # TODO: improve this
-        seats_count, passengers_count = seats.count(), passengers.count()
-        if seats_count != passengers_count:
-            raise ValidationError(
-                "Seats count %(seats)s does not match passengers count %(passengers)s",
-                code="invalid",
-                params={"seats": seats_count, "passengers": passengers_count},
-            )
+        return Seat.objects.book([booking])
+
+    def get_seat_booking(
+        self, seat_numbers, passengers, origin=None, destination=None, order=None
+    ):
+        """Describe the booking of comma separated seat numbers for `Seat.objects`"""
+
+        seat_numbers = [s.strip() for s in seat_numbers.split(",") if s.strip()]
+        legs = self.get_legs(origin, destination)
+
+        return SeatBooking(self, seat_numbers, passengers, legs, order=order)
+
+    def update_seats(self, seat_numbers, update, fields=()):
+        """
+        Lock the seats and apply `update(seat)` to change their legs. The seats it
+        accepts are saved in one go along with their new status and the trip seat
+        counters.
+        """
+
+        seats = self.seats.select_for_update().filter(seat_number__in=seat_numbers)
+        fields = [*Seat.LEGS_FIELDS, *fields]
+
+        with transaction.atomic():
+            updated, deltas = [], Counter()
+
+            for seat in seats.order_by("seat_number"):
+                from_status = seat.seat_status
+
+                if not update(seat):
+                    continue
 
-        for s, p in zip(seats, passengers):
-            s.seat_status = Seat.BOOKED
-            s.passenger = p
-            s.save(update_fields=["seat_status", "passenger"])
-            logger.info("allotted seat %s: to %s..." % (s, p))
+                seat.sync_hold()
+                seat.seat_status = seat.get_status_for_legs()
+                seat._loaded_status = seat.seat_status
+
+                deltas.update(Seat.get_counter_deltas(from_status, seat.seat_status))
+                updated.append(seat)
+
+            if updated:
+                Seat.objects.bulk_update(updated, fields=fields)
+                self.update_inventory(deltas)
+
+        return updated
+
+    @property
+    def has_lazy_seats(self) -> bool:
+        """Whether the seats are laid out from a seat chart, see `layout_seats`"""
+        return self.capacity > 0
+
+    def get_seats(self):
+        """
+        All the seats of the trip sorted by seat number along with their passengers.
+
+        Seats of a lazy trip that were never taken are not stored so they are
+        listed as unsaved available seats.
+        """
+
+        seats = list(self.seats.order_by("seat_number").select_related("passenger"))
+
+        if self.has_lazy_seats:
+            stored = {seat.seat_number for seat in seats}
+            seats += [
+                Seat(trip=self, seat_number=number)
+                for number in self.seat_numbers
+                if number not in stored
+            ]
+            seats.sort(key=lambda seat: seat.seat_number)
 
         return seats
 
-    def get_booked_seats(self):
+    def get_booked_seats(self, origin=None, destination=None):
         """
         Get list of booked seats for populating seatchart.js
 
+        A seat is booked when it's taken on any of the legs between origin and
+        destination (the whole trip by default).
+
         TODO: Rename this to Unavailable seats.
         Since a seat on hold | reserved is not booked but rather unavailable!
         """
 
         logger.info("calculating booked seats(🔖)...")
-        return [
-            s.get_row_col()
-            for s in self.seats.all()  # type:ignore
-            if s.seat_status != Seat.AVAILABLE
-        ]
+
+        legs = self.get_legs(origin, destination)
+        taken = Seat.objects.taken_numbers({self: legs})[self.pk]
+
+        return self.get_seat_positions(taken)
+
+    def get_seat_positions(self, seat_numbers):
+        """Where the seats are on the seat chart, leaving out those not on it"""
+
+        return self.get_layout().locate(seat_numbers)
+
+    def get_layout(self) -> SeatLayout:
+        """Where each seat sits on the seat chart of the trip"""
+        return get_layout(self.seatchart_id)
 
     @property
     def seats_available(self) -> int:
-        """Calculate the number of seats available for a trip"""
-        return sum(
-            s.seat_status == Seat.AVAILABLE for s in self.seats.all()
-        )  # type:ignore
+        """The number of seats available for a trip"""
+        return self.available_count
+
+    def shift_seat_counts(self, from_status=None, to_status=None, count=1):
+        """
+        Move `count` seats from one seat status counter to another both in the DB
+        and on this instance.
+
+        Use `from_status=None` for new seats and `to_status=None` for deleted ones.
+        """
+
+        deltas = Seat.get_counter_deltas(from_status, to_status, count)
+        return self.update_inventory(deltas)
+
+    def update_inventory(self, deltas=None):
+        """
+        Apply seat counter deltas and bump the inventory version (and the update
+        time) both in the DB and on this instance. Every change to the seats of a
+        trip goes through here.
+        """
+
+        deltas = {**(deltas or {}), "inventory_version": 1}
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+
+        for field, delta in deltas.items():
+            setattr(self, field, getattr(self, field) + delta)
+
+        self.updated_on = timezone.now()
+
+        updated = Trip.objects.filter(pk=self.pk).update(
+            **{field: F(field) + delta for field, delta in deltas.items()},
+            updated_on=self.updated_on,
+        )
+
+        events.publish(
+            events.SEATS, self.pk, self.company_id, version=self.inventory_version
+        )
+
+        return updated
 
     @property
     def duration(self) -> str:
@@ -554,56 +835,171 @@ class Trip(models.Model):
             Seat(trip=self, seat_number=seat_number) for seat_number in seat_numbers
         ]
 
-        return Seat.objects.bulk_create(objs)
+        with transaction.atomic():
+            seats = Seat.objects.bulk_create(objs)
+
+            statuses = Counter(seat.seat_status for seat in seats)
+            for status, count in statuses.items():
+                self.shift_seat_counts(to_status=status, count=count)
+
+        return seats
+
+    def layout_seats(self, seatchart, lazy=None):
+        """
+        Lay out the seats of the trip from the enabled seats of a seat chart.
 
-    def create_occurrences(self, departures):
+        Lazy trips (LAZY_SEATS by default) only keep the seat numbers and the
+        capacity and create the seat rows as they get held or booked. Otherwise
+        all the seats are created right away.
+        """
+
+        lazy = settings.LAZY_SEATS if lazy is None else lazy
+        seat_numbers = seatchart.get_seat_numbers()
+
+        logger.info("laying out seats:%s lazy:%s..." % (seat_numbers, lazy))
+
+        self.seatchart = seatchart
+
+        if not lazy:
+            with transaction.atomic():
+                self.save(update_fields=["seatchart"])
+                return self.create_seats(*seat_numbers)
+
+        self.seat_numbers = sorted(set(seat_numbers))
+        self.capacity = len(self.seat_numbers)
+
+        with transaction.atomic():
+            self.save(update_fields=["seatchart", "seat_numbers", "capacity"])
+            self.shift_seat_counts(to_status=Seat.AVAILABLE, count=self.capacity)
+
+        return []
+
+    def create_occurrences(self, departures, batch_size=None, progress=None):
         """
         Create multiple occurrences for a trip in one go based on a list
         of departure timestamps.
+
+        The occurrences get the same seats (numbers and types) as this trip, or the
+        same seat chart if its seats are lazy. The
+        departures are consumed in batches of `batch_size` so any iterable (e.g. a
+        lazy rrule) works, and `progress` is called with the number of trips
+        created so far after every batch. All or none of the trips are created.
         """
 
         logger.info("trip: %s" % self)
         logger.info("departures: %s" % departures)
         logger.info("creating occurrences...")
 
-        objs = []
+        batch_size = batch_size or self.OCCURRENCES_BATCH_SIZE
 
+        # Everything the occurrences share is loaded once
+        stops = list(self.route.stops.select_related("name"))
+        locations = {stop.name.abbr: stop.name_id for stop in stops}
+        layout = []
+        if not self.has_lazy_seats:
+            layout = list(self.seats.values_list("seat_number", "seat_type"))
         duration = self.arrival - self.departure
 
-        for departure in departures:
-            arrival = departure + duration
-            schedule = self.route.get_schedule_for_date(departure.date())
-
-            obj = Trip(
-                route=self.route,
-                name=self.name,
-                slug=self.slug,
-                company=self.company,
-                description=self.description,
-                origin=self.origin,
-                destination=self.destination,
-                departure=departure,
-                arrival=arrival,
-                status=self.status,
-                mode=self.mode,
-                schedule=schedule,
-            )
-            objs.append(obj)
+        schedules = {}
+        departures = iter(departures)
+        trips = []
+
+        with transaction.atomic():
+            while batch := list(islice(departures, batch_size)):
+                objs = []
+
+                for departure in batch:
+                    date = departure.date()
+                    if date not in schedules:
+                        schedules[date] = self.route.get_schedule_for_date(
+                            date, stops=stops
+                        )
+
+                    obj = Trip(
+                        route=self.route,
+                        name=self.name,
+                        slug=self.slug,
+                        company=self.company,
+                        description=self.description,
+                        origin=self.origin,
+                        destination=self.destination,
+                        departure=departure,
+                        arrival=departure + duration,
+                        status=self.status,
+                        mode=self.mode,
+                        schedule=schedules[date],
+                        seatchart_id=self.seatchart_id,
+                        seat_numbers=self.seat_numbers,
+                        capacity=self.capacity,
+                        available_count=self.capacity or len(layout),
+                    )
+                    objs.append(obj)
+
+                objs = Trip.objects.bulk_create(objs)
+
+                # New trips have no stops or seats to replace yet. Lazy ones
+                # have no layout to copy either.
+                TripStop.objects.bulk_create(TripStop.objects.build(objs, locations))
+                Seat.objects.bulk_create(
+                    Seat(trip=trip, seat_number=number, seat_type=seat_type)
+                    for trip in objs
+                    for number, seat_type in layout
+                )
+
+                trips += objs
+                logger.info("created %s occurrences..." % len(trips))
+
+                if progress:
+                    progress(len(trips))
+
+        return trips
+
+    def sync_stops(self):
+        """Rebuild the trip stops (search index) from the trip's schedule"""
+        return TripStop.objects.sync(trips=[self])
 
-        return Trip.objects.bulk_create(objs)
+    @property
+    def parsed_schedule(self) -> Schedule:
+        """
+        The schedule with real datetimes, parsed once per instance and shared by all
+        the schedule accessors. Assigning a new schedule rebuilds it.
+        """
+
+        if self._schedule is None or self._schedule.source is not self.schedule:
+            self._schedule = Schedule(self.schedule)
+        return self._schedule
+
+    def get_stop(self, location) -> ScheduleStop:
+        stop = self.parsed_schedule.get(location.abbr)
+
+        if stop is None:
+            raise TripException("Trip does not reach location:%s" % location)
+        return stop
 
     def goes_from(self, origin, destination) -> bool:
-        try:
-            o = self.schedule[origin.abbr]
-            d = self.schedule[destination.abbr]
-        except KeyError:
-            return False
-        else:
-            return o["order"] < d["order"]
+        return self.parsed_schedule.goes_from(origin.abbr, destination.abbr)
+
+    def get_legs(self, origin=None, destination=None) -> int:
+        """
+        Bitmask of the legs travelled between origin and destination.
+        Without them the passenger travels the whole trip.
+        """
+
+        if origin is None and destination is None:
+            return Seat.ALL_LEGS
+
+        if not self.goes_from(origin, destination):
+            raise TripException(
+                "Trip does not goes from %s to %s" % (origin, destination)
+            )
+
+        start = self.get_stop(origin).order
+        end = self.get_stop(destination).order
+
+        return Seat.get_legs_mask(start, end)
 
     def get_schedule(self) -> dict:
-        lst = sorted(self.schedule.items(), key=lambda x: x[1]["order"])
-        return {k: v for k, v in lst}
+        return self.parsed_schedule.ordered
 
     def get_duration(self, origin, destination) -> timedelta:
         if not self.goes_from(origin, destination):
@@ -611,27 +1007,73 @@ class Trip(models.Model):
                 "Trip does not goes from %s to %s" % (origin, destination)
             )
 
-        return self.get_arrival(destination) - self.get_departure(origin)
+        return self.get_stop(destination).arrival - self.get_stop(origin).departure
 
     def get_departure(self, location) -> datetime:
-        try:
-            ts = self.schedule[location.abbr]["departure"]
-        except KeyError:
-            raise TripException("Trip does not reach location:%s" % location)
-        else:
-            return parse_datetime(ts)
+        return self.get_stop(location).departure
 
     def get_arrival(self, location) -> datetime:
-        try:
-            ts = self.schedule[location.abbr]["arrival"]
-        except KeyError:
-            raise TripException("Trip does not reach location:%s" % location)
-        else:
-            return parse_datetime(ts)
+        return self.get_stop(location).arrival
+
+    def set_fare(self, origin, destination, fare):
+        """
+        Remember the fare between two locations (or their abbr codes) so that
+        `get_price` does not have to query it.
+        """
+
+        if self._fares is None:
+            self._fares = {}
+
+        key = (
+            getattr(origin, "abbr", origin),
+            getattr(destination, "abbr", destination),
+        )
+        self._fares[key] = fare
 
     def get_price(self, origin, destination):
+        if self._fares and (origin.abbr, destination.abbr) in self._fares:
+            return self._fares[origin.abbr, destination.abbr]
+
         # TODO: Change to own price grid and not route's
-        return self.route.get_price(origin, destination, self.category)
+        price = self.route.get_price(origin, destination, self.category)
+        self.set_fare(origin, destination, price)
+
+        return price
+
+
+class TripStop(models.Model):
+    """
+    Normalized copy of a trip's schedule with one row per stop.
+
+    This acts as our search index. Searching from A to B is a self join of this
+    table on the trip where A's order is less than B's order.
+
+    Rows are derived from `Trip.schedule` and should never be edited by hand.
+    """
+
+    trip = models.ForeignKey(
+        "trips.Trip", on_delete=models.CASCADE, related_name="trip_stops"
+    )
+    location = models.ForeignKey(
+        "trips.Location", on_delete=models.CASCADE, related_name="trip_stops"
+    )
+    order = models.PositiveIntegerField(_("order"))
+    arrival = models.DateTimeField(_("arrival"))
+    departure = models.DateTimeField(_("departure"))
+
+    objects = TripStopManager()
+
+    class Meta:
+        ordering = ("order",)
+        unique_together = ("trip", "location")
+        verbose_name = _("trip stop")
+        verbose_name_plural = _("trip stops")
+        indexes = [
+            models.Index(fields=["location", "departure"]),
+        ]
+
+    def __str__(self):
+        return f"{self.order}. {self.location_id}"
 
 
 class Seat(models.Model):
@@ -677,18 +1119,201 @@ class Seat(models.Model):
         _("seat status"), choices=SEAT_STATUS_CHOICES, default=AVAILABLE, max_length=1
     )
 
+    # Per leg occupancy where bit `n` is the leg from the stop with order `n` to the
+    # next one. `seat_status` is only a summary of these over the whole trip.
+    held_legs = models.BigIntegerField(_("held legs"), default=0, editable=False)
+    booked_legs = models.BigIntegerField(_("booked legs"), default=0, editable=False)
+
+    # Holds are leases taken by an unpaid order. Once expired the held legs count
+    # as free and the seat is released by the `release_expired_holds` command.
+    held_until = models.DateTimeField(_("held until"), null=True, blank=True)
+    hold_order = models.ForeignKey(
+        "orders.Order",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="held_seats",
+    )
+
+    objects = SeatManager()
+
+    _loaded_status = None
+
+    # Every bit set so that the seat is taken on any leg of the trip
+    ALL_LEGS = -1
+
+    # Legs must fit in a signed bigint
+    MAX_LEGS = 62
+
+    # Which counter on the trip each seat status is accounted in
+    COUNTERS = {
+        AVAILABLE: "available_count",
+        ONHOLD: "held_count",
+        BOOKED: "booked_count",
+        RESERVED: "booked_count",
+    }
+
+    # Fields written along with the legs whenever they change
+    LEGS_FIELDS = [
+        "held_legs",
+        "booked_legs",
+        "seat_status",
+        "held_until",
+        "hold_order",
+    ]
+
     class Meta:
         unique_together = ("trip", "seat_number")
+        indexes = [
+            models.Index(
+                fields=["held_until"],
+                condition=models.Q(held_until__isnull=False),
+                name="seat_hold_expiry_idx",
+            ),
+        ]
         verbose_name = _("seat")
         verbose_name_plural = _("seats")
 
     def __str__(self):
         return f"{str(self.seat_number)}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+
+        # Remember the status in DB so that save() knows which counters to move
+        if "seat_status" in field_names:
+            instance._loaded_status = instance.seat_status
+
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        from_status = None if self._state.adding else self._loaded_status
+
+        if self._state.adding and self.trip.has_lazy_seats:
+            # Seats of a lazy trip are counted as available before being stored
+            from_status = Seat.AVAILABLE
+
+        self.sync_legs()
+
+        if update_fields is not None and "seat_status" in update_fields:
+            kwargs["update_fields"] = {*update_fields, *Seat.LEGS_FIELDS}
+
+        if not (self._state.adding or from_status):
+            # Status was deferred while loading so read it from DB
+            qs = Seat.objects.filter(pk=self.pk)
+            from_status = qs.values_list("seat_status", flat=True).first()
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            if update_fields is None or "seat_status" in update_fields:
+                self.trip.shift_seat_counts(from_status, self.seat_status)
+
+        self._loaded_status = self.seat_status
+
+    @classmethod
+    def get_counter_deltas(cls, from_status=None, to_status=None, count=1) -> dict:
+        """
+        Build the changes needed on the trip seat counters when `count` seats
+        move from one status to another.
+        """
+
+        deltas = Counter()
+
+        if from_status:
+            deltas[cls.COUNTERS[from_status]] -= count
+
+        if to_status:
+            deltas[cls.COUNTERS[to_status]] += count
+
+        return {field: delta for field, delta in deltas.items() if delta}
+
+    @classmethod
+    def get_legs_mask(cls, start: int, end: int) -> int:
+        """Bitmask of the legs travelled from stop order `start` to stop order `end`"""
+
+        if not 0 <= start < end <= cls.MAX_LEGS:
+            raise SeatException("Invalid legs from stop %s to %s" % (start, end))
+
+        return (1 << end) - (1 << start)
+
+    @property
+    def hold_expired(self) -> bool:
+        return self.held_until is not None and self.held_until <= timezone.now()
+
+    def get_held_legs(self) -> int:
+        """Legs held by a hold that hasn't expired yet"""
+        return 0 if self.hold_expired else self.held_legs
+
+    def is_held_by(self, order) -> bool:
+        """Whether a hold that hasn't expired yet belongs to `order` (or no order)"""
+
+        if self.hold_expired:
+            return False
+        return self.hold_order_id == (order.pk if order is not None else None)
+
+    def get_taken_legs(self, order=None) -> int:
+        """Legs booked, or held by a live hold of anyone but `order`"""
+
+        held = 0 if self.is_held_by(order) else self.get_held_legs()
+        return self.booked_legs | held
+
+    def is_free(self, legs=ALL_LEGS) -> bool:
+        """Whether the seat is neither held nor booked on any of the legs"""
+        return not (self.get_held_legs() | self.booked_legs) & legs
+
+    def hold(self, legs, order=None, timeout=None):
+        """
+        Hold the legs for `order` until the timeout (SEAT_HOLD_TIMEOUT by default)
+        taking over any expired hold. Call `is_free` first.
+        """
+
+        timeout = settings.SEAT_HOLD_TIMEOUT if timeout is None else timeout
+
+        if self.hold_expired:
+            self.held_legs = 0
+
+        self.held_legs |= legs
+        self.held_until = timezone.now() + timedelta(seconds=timeout)
+        self.hold_order = order
+
+    def sync_hold(self):
+        """A seat which isn't held on any leg anymore has no hold lease"""
+
+        if not self.held_legs:
+            self.held_until = self.hold_order = None
+
+    def get_status_for_legs(self) -> str:
+        """Summarize the per leg occupancy as a seat status for the whole trip"""
+
+        if self.booked_legs:
+            return Seat.RESERVED if self.seat_status == Seat.RESERVED else Seat.BOOKED
+        elif self.held_legs:
+            return Seat.ONHOLD
+        return Seat.AVAILABLE
+
+    def sync_legs(self):
+        """
+        Seats whose status was set directly i.e. in the admin or by `book()` take
+        the whole trip.
+        """
+
+        if self.seat_status == Seat.AVAILABLE:
+            self.held_legs = self.booked_legs = 0
+        elif self.seat_status == Seat.ONHOLD and not self.held_legs:
+            self.held_legs = Seat.ALL_LEGS
+        elif self.seat_status in (Seat.BOOKED, Seat.RESERVED) and not self.booked_legs:
+            self.booked_legs, self.held_legs = self.held_legs or Seat.ALL_LEGS, 0
+
+        self.sync_hold()
+
     def get_row_col(self):
-        """Get a row col representation of a seat number"""
+        """Where the seat is on the seat chart, see `SeatLayout.locate`"""
 
-        return SEAT_MAP.get(str(self.seat_number))
+        positions = self.trip.get_layout().locate([self.seat_number])
+        return positions[0] if positions else None
 
     def book(self):
         """Mark a seat as booked only if its available."""
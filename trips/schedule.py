@@ -0,0 +1,71 @@
+"""
+Parsed view of `Trip.schedule`.
+
+The schedule is stored as JSON so timestamps come back from the DB as ISO strings.
+Parsing it once per trip instance lets all the schedule accessors (and the template
+tags that call them for every trip on a page) share real datetimes.
+"""
+
+from datetime import datetime
+
+from django.utils.dateparse import parse_datetime
+
+
+def to_datetime(value):
+    """Schedules hold datetimes in memory but ISO strings once loaded from DB"""
+    return value if isinstance(value, datetime) else parse_datetime(value)
+
+
+class ScheduleStop:
+    """A single stop of a trip's schedule"""
+
+    __slots__ = ("code", "order", "arrival", "departure")
+
+    def __init__(self, code, order, arrival, departure):
+        self.code = code
+        self.order = order
+        self.arrival = arrival
+        self.departure = departure
+
+    def __repr__(self):
+        return f"<ScheduleStop {self.order}. {self.code}>"
+
+
+class Schedule:
+    """
+    Stops of a trip sorted by their order along with an abbr code -> index map.
+    """
+
+    __slots__ = ("source", "stops", "index", "ordered")
+
+    def __init__(self, schedule: dict):
+        items = sorted(schedule.items(), key=lambda x: x[1]["order"])
+
+        self.source = schedule
+        self.stops = [
+            ScheduleStop(
+                code=code,
+                order=stop["order"],
+                arrival=to_datetime(stop["arrival"]),
+                departure=to_datetime(stop["departure"]),
+            )
+            for code, stop in items
+        ]
+        self.index = {stop.code: i for i, stop in enumerate(self.stops)}
+        self.ordered = dict(items)
+
+    def __len__(self):
+        return len(self.stops)
+
+    def __iter__(self):
+        return iter(self.stops)
+
+    def get(self, code) -> ScheduleStop | None:
+        i = self.index.get(code)
+        return None if i is None else self.stops[i]
+
+    def goes_from(self, origin_code, destination_code) -> bool:
+        try:
+            return self.index[origin_code] < self.index[destination_code]
+        except KeyError:
+            return False
@@ -1,50 +1,152 @@
-SEAT_MAP = {
-    "1": (0, 0),
-    "2": (0, 1),
-    "3": (0, 2),
-    "4": (0, 3),
-    "5": (1, 0),
-    "6": (1, 1),
-    "7": (1, 2),
-    "8": (1, 3),
-    "9": (2, 0),
-    "10": (2, 1),
-    "11": (2, 2),
-    "12": (2, 3),
-    "13": (3, 0),
-    "14": (3, 1),
-    "15": (3, 2),
-    "16": (3, 3),
-    "17": (4, 0),
-    "18": (4, 1),
-    "19": (4, 2),
-    "20": (4, 3),
-    "21": (5, 0),
-    "22": (5, 1),
-    "23": (5, 2),
-    "24": (5, 3),
-    "25": (6, 0),
-    "26": (6, 1),
-    "27": (6, 2),
-    "28": (6, 3),
-    "29": (7, 0),
-    "30": (7, 1),
-    "31": (7, 2),
-    "32": (7, 3),
-    "33": (8, 0),
-    "34": (8, 1),
-    "35": (8, 2),
-    "36": (8, 3),
-    "37": (9, 0),
-    "38": (9, 1),
-    "39": (9, 2),
-    "40": (9, 3),
-    "41": (10, 0),
-    "42": (10, 1),
-    "43": (10, 2),
-    "44": (10, 3),
-    "45": (11, 0),
-    "46": (11, 1),
-    "47": (11, 2),
-    "48": (11, 3),
-}
+"""
+Where each seat number sits on the seat chart drawn by seatchart.js.
+
+Seat charts are compiled once per worker into a `SeatLayout`: flat arrays indexed
+by seat number holding the deck, row and column of every seat. Trips without a
+seat chart use `DEFAULT_LAYOUT`, a single deck of 4 seats per row.
+"""
+
+import logging
+import time
+from array import array
+from typing import NamedTuple
+
+from django.apps import apps
+
+logger = logging.getLogger(__name__)
+
+LOWER = "lower"
+UPPER = "upper"
+DECKS = (LOWER, UPPER)
+
+# Seconds a compiled layout is used before reading its seat chart again
+LAYOUTS_MAX_AGE = 300
+
+# Marks seat numbers that are not on the layout
+NOWHERE = -1
+
+
+class SeatPosition(NamedTuple):
+    row: int
+    col: int
+    deck: str = LOWER
+
+
+class SeatLayout:
+    """Deck, row and column of every seat number of a seat chart"""
+
+    __slots__ = ("decks", "rows", "cols", "double_deck", "created")
+
+    def __init__(self, positions: dict[int, SeatPosition]):
+        size = max(positions, default=0) + 1
+
+        self.decks = array("b", [NOWHERE]) * size
+        self.rows = array("h", [NOWHERE]) * size
+        self.cols = array("h", [NOWHERE]) * size
+        self.double_deck = any(p.deck == UPPER for p in positions.values())
+        self.created = time.monotonic()
+
+        for number, position in positions.items():
+            self.decks[number] = DECKS.index(position.deck)
+            self.rows[number] = position.row
+            self.cols[number] = position.col
+
+    def __len__(self):
+        return sum(1 for deck in self.decks if deck != NOWHERE)
+
+    def __contains__(self, number):
+        return 0 <= number < len(self.decks) and self.decks[number] != NOWHERE
+
+    def get(self, number) -> SeatPosition | None:
+        number = int(number)
+
+        if number not in self:
+            return None
+
+        return SeatPosition(
+            self.rows[number], self.cols[number], DECKS[self.decks[number]]
+        )
+
+    def locate(self, numbers) -> list:
+        """
+        Positions of seat numbers as seatchart.js takes them: `[row, col]`, with
+        the deck only on double-deck layouts. Seats off the layout are left out.
+        """
+
+        positions = [self.get(number) for number in numbers if number in self]
+
+        if self.double_deck:
+            return positions
+
+        return [position[:2] for position in positions]
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.created > LAYOUTS_MAX_AGE
+
+    @classmethod
+    def grid(cls, rows, columns, deck=LOWER, start=1) -> "SeatLayout":
+        """Seats numbered left to right and front to back"""
+
+        return cls(
+            {
+                start + row * columns + col: SeatPosition(row, col, deck)
+                for row in range(rows)
+                for col in range(columns)
+            }
+        )
+
+    @classmethod
+    def compile(cls, json: dict) -> "SeatLayout":
+        """
+        Build the layout of a seat chart. Seats are placed by the labels of each
+        deck ("<row><col>": "<seat number>") and a seat labelled on both decks is
+        placed on the one it's enabled on.
+        """
+
+        positions = {}
+        enabled = {}
+
+        for deck in DECKS:
+            chart = json.get(deck) or {}
+
+            for key, label in chart.get("labels", {}).items():
+                if label.isdigit() and key.isdigit() and len(key) > 1:
+                    position = SeatPosition(int(key[:-1]), int(key[-1]), deck)
+                    positions.setdefault(int(label), position)
+
+                    if int(label) in chart.get("enabledSeats", []):
+                        enabled[int(label)] = position
+
+        return cls({**positions, **enabled})
+
+
+DEFAULT_LAYOUT = SeatLayout.grid(rows=12, columns=4)
+
+_layouts = {}
+
+
+def get_layout(seatchart_id=None) -> SeatLayout:
+    """The compiled layout of a seat chart, the default one without a seat chart"""
+
+    if seatchart_id is None:
+        return DEFAULT_LAYOUT
+
+    layout = _layouts.get(seatchart_id)
+
+    if layout is None or layout.is_stale():
+        logger.info("compiling seat chart(💺):%s..." % seatchart_id)
+
+        SeatChart = apps.get_model("companies", "SeatChart")
+        qs = SeatChart.objects.filter(pk=seatchart_id).values_list("json", flat=True)
+        json = qs.first()
+
+        # Charts without labels fall back to the default layout
+        layout = SeatLayout.compile(json or {}) or DEFAULT_LAYOUT
+        _layouts[seatchart_id] = layout
+
+    return layout
+
+
+def forget_layout(seatchart_id):
+    """Compile the seat chart again next time, e.g. after it was edited"""
+    _layouts.pop(seatchart_id, None)
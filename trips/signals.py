@@ -0,0 +1,113 @@
+import logging
+
+from django.db.models import F, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from companies.models import SeatChart
+from trips import events
+from trips.models import Location, Price, Seat, Trip
+from trips.seat_map import forget_layout
+
+logger = logging.getLogger(__name__)
+
+
+def seat_post_delete_receiver(sender, instance, origin=None, **kwargs):
+    """
+    Keep the seat counters of a trip in sync when its seats are deleted.
+
+    Nothing to do when the seats are going away because the trip itself is
+    being deleted.
+    """
+
+    deleting_trips = isinstance(origin, Trip) or (
+        isinstance(origin, QuerySet) and origin.model is Trip
+    )
+
+    if deleting_trips:
+        return
+
+    # Seats of a lazy trip are still there once deleted, just not stored
+    lazy = Trip.objects.filter(pk=instance.trip_id, capacity__gt=0).exists()
+    to_status = Seat.AVAILABLE if lazy else None
+
+    deltas = Seat.get_counter_deltas(instance.seat_status, to_status)
+    deltas["inventory_version"] = 1
+
+    logger.debug("seat %s deleted, updating counters %s..." % (instance, deltas))
+
+    Trip.objects.filter(pk=instance.trip_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()},
+        updated_on=timezone.now(),
+    )
+    events.publish(events.SEATS, instance.trip_id)
+
+
+post_delete.connect(
+    seat_post_delete_receiver,
+    sender=Seat,
+    dispatch_uid="seat_post_delete_receiver",
+)
+
+
+def price_changed_receiver(sender, instance, **kwargs):
+    """
+    Mark the future trips of a route as edited when its prices change so that
+    cached search results for them are refreshed.
+    """
+
+    now = timezone.now()
+    qs = Trip.objects.filter(route_id=instance.route_id, departure__gt=now)
+    updated = qs.update(updated_on=now)
+
+    logger.debug("price %s changed, touched %s trips..." % (instance, updated))
+
+
+post_save.connect(
+    price_changed_receiver,
+    sender=Price,
+    dispatch_uid="price_post_save_receiver",
+)
+post_delete.connect(
+    price_changed_receiver,
+    sender=Price,
+    dispatch_uid="price_post_delete_receiver",
+)
+
+
+def location_changed_receiver(sender, instance, **kwargs):
+    """Reload the cached locations (and autocomplete) of all workers"""
+
+    logger.debug("location %s changed, invalidating cache..." % instance)
+    Location.objects.invalidate_cache()
+
+
+post_save.connect(
+    location_changed_receiver,
+    sender=Location,
+    dispatch_uid="location_post_save_receiver",
+)
+post_delete.connect(
+    location_changed_receiver,
+    sender=Location,
+    dispatch_uid="location_post_delete_receiver",
+)
+
+
+def seatchart_changed_receiver(sender, instance, **kwargs):
+    """Compile the seat chart again (in this worker, others catch up shortly)"""
+
+    logger.debug("seat chart %s changed, forgetting its layout..." % instance)
+    forget_layout(instance.pk)
+
+
+post_save.connect(
+    seatchart_changed_receiver,
+    sender=SeatChart,
+    dispatch_uid="seatchart_post_save_receiver",
+)
+post_delete.connect(
+    seatchart_changed_receiver,
+    sender=SeatChart,
+    dispatch_uid="seatchart_post_delete_receiver",
+)
@@ -1,3 +1,6 @@
+# Busiest terminals shown first in the autocomplete
+IMP_LOCATIONS = ["BUE", "DELE", "ROS", "MDP", "CBA", "MZA", "IGU", "SFE", "POS"]
+
 TERMINALS = [
     "9 de Julio",
     "Abra Pampa",
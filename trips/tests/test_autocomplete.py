@@ -0,0 +1,65 @@
+from django.test import TestCase
+
+from trips import autocomplete
+from trips.factories import LocationFactory
+from trips.terminals import IMP_LOCATIONS
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        self.cordoba = LocationFactory(
+            name="Córdoba", abbr="CBA", city="Córdoba", state="Córdoba"
+        )
+        self.corrientes = LocationFactory(
+            name="Corrientes", abbr="CTES", city="Corrientes", state="Corrientes"
+        )
+        self.villa_maria = LocationFactory(
+            name="Villa María", abbr="VMAR", city="Villa María", state="Córdoba"
+        )
+        self.rosario = LocationFactory(
+            name="Rosario", abbr="ROS", city="Rosario", state="Santa Fe"
+        )
+
+    def search(self, q, limit=10):
+        return [x["value"] for x in autocomplete.search(q, limit=limit)]
+
+    def test_fold_strips_accents_and_case(self):
+        self.assertEqual(autocomplete.fold("Córdoba (Ñandú)"), "cordoba  nandu ")
+
+    def test_prefix_search_is_accent_insensitive(self):
+        self.assertEqual(self.search("cor"), ["CBA", "CTES", "VMAR"])
+        self.assertEqual(self.search("CÓRD")[0], "CBA")
+        self.assertEqual(self.search("mari"), ["VMAR"])
+
+    def test_every_word_of_the_query_must_match(self):
+        self.assertEqual(self.search("villa cord"), ["VMAR"])
+        self.assertEqual(self.search("santa ros"), ["ROS"])
+
+    def test_exact_abbr_ranks_first(self):
+        self.assertEqual(self.search("ctes")[0], "CTES")
+
+    def test_important_locations_rank_first(self):
+        self.assertIn("CBA", IMP_LOCATIONS)
+        self.assertNotIn("CTES", IMP_LOCATIONS)
+
+        # Both start with "co" but Córdoba is a busier terminal
+        self.assertEqual(self.search("co", limit=1), ["CBA"])
+
+    def test_typos_fall_back_to_fuzzy_matches(self):
+        self.assertEqual(self.search("rosarip"), ["ROS"])
+        self.assertEqual(self.search("xyzxyz"), [])
+
+    def test_results_have_the_same_shape_as_terminals_json(self):
+        (result,) = autocomplete.search("rosario")
+
+        self.assertEqual(result["value"], "ROS")
+        self.assertTrue(result["label"].startswith("(ROS) Rosario (Santa Fe)"))
+
+    def test_index_is_rebuilt_when_locations_change(self):
+        index = autocomplete.get_index()
+        self.assertIs(autocomplete.get_index(), index)
+
+        LocationFactory(name="Corral de Bustos", abbr="CBUS")
+
+        self.assertIsNot(autocomplete.get_index(), index)
+        self.assertIn("CBUS", self.search("corral"))
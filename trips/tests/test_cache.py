@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.test import TestCase
+from django.utils import timezone
+
+from trips import cache as search_cache
+from trips.factories import PriceFactory, TripTomorrowFactory
+from trips.models import Trip
+
+
+class SearchCacheTests(TestCase):
+    def setUp(self):
+        search_cache.get_search_cache().clear()
+
+        self.trip = TripTomorrowFactory(status=Trip.ACTIVE)
+        self.trip.create_seats(1, 2, 3)
+
+        stops = self.trip.trip_stops.select_related("location")
+        self.a, self.b, self.c, self.d = [s.location for s in stops]
+        self.departure = self.trip.departure.date()
+
+    def search(self, origin=None, destination=None):
+        return search_cache.search(
+            origin=origin or self.a,
+            destination=destination or self.d,
+            departure=self.departure,
+        )
+
+    def test_repeated_search_is_served_from_cache(self):
+        trips = self.search()
+        self.assertEqual(search_cache.get_stats()["misses"], 1)
+
+        with self.assertNumQueries(2):  # <-- the inventory stamp and the trips
+            cached = self.search()
+            cached[0].get_price(self.a, self.d)
+            cached[0].company.name
+
+        self.assertEqual(cached, trips)
+        self.assertEqual(cached[0].availability, 3)
+        self.assertEqual(search_cache.get_stats()["hits"], 1)
+
+    def test_only_plain_values_are_cached(self):
+        self.search()
+
+        key = search_cache.get_search_key(self.a, self.d, self.departure)
+        [result] = search_cache.get_search_cache().get(key)
+
+        self.assertEqual(
+            result,
+            {
+                "id": self.trip.pk,
+                "departure": self.trip.departure,
+                "availability": 3,
+                "fare": 0,
+            },
+        )
+
+    def test_results_expire_with_the_first_hold(self):
+        self.assertIs(search_cache.get_timeout([self.trip]), DEFAULT_TIMEOUT)
+
+        self.trip.hold_seats("1,2")
+        self.trip.seats.filter(seat_number=1).update(
+            held_until=timezone.now() + timedelta(seconds=60)
+        )
+
+        self.assertIn(search_cache.get_timeout([self.trip]), (59, 60))
+
+    def test_seat_changes_refresh_cached_results(self):
+        self.assertEqual(self.search(self.b, self.c)[0].availability, 3)
+
+        self.trip.hold_seats("1", self.a, self.c)
+
+        self.assertEqual(self.search(self.b, self.c)[0].availability, 2)
+        self.assertEqual(search_cache.get_stats()["misses"], 2)
+
+    def test_trip_and_price_changes_refresh_cached_results(self):
+        key = search_cache.get_search_key(self.a, self.d, self.departure)
+
+        self.trip.status = Trip.CANCELLED
+        self.trip.save()
+        self.assertEqual(self.search(), [])
+
+        key_after_trip = search_cache.get_search_key(self.a, self.d, self.departure)
+        self.assertNotEqual(key, key_after_trip)
+
+        PriceFactory(route=self.trip.route)
+        key_after_price = search_cache.get_search_key(self.a, self.d, self.departure)
+        self.assertNotEqual(key_after_trip, key_after_price)
+
+    def test_reset_stats_clears_counters(self):
+        self.search()
+        self.search()
+
+        self.assertEqual(
+            search_cache.get_stats(), {"hits": 1, "misses": 1, "ratio": 0.5}
+        )
+
+        search_cache.reset_stats()
+        self.assertEqual(search_cache.get_stats()["misses"], 0)
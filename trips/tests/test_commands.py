@@ -1,8 +1,16 @@
+from datetime import timedelta
 from io import StringIO
 
-from django.core.management import call_command
-from django.test import TestCase
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
 
+from trips.factories import (
+    SeatFactory,
+    TripDayAfterTomorrowFactory,
+    TripPastFactory,
+    TripTomorrowFactory,
+)
 from trips.models import Location, Seat, Trip
 
 
@@ -23,3 +31,167 @@ class SetupTripDataTests(TestCase):
 
         # Assert: command output
         self.assertIn("All done!", out.getvalue())
+
+
+class RebuildSeatCountsTests(TestCase):
+    def test_command_fixes_drifted_counters(self):
+        # Arrange
+        trip = TripTomorrowFactory()
+        SeatFactory.create_batch(size=3, trip=trip, seat_status=Seat.AVAILABLE)
+        SeatFactory.create_batch(size=2, trip=trip, seat_status=Seat.ONHOLD)
+        SeatFactory(trip=trip, seat_status=Seat.RESERVED)
+
+        Trip.objects.update(available_count=40, held_count=-1, booked_count=0)
+
+        # Act
+        out = StringIO()
+        call_command("rebuild_seat_counts", stdout=out)
+
+        # Assert
+        trip.refresh_from_db()
+        self.assertEqual(trip.available_count, 3)
+        self.assertEqual(trip.held_count, 2)
+        self.assertEqual(trip.booked_count, 1)
+
+        self.assertIn("All done!", out.getvalue())
+
+    def test_command_counts_seats_never_stored_as_available(self):
+        # Arrange: a lazy trip of 10 seats with 2 of them stored
+        trip = TripTomorrowFactory(seat_numbers=list(range(1, 11)), capacity=10)
+        SeatFactory(trip=trip, seat_status=Seat.AVAILABLE)
+        SeatFactory(trip=trip, seat_status=Seat.BOOKED)
+
+        Trip.objects.update(available_count=0, held_count=0, booked_count=0)
+
+        # Act
+        call_command("rebuild_seat_counts", stdout=StringIO())
+
+        # Assert
+        trip.refresh_from_db()
+        self.assertEqual(trip.available_count, 9)
+        self.assertEqual(trip.booked_count, 1)
+
+    def test_command_bumps_the_inventory_version_of_drifted_trips_only(self):
+        # Arrange
+        trip, drifted = TripTomorrowFactory(), TripTomorrowFactory()
+        SeatFactory(trip=trip, seat_status=Seat.BOOKED)
+        SeatFactory(trip=drifted, seat_status=Seat.BOOKED)
+
+        call_command("rebuild_seat_counts", stdout=StringIO())
+        Trip.objects.filter(pk=drifted.pk).update(booked_count=0)
+        versions = dict(Trip.objects.values_list("pk", "inventory_version"))
+
+        # Act
+        out = StringIO()
+        call_command("rebuild_seat_counts", stdout=out)
+
+        # Assert
+        trip.refresh_from_db()
+        drifted.refresh_from_db()
+        self.assertEqual(trip.inventory_version, versions[trip.pk])
+        self.assertEqual(drifted.inventory_version, versions[drifted.pk] + 1)
+        self.assertEqual(drifted.booked_count, 1)
+
+        self.assertIn("Trips updated:1", out.getvalue())
+
+
+class MaterializeTripsTests(TestCase):
+    def test_command_creates_only_missing_trips(self):
+        # Arrange
+        trip = TripTomorrowFactory(status=Trip.ACTIVE)
+        trip.create_seats(1, 2, 3)
+        route = trip.route
+
+        # Act
+        out = StringIO()
+        call_command("materialize_trips", days=5, stdout=out)
+
+        # Assert: a trip per day with the same seats as the copied trip
+        trips = route.trips.exclude(pk=trip.pk)
+        departures = route.get_departures(timezone.localdate(), 5)
+
+        # Tomorrow has a trip already, off the timetable
+        self.assertGreaterEqual(trips.count(), 3)
+        self.assertFalse(trips.filter(departure__date=trip.departure.date()).exists())
+        self.assertEqual(
+            route.trips.values("departure__date").distinct().count(),
+            route.trips.count(),
+        )
+
+        for future_trip in trips:
+            self.assertIn(future_trip.departure, departures)
+            self.assertEqual(future_trip.seats.count(), 3)
+            self.assertEqual(future_trip.available_count, 3)
+
+        self.assertIn("Trips created:%s" % trips.count(), out.getvalue())
+
+        # Act: running it again is a no-op
+        out = StringIO()
+        call_command("materialize_trips", days=5, stdout=out)
+
+        self.assertIn("Trips created:0", out.getvalue())
+        self.assertIn("All done!", out.getvalue())
+
+    def test_routes_without_future_active_trips_fail(self):
+        TripTomorrowFactory(status=Trip.CANCELLED)
+        TripPastFactory(status=Trip.ACTIVE)
+
+        err = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("materialize_trips", stdout=StringIO(), stderr=err)
+
+        self.assertEqual(Trip.objects.count(), 2)
+        self.assertIn("has no future trip to copy from", err.getvalue())
+
+    def test_the_latest_future_trip_is_copied(self):
+        trip = TripTomorrowFactory(status=Trip.ACTIVE)
+        later = TripDayAfterTomorrowFactory(route=trip.route, status=Trip.ACTIVE)
+        later.create_seats(4, 5)
+
+        trips = trip.route.materialize_trips(days=5)
+
+        self.assertTrue(trips)
+        for future_trip in trips:
+            self.assertEqual(future_trip.seats.count(), 2)
+
+
+class ReleaseExpiredHoldsTests(TestCase):
+    def test_command_releases_only_expired_holds(self):
+        # Arrange
+        trip = TripTomorrowFactory()
+        trip.create_seats(1, 2, 3)
+        trip.hold_seats("1, 2, 3")
+
+        trip.seats.filter(seat_number__in=[1, 2]).update(
+            held_until=timezone.now() - timedelta(minutes=1)
+        )
+
+        # Act
+        out = StringIO()
+        call_command("release_expired_holds", batch_size=1, stdout=out)
+
+        # Assert
+        seats = trip.seats.order_by("seat_number")
+        self.assertEqual(
+            [seat.seat_status for seat in seats],
+            [Seat.AVAILABLE, Seat.AVAILABLE, Seat.ONHOLD],
+        )
+        self.assertIsNone(seats[0].held_until)
+        self.assertIsNotNone(seats[2].held_until)
+
+        trip.refresh_from_db()
+        self.assertEqual(trip.available_count, 2)
+        self.assertEqual(trip.held_count, 1)
+
+        self.assertIn("Seats released:2", out.getvalue())
+        self.assertIn("All done!", out.getvalue())
+
+
+class StressSeatHoldsTests(TransactionTestCase):
+    def test_concurrent_holds_never_allot_a_seat_twice(self):
+        out = StringIO()
+        call_command("stress_seat_holds", threads=6, seats=10, stdout=out)
+
+        self.assertIn("Seats held:10", out.getvalue())
+        self.assertIn("No seat was allotted twice", out.getvalue())
+        self.assertFalse(Trip.objects.exists())
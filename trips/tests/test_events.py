@@ -0,0 +1,102 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from asgiref.sync import sync_to_async
+
+from trips import events
+from trips.factories import TripTomorrowFactory
+from trips.models import Trip
+
+
+class TripEventsTests(TestCase):
+    def setUp(self):
+        self.trip = TripTomorrowFactory()
+        self.trip.create_seats(1, 2, 3)
+
+    def tearDown(self):
+        events.broker.subscriptions.clear()
+
+    def hold_seat(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip.hold_seats("1")
+
+    def cancel_trip(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.trip.status = Trip.CANCELLED
+            self.trip.save()
+
+        return callbacks
+
+    async def test_seat_changes_reach_the_trip_and_company_streams(self):
+        by_trip = events.subscribe(events.trip_topic(self.trip.pk))
+        by_company = events.subscribe(events.company_topic(self.trip.company_id))
+
+        await sync_to_async(self.hold_seat)()
+
+        for subscription in (by_trip, by_company):
+            event = await subscription.get(timeout=1)
+
+            self.assertEqual(event["event"], events.SEATS)
+            self.assertEqual(event["trip"], str(self.trip.pk))
+            self.assertEqual(event["version"], self.trip.inventory_version)
+
+            events.broker.unsubscribe(subscription)
+
+        self.assertEqual(len(events.broker), 0)
+
+    async def test_events_are_not_published_before_commit(self):
+        subscription = events.subscribe(events.trip_topic(self.trip.pk))
+
+        callbacks = await sync_to_async(self.cancel_trip)()
+        self.assertTrue(subscription.queue.empty())
+
+        for callback in callbacks:
+            callback()
+
+        event = await subscription.get(timeout=1)
+        self.assertEqual(event["event"], events.TRIP)
+        self.assertEqual(event["status"], Trip.CANCELLED)
+
+        events.broker.unsubscribe(subscription)
+
+    @mock.patch("trips.events.KEEPALIVE", 0.01)
+    async def test_stream_sends_events_and_keepalives(self):
+        stream = events.stream(events.trip_topic(self.trip.pk))
+
+        self.assertEqual(await anext(stream), "retry: %s\n\n" % events.RETRY)
+        self.assertEqual(await anext(stream), ": keepalive\n\n")
+
+        events.broker.dispatch({"event": events.SEATS, "trip": str(self.trip.pk)})
+
+        chunk = await anext(stream)
+        event, data = chunk.strip().split("\n")
+
+        self.assertEqual(event, "event: seats")
+        self.assertEqual(json.loads(data.removeprefix("data: "))["event"], "seats")
+
+        await stream.aclose()
+        self.assertEqual(len(events.broker), 0)
+
+
+@override_settings(TRIP_EVENTS_BACKEND=events.POSTGRES)
+class PostgresTripEventsTests(TransactionTestCase):
+    def tearDown(self):
+        events.listener.stop()
+
+    async def test_committed_changes_are_notified_to_listeners(self):
+        trip = await sync_to_async(TripTomorrowFactory)()
+        await sync_to_async(trip.create_seats)(1, 2)
+
+        subscription = events.subscribe(events.trip_topic(trip.pk))
+        await sync_to_async(trip.hold_seats)("2")
+
+        event = await subscription.get(timeout=5)
+        while event["version"] != trip.inventory_version:
+            event = await subscription.get(timeout=5)
+
+        self.assertEqual(event["event"], events.SEATS)
+        self.assertEqual(event["company"], str(trip.company_id))
+
+        events.broker.unsubscribe(subscription)
@@ -1,12 +1,17 @@
 from datetime import date, timedelta
 
+from django.conf import settings
+from django.core.management import call_command
 from django.http import Http404
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
 from companies.factories import CompanyFactory
+from orders.factories import OrderFactory, PassengerFactory
+from trips.booking import SeatConflict
 from trips.factories import (
     LocationFactory,
+    PriceFactory,
     SeatFactory,
     TripDayAfterTomorrowFactory,
     TripPastFactory,
@@ -389,6 +394,63 @@ class FutureManagerSearchTests(TestCase):
         # We should get zero results
         self.assertEqual(qs.count(), 0)
 
+    def test_search_finds_trips_between_intermediate_stops(self):
+        """
+        Our trips have stops a -> b -> c -> d. Searching between any two of them in
+        the right direction should find the trip.
+        """
+
+        trip = TripTomorrowFactory(status=Trip.ACTIVE)
+        a, b, c, d = [s.location for s in trip.trip_stops.select_related("location")]
+        departure = trip.departure.date()
+
+        for origin, destination in ((a, d), (b, c), (b, d), (c, d)):
+            qs = Trip.future.search(
+                origin=origin, destination=destination, departure=departure
+            )
+            self.assertIn(trip, qs)
+
+        # Never in the reverse direction
+        for origin, destination in ((d, a), (c, b), (b, b)):
+            qs = Trip.future.search(
+                origin=origin, destination=destination, departure=departure
+            )
+            self.assertNotIn(trip, qs)
+
+    def test_search_availability_only_counts_seats_taken_on_searched_legs(self):
+        trip = TripTomorrowFactory(status=Trip.ACTIVE)
+        trip.create_seats(1, 2)
+        a, b, c, d = [s.location for s in trip.trip_stops.select_related("location")]
+        departure = trip.departure.date()
+
+        trip.hold_seats("1", a, b)
+        trip.hold_seats("2", c, d)
+
+        expected = {(a, b): 1, (b, c): 2, (c, d): 1, (a, d): 0}
+        for (origin, destination), availability in expected.items():
+            qs = Trip.future.search(
+                origin=origin, destination=destination, departure=departure
+            )
+            self.assertEqual(qs.get(id=trip.id).availability, availability)
+
+        # Expired holds count as free even before being released
+        trip.seats.filter(seat_number=1).update(held_until=timezone.now())
+        qs = Trip.future.search(origin=a, destination=d, departure=departure)
+        self.assertEqual(qs.get(id=trip.id).availability, 1)
+
+    def test_search_results_are_annotated_with_fare(self):
+        trip = TripTomorrowFactory(status=Trip.ACTIVE, category=Trip.CAMA)
+        _, b, c, _ = [s.location for s in trip.trip_stops.select_related("location")]
+        PriceFactory(
+            route=trip.route, origin=b, destination=c, category=Trip.CAMA, amount=99
+        )
+
+        qs = Trip.future.search(
+            origin=b, destination=c, departure=trip.departure.date()
+        )
+
+        self.assertEqual(qs.get(id=trip.id).fare, 99)
+
     def test_search_results_are_annotated_with_availability_attribute(self):
         """
         Here we need to make sure the queryset is annotated with
@@ -557,3 +619,107 @@ class PastManagerTests(TestCase):
     def test_past_manager_kpis(self):
         self.assertIsInstance(Trip.past.kpis(), dict)
         # TODO: Write complete test for kpis once we have more development
+
+
+class LocationManagerTests(TestCase):
+    def setUp(self):
+        self.location = LocationFactory(name="Retiro", abbr="RET")
+        Location.objects.warm_cache()
+
+    def test_cached_lookups_do_not_hit_the_db(self):
+        with self.assertNumQueries(0):
+            by_abbr = Location.objects.get_cached(abbr="ret")
+            by_slug = Location.objects.get_cached(slug=self.location.slug)
+            by_pk = Location.objects.get_cached(pk=str(self.location.pk))
+            origin, destination = Location.objects.parse_query(
+                {"origin": "RET", "destination": "Ret"}
+            )
+
+        for location in (by_abbr, by_slug, by_pk, origin, destination):
+            self.assertEqual(location, self.location)
+
+    def test_cache_version_is_not_looked_up_on_every_lookup(self):
+        # The version costs a query with the db cache
+        caches = {**settings.CACHES, "search": settings.SEARCH_CACHE_BACKENDS["db"]}
+
+        with override_settings(CACHES=caches):
+            call_command("createcachetable", "search_cache")
+            Location.objects.invalidate_cache()
+            Location.objects.warm_cache()
+
+            with self.assertNumQueries(0):
+                for _ in range(10):
+                    Location.objects.get_cached(abbr="RET")
+
+    def test_cached_locations_are_copies(self):
+        location = Location.objects.get_cached(abbr="RET")
+        location.name = "Changed"
+
+        self.assertEqual(Location.objects.get_cached(abbr="RET").name, "Retiro")
+
+    def test_cache_is_invalidated_when_locations_change(self):
+        self.location.name = "Retiro Mitre"
+        self.location.save()
+        other = LocationFactory(abbr="MDQ")
+
+        self.assertEqual(Location.objects.get_cached(abbr="RET").name, "Retiro Mitre")
+        self.assertEqual(Location.objects.get_cached(abbr="MDQ"), other)
+
+        other.delete()
+        with self.assertRaises(Http404):
+            Location.objects.get_cached_or_404(abbr="MDQ")
+
+    def test_missing_locations_are_looked_up_in_the_db(self):
+        # e.g. created by another worker which didn't invalidate our cache
+        other = LocationFactory.build(abbr="MDQ")
+        Location.objects.bulk_create([other])
+
+        self.assertEqual(Location.objects.get_cached(abbr="mdq").abbr, "MDQ")
+
+        for lookup in ({"abbr": None}, {"abbr": "XXX"}, {"pk": "abc"}):
+            with self.assertRaises(Http404):
+                Location.objects.get_cached_or_404(**lookup)
+
+
+class SeatManagerBookTests(TestCase):
+    """Seats are checked for bookings and live holds once locked"""
+
+    def setUp(self):
+        self.trip = TripTomorrowFactory()
+        self.trip.create_seats(1, 2)
+
+        self.order_a = OrderFactory(passengers=PassengerFactory.create_batch(size=1))
+        self.order_b = OrderFactory(passengers=PassengerFactory.create_batch(size=1))
+
+    def get_booking(self, order, seat_numbers="1"):
+        return self.trip.get_seat_booking(
+            seat_numbers, list(order.passengers.all()), order=order
+        )
+
+    def test_seats_held_by_another_order_are_taken(self):
+        self.trip.hold_seats("1", order=self.order_a)
+
+        result = Seat.objects.book([self.get_booking(self.order_b)])
+
+        self.assertFalse(result.ok)
+        self.assertEqual(
+            [(c.seat_number, c.reason) for c in result.conflicts],
+            [(1, SeatConflict.TAKEN)],
+        )
+        self.assertIsNone(self.trip.seats.get(seat_number=1).passenger)
+
+    def test_expired_holds_of_another_order_are_free(self):
+        self.trip.hold_seats("1", order=self.order_a)
+        self.trip.seats.update(held_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertTrue(Seat.objects.book([self.get_booking(self.order_b)]).ok)
+
+    def test_booking_twice_is_harmless_but_others_are_rejected(self):
+        self.trip.hold_seats("1", order=self.order_a)
+
+        self.assertTrue(Seat.objects.book([self.get_booking(self.order_a)]).ok)
+        self.assertTrue(Seat.objects.book([self.get_booking(self.order_a)]).ok)
+        self.assertFalse(Seat.objects.book([self.get_booking(self.order_b)]).ok)
+
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.booked_count, 1)
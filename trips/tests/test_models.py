@@ -9,9 +9,10 @@ from django.test import TestCase
 from django.urls import reverse_lazy
 from django.utils import timezone
 
-from companies.factories import CompanyFactory
-from orders.factories import PassengerFactory
+from companies.factories import CompanyFactory, SeatChartFactory
+from orders.factories import OrderFactory, PassengerFactory
 from orders.models import Passenger
+from trips.booking import SeatConflict
 from trips.exceptions import SeatException, TripException
 from trips.factories import (
     LocationFactory,
@@ -24,7 +25,7 @@ from trips.factories import (
     TripPastFactory,
     TripTomorrowFactory,
 )
-from trips.models import Location, Price, Route, Seat, Stop, Trip
+from trips.models import Location, Price, Route, Seat, Stop, Trip, TripStop
 
 
 class LocationModelTests(TestCase):
@@ -337,6 +338,19 @@ class PriceModelTests(TestCase):
         self.assertEqual(price_semicama.amount, Decimal(1))
         self.assertEqual(price_cama.amount, Decimal(2))
 
+    def test_prefetch_fares_resolves_all_trips_in_one_query(self):
+        trips = TripFactory.create_batch(size=3, route=self.route)
+        for trip in trips:
+            trip.category = Price.SEMICAMA
+        trips[-1].category = Price.CAMA  # <-- no price set for this category
+
+        with self.assertNumQueries(1):
+            Price.objects.prefetch_fares(trips, self.origin, self.destination)
+
+            fares = [trip.get_price(self.origin, self.destination) for trip in trips]
+
+        self.assertEqual(fares, [self.price.amount, self.price.amount, 0])
+
 
 class StopModelTests(TestCase):
     """Test suite for the Stop Model"""
@@ -803,6 +817,33 @@ class TripModelTests(TestCase):
         self.assertEqual(seat_1.seat_status, Seat.AVAILABLE)
         self.assertIsNone(seat_1.passenger)
 
+    def test_trip_booking_taken_seats_returns_conflicts(self):
+        trip = TripTomorrowFactory()
+        trip.create_seats(1, 2)
+
+        first, second = PassengerFactory.create_batch(size=2)
+
+        result = trip.book_seats_with_passengers(
+            "1", Passenger.objects.filter(pk=first.pk)
+        )
+        self.assertTrue(result.ok)
+        self.assertEqual([seat.seat_number for seat in result], [1])
+
+        # Seat 1 is taken by another passenger and seat 3 doesn't exist
+        result = trip.book_seats_with_passengers("1, 2, 3", [second, first, second])
+
+        self.assertFalse(result.ok)
+        self.assertEqual(len(result), 0)
+        self.assertEqual(
+            [(c.seat_number, c.reason) for c in result.conflicts],
+            [(1, SeatConflict.TAKEN), (3, SeatConflict.MISSING)],
+        )
+
+        # Nothing was booked
+        self.assertEqual(trip.seats.get(seat_number=2).seat_status, Seat.AVAILABLE)
+        trip.refresh_from_db()
+        self.assertEqual(trip.booked_count, 1)
+
     def test_trip_create_occurrences_works_correctly(self):
         """Verify if bulk creation of future trips works as expected."""
 
@@ -854,6 +895,198 @@ class TripModelTests(TestCase):
         seat_numbers_in_db = trip.seats.values_list("seat_number", flat=True)
         self.assertEqual(seat_numbers, list(seat_numbers_in_db))
 
+    def test_trip_stops_are_synced_from_schedule_on_save(self):
+        trip_stops = self.trip.trip_stops.select_related("location")
+
+        # One trip stop for every stop in the schedule
+        self.assertEqual(trip_stops.count(), len(self.trip.schedule))
+
+        for trip_stop in trip_stops:
+            stop = self.trip.schedule[trip_stop.location.abbr]
+            self.assertEqual(trip_stop.order, stop["order"])
+
+        # Dropping a stop from the schedule drops it from the index too
+        first, *rest = self.trip.get_schedule()
+        del self.trip.schedule[first]
+        self.trip.save()
+
+        self.assertEqual(self.trip.trip_stops.count(), len(rest))
+        self.assertFalse(self.trip.trip_stops.filter(location__abbr=first).exists())
+
+    def test_trip_create_occurrences_also_creates_trip_stops(self):
+        now = timezone.now()
+        departures = [now + timedelta(days=days) for days in range(1, 4)]
+
+        trips = self.trip.create_occurrences(departures=departures)
+
+        self.assertEqual(
+            TripStop.objects.filter(trip__in=trips).count(),
+            len(trips) * len(self.stops),
+        )
+
+    def test_trip_create_occurrences_copies_seat_layout_in_batches(self):
+        layout = set(self.trip.seats.values_list("seat_number", "seat_type"))
+
+        now = timezone.now()
+        departures = (now + timedelta(days=days) for days in range(1, 8))
+        progress = []
+
+        # route stops, seat layout, savepoint + release and 3 inserts per batch
+        with self.assertNumQueries(2 + 2 + 3 * 3):
+            trips = self.trip.create_occurrences(
+                departures=departures, batch_size=3, progress=progress.append
+            )
+
+        self.assertEqual(len(trips), 7)
+        self.assertEqual(progress, [3, 6, 7])
+
+        for trip in Trip.objects.filter(pk__in=[trip.pk for trip in trips]):
+            seats = trip.seats.values_list("seat_number", "seat_type")
+            self.assertEqual(set(seats), layout)
+            self.assertEqual(trip.available_count, len(layout))
+            self.assertEqual(trip.schedule.keys(), self.trip.schedule.keys())
+
+    def test_trip_seat_counters_follow_seat_status_changes(self):
+        trip = TripTomorrowFactory()
+        trip.create_seats(1, 2, 3, 4)
+
+        def assert_counts(available, held, booked):
+            for obj in (trip, Trip.objects.get(id=trip.id)):
+                self.assertEqual(obj.available_count, available)
+                self.assertEqual(obj.held_count, held)
+                self.assertEqual(obj.booked_count, booked)
+
+        assert_counts(available=4, held=0, booked=0)
+
+        trip.hold_seats("1, 2")
+        assert_counts(available=2, held=2, booked=0)
+
+        trip.release_seats("2")
+        assert_counts(available=3, held=1, booked=0)
+
+        passenger = PassengerFactory()
+        trip.book_seats_with_passengers("1", Passenger.objects.filter(id=passenger.id))
+        assert_counts(available=3, held=0, booked=1)
+
+        trip.book_seat(trip.seats.get(seat_number=3))
+        assert_counts(available=2, held=0, booked=2)
+
+        trip.seats.filter(seat_number__in=[2, 3]).delete()
+        trip.refresh_from_db()
+        assert_counts(available=1, held=0, booked=1)
+
+        self.assertEqual(trip.seats_available, 1)
+
+    def test_trip_seats_are_held_and_booked_only_for_the_travelled_legs(self):
+        trip = TripTomorrowFactory()
+        trip.create_seats(1)
+        a, b, c, d = [s.location for s in trip.trip_stops.select_related("location")]
+
+        # A seat sold a -> b can still be sold b -> d but not a -> c
+        self.assertEqual(trip.hold_seats("1", a, b), 1)
+        self.assertEqual(trip.hold_seats("1", a, c), 0)
+        self.assertEqual(trip.hold_seats("1", b, d), 1)
+
+        seat = trip.seats.get()
+        self.assertEqual(seat.seat_status, Seat.ONHOLD)
+        self.assertFalse(seat.is_free(trip.get_legs(c, d)))
+
+        passenger = PassengerFactory()
+        passengers = Passenger.objects.filter(id=passenger.id)
+        trip.book_seats_with_passengers("1", passengers, a, b)
+        trip.release_seats("1", b, d)
+
+        seat.refresh_from_db()
+        self.assertEqual(seat.seat_status, Seat.BOOKED)
+        self.assertEqual(seat.passenger, passenger)
+        self.assertEqual(trip.get_booked_seats(a, b), [seat.get_row_col()])
+        self.assertEqual(trip.get_booked_seats(b, d), [])
+
+        # Counters still describe the whole trip
+        trip.refresh_from_db()
+        self.assertEqual(trip.available_count, 0)
+        self.assertEqual(trip.booked_count, 1)
+
+    def test_trip_seat_holds_expire(self):
+        trip = TripTomorrowFactory()
+        trip.create_seats(1)
+        order = OrderFactory()
+
+        self.assertEqual(trip.hold_seats("1", order=order), 1)
+
+        seat = trip.seats.get()
+        self.assertEqual(seat.hold_order, order)
+        self.assertGreater(seat.held_until, timezone.now())
+        self.assertFalse(seat.is_free())
+
+        # Expired holds are free before being released and can be held again
+        trip.seats.update(held_until=timezone.now() - timedelta(seconds=1))
+        seat.refresh_from_db()
+        self.assertTrue(seat.is_free())
+        self.assertEqual(trip.get_booked_seats(), [])
+
+        self.assertEqual(trip.hold_seats("1"), 1)
+        seat.refresh_from_db()
+        self.assertFalse(seat.hold_expired)
+        self.assertIsNone(seat.hold_order)
+
+        # Releasing the seat drops the lease
+        trip.release_seats("1")
+        seat.refresh_from_db()
+        self.assertEqual(seat.seat_status, Seat.AVAILABLE)
+        self.assertIsNone(seat.held_until)
+
+    def test_releasing_an_expired_hold_keeps_the_hold_of_another_order(self):
+        trip = TripTomorrowFactory()
+        trip.create_seats(1)
+        first, second = OrderFactory(), OrderFactory()
+
+        trip.hold_seats("1", order=first)
+        trip.seats.update(held_until=timezone.now() - timedelta(seconds=1))
+        trip.hold_seats("1", order=second)
+
+        # e.g. the session of the first order expired
+        self.assertEqual(trip.release_seats("1", order=first), 0)
+
+        seat = trip.seats.get()
+        self.assertEqual(seat.seat_status, Seat.ONHOLD)
+        self.assertTrue(seat.is_held_by(second))
+
+        self.assertEqual(trip.release_seats("1", order=second), 1)
+
+    def test_trip_try_hold_seats_reports_conflicts_and_falls_back(self):
+        trip = TripTomorrowFactory()
+        trip.create_seats(*range(1, 9))
+        trip.hold_seats("4")
+
+        held = trip.try_hold_seats("3, 4, 9")
+
+        self.assertFalse(held.ok)
+        self.assertEqual(held.seat_numbers, [3])
+        self.assertEqual(
+            [(c.seat_number, c.reason) for c in held.conflicts],
+            [(4, SeatConflict.TAKEN), (9, SeatConflict.MISSING)],
+        )
+
+        # The nearest free seats are held instead of the taken ones
+        held = trip.try_hold_seats("4, 5", fallback=True)
+
+        self.assertTrue(held.ok)
+        self.assertEqual(held.seat_numbers, [2, 5])
+        self.assertEqual([seat.seat_number for seat in held.substitutes], [2])
+
+        trip.refresh_from_db()
+        self.assertEqual(trip.held_count, 4)
+        self.assertEqual(trip.available_count, 4)
+
+    def test_trip_get_legs_raises_exception_for_wrong_direction(self):
+        trip = TripTomorrowFactory()
+        a, b, *_ = [s.location for s in trip.trip_stops.select_related("location")]
+
+        self.assertEqual(trip.get_legs(), Seat.ALL_LEGS)
+        with self.assertRaises(TripException):
+            trip.get_legs(b, a)
+
     def test_trip_goes_from_method_works_correctly(self):
         # Arrange
         s1, s2, s3, s4 = self.stops
@@ -908,13 +1141,74 @@ class TripModelTests(TestCase):
             self.assertIn("departure", x)
 
     def test_trip_get_duration_method_works_correctly(self):
-        self.skipTest("Veer please implement me")
+        trip = Trip.objects.get(id=self.trip.id)
+        a, b, c, d = [s.name for s in self.stops]
+        s1, s2, s3, s4 = self.stops
+
+        # JSON keeps timestamps only up to milliseconds
+        ms = timedelta(milliseconds=1)
+
+        self.assertAlmostEqual(
+            trip.get_duration(a, d), s4.arrival - s1.departure, delta=ms
+        )
+        self.assertAlmostEqual(
+            trip.get_duration(b, c), s3.arrival - s2.departure, delta=ms
+        )
+
+        with self.assertRaises(TripException):
+            trip.get_duration(d, a)
 
     def test_trip_get_departure_time_method(self):
-        raise self.skipTest("Veer please implement me")
+        # Timestamps are ISO strings in the JSON once loaded from DB
+        trip = Trip.objects.get(id=self.trip.id)
+        a, b, *_ = [s.name for s in self.stops]
+        s1, s2, *_ = self.stops
+
+        departure_a, departure_b = trip.get_departure(a), trip.get_departure(b)
+
+        self.assertIsInstance(departure_a, datetime)
+        self.assertAlmostEqual(
+            departure_b - departure_a,
+            s2.departure - s1.departure,
+            delta=timedelta(milliseconds=1),
+        )
+
+        with self.assertRaises(TripException):
+            trip.get_departure(LocationFactory())
 
     def test_trip_get_arrival_time_method(self):
-        raise self.skipTest("Veer please implement me")
+        trip = Trip.objects.get(id=self.trip.id)
+        *_, c, d = [s.name for s in self.stops]
+        *_, s3, s4 = self.stops
+
+        arrival_c, arrival_d = trip.get_arrival(c), trip.get_arrival(d)
+
+        self.assertIsInstance(arrival_d, datetime)
+        self.assertAlmostEqual(
+            arrival_d - arrival_c,
+            s4.arrival - s3.arrival,
+            delta=timedelta(milliseconds=1),
+        )
+
+        with self.assertRaises(TripException):
+            trip.get_arrival(LocationFactory())
+
+    def test_trip_schedule_is_parsed_once_per_instance(self):
+        trip = Trip.objects.get(id=self.trip.id)
+        schedule = trip.parsed_schedule
+
+        self.assertIs(trip.parsed_schedule, schedule)
+        self.assertIs(trip.get_schedule(), schedule.ordered)
+        self.assertEqual([s.code for s in schedule], list(trip.get_schedule()))
+
+        # A new schedule is parsed again
+        first, *rest = trip.get_schedule()
+        trip.schedule = {code: trip.schedule[code] for code in rest}
+
+        self.assertIsNot(trip.parsed_schedule, schedule)
+        self.assertFalse(
+            trip.goes_from(Location.objects.get(abbr=first), self.destination)
+        )
 
 
 class SeatModelTests(TestCase):
@@ -997,3 +1291,120 @@ class SeatModelTests(TestCase):
 
         self.assertEqual(s_2.seat_number, 5)
         self.assertEqual(s_2.trip, trip_2)
+
+
+class LazySeatsTests(TestCase):
+    """Trips laid out from a seat chart only store the seats once taken"""
+
+    def setUp(self):
+        self.trip = TripTomorrowFactory(status=Trip.ACTIVE)
+        self.seatchart = SeatChartFactory(
+            company=self.trip.company,
+            json={"lower": {"enabledSeats": [1, 2, 3]}, "upper": {"enabledSeats": [4]}},
+        )
+        self.trip.layout_seats(self.seatchart, lazy=True)
+
+        stops = self.trip.trip_stops.select_related("location")
+        self.a, self.b, self.c, self.d = [s.location for s in stops]
+
+    def assertCounts(self, trip, available, held, booked):
+        trip.refresh_from_db()
+        self.assertEqual(
+            (trip.available_count, trip.held_count, trip.booked_count),
+            (available, held, booked),
+        )
+
+    def test_layout_stores_no_seats(self):
+        self.assertTrue(self.trip.has_lazy_seats)
+        self.assertEqual(self.trip.seat_numbers, [1, 2, 3, 4])
+        self.assertEqual(self.trip.capacity, 4)
+        self.assertFalse(self.trip.seats.exists())
+        self.assertCounts(self.trip, 4, 0, 0)
+
+    def test_eager_layout_creates_all_the_seats(self):
+        trip = TripTomorrowFactory()
+        trip.layout_seats(self.seatchart, lazy=False)
+
+        self.assertFalse(trip.has_lazy_seats)
+        self.assertEqual(trip.seats.count(), 4)
+        self.assertCounts(trip, 4, 0, 0)
+
+    def test_holding_stores_only_the_held_seats(self):
+        held = self.trip.try_hold_seats("2,3", self.a, self.c)
+
+        self.assertTrue(held.ok)
+        self.assertEqual(
+            list(self.trip.seats.values_list("seat_number", flat=True)), [2, 3]
+        )
+        self.assertCounts(self.trip, 2, 2, 0)
+
+        # Held seats are still free on the legs after them
+        self.assertEqual(self.trip.get_booked_seats(self.c, self.d), [])
+        self.assertEqual(len(self.trip.get_booked_seats()), 2)
+
+    def test_seats_outside_the_seatchart_are_missing(self):
+        held = self.trip.try_hold_seats("4,9")
+
+        self.assertEqual(held.seat_numbers, [4])
+        self.assertEqual(held.conflicts[0].reason, SeatConflict.MISSING)
+        self.assertFalse(self.trip.seats.filter(seat_number=9).exists())
+
+    def test_fallback_holds_the_nearest_free_seat(self):
+        self.trip.hold_seats("2")
+
+        held = self.trip.try_hold_seats("2", fallback=True)
+
+        self.assertEqual(held.seat_numbers, [1])
+        self.assertCounts(self.trip, 2, 2, 0)
+
+    def test_booking_stores_the_seats(self):
+        passengers = PassengerFactory.create_batch(size=2)
+
+        result = self.trip.book_seats_with_passengers("1,4", passengers)
+
+        self.assertTrue(result.ok)
+        self.assertEqual(
+            self.trip.seats.get(seat_number=4).passenger_id, passengers[1].pk
+        )
+        self.assertCounts(self.trip, 2, 0, 2)
+
+    def test_releasing_and_deleting_seats_keeps_them_available(self):
+        self.trip.hold_seats("1,2")
+        self.trip.release_seats("1")
+        self.assertCounts(self.trip, 3, 1, 0)
+
+        self.trip.seats.get(seat_number=2).delete()
+        self.assertCounts(self.trip, 4, 0, 0)
+
+    def test_search_counts_the_seats_never_stored_as_free(self):
+        self.trip.hold_seats("1", self.a, self.b)
+        self.trip.hold_seats("2", self.b, self.d)
+
+        def availability(origin, destination):
+            qs = Trip.future.search(origin, destination, self.trip.departure.date())
+            return qs.get().availability
+
+        self.assertEqual(availability(self.a, self.d), 2)
+        self.assertEqual(availability(self.a, self.b), 3)
+        self.assertEqual(availability(self.c, self.d), 3)
+
+    def test_get_seats_lists_all_the_seats(self):
+        self.trip.hold_seats("3")
+
+        seats = self.trip.get_seats()
+
+        self.assertEqual([seat.seat_number for seat in seats], [1, 2, 3, 4])
+        self.assertEqual(
+            [seat.seat_status for seat in seats],
+            [Seat.AVAILABLE, Seat.AVAILABLE, Seat.ONHOLD, Seat.AVAILABLE],
+        )
+
+    def test_occurrences_get_the_same_layout(self):
+        departure = self.trip.departure + timedelta(days=1)
+
+        (trip,) = self.trip.create_occurrences([departure])
+
+        self.assertEqual(trip.seatchart, self.seatchart)
+        self.assertEqual(trip.seat_numbers, [1, 2, 3, 4])
+        self.assertFalse(trip.seats.exists())
+        self.assertCounts(trip, 4, 0, 0)
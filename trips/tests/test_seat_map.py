@@ -0,0 +1,89 @@
+import copy
+
+from django.test import TestCase
+
+from companies.factories import SeatChartFactory
+from companies.samples import SEMICAMA_PROMO
+from trips import seat_map
+from trips.factories import SeatFactory, TripTomorrowFactory
+from trips.models import Seat
+from trips.seat_map import DEFAULT_LAYOUT, SeatLayout, SeatPosition
+
+
+class SeatLayoutTests(TestCase):
+    def test_default_layout_has_4_seats_per_row(self):
+        self.assertEqual(len(DEFAULT_LAYOUT), 48)
+        self.assertEqual(DEFAULT_LAYOUT.get(1), SeatPosition(0, 0))
+        self.assertEqual(DEFAULT_LAYOUT.get("6"), SeatPosition(1, 1))
+        self.assertEqual(DEFAULT_LAYOUT.get(48), SeatPosition(11, 3, "lower"))
+        self.assertIsNone(DEFAULT_LAYOUT.get(49))
+        self.assertNotIn(0, DEFAULT_LAYOUT)
+
+    def test_compile_places_seats_on_both_decks(self):
+        layout = SeatLayout.compile(SEMICAMA_PROMO)
+
+        self.assertEqual(layout.get(60), SeatPosition(3, 0, "lower"))
+        self.assertEqual(layout.get(77), SeatPosition(6, 3, "lower"))
+        self.assertEqual(layout.get(1), SeatPosition(0, 0, "upper"))
+        self.assertEqual(layout.get(52), SeatPosition(12, 3, "upper"))
+        self.assertIsNone(layout.get(53))
+
+    def test_compile_prefers_the_deck_a_seat_is_enabled_on(self):
+        json = {
+            "lower": {"labels": {"00": "1", "01": "2"}, "enabledSeats": [2]},
+            "upper": {"labels": {"10": "1", "11": "2"}, "enabledSeats": [1]},
+        }
+
+        layout = SeatLayout.compile(json)
+
+        self.assertEqual(layout.get(1), SeatPosition(1, 0, "upper"))
+        self.assertEqual(layout.get(2), SeatPosition(0, 1, "lower"))
+
+    def test_layouts_are_compiled_once_until_the_seatchart_changes(self):
+        seatchart = SeatChartFactory(json=SEMICAMA_PROMO)
+
+        layout = seat_map.get_layout(seatchart.pk)
+        with self.assertNumQueries(0):
+            self.assertIs(seat_map.get_layout(seatchart.pk), layout)
+
+        seatchart.json = {"lower": {"labels": {"00": "60"}}}
+        seatchart.save()
+
+        self.assertEqual(seat_map.get_layout(seatchart.pk).get(60), SeatPosition(0, 0))
+
+    def test_seatcharts_without_labels_use_the_default_layout(self):
+        seatchart = SeatChartFactory(json={"lower": {"enabledSeats": [1, 2]}})
+        self.assertIs(seat_map.get_layout(seatchart.pk), DEFAULT_LAYOUT)
+
+    def test_seats_are_placed_by_row_and_column_on_single_deck_layouts(self):
+        layout = SeatLayout.grid(rows=2, columns=2)
+        self.assertEqual(layout.locate([4, 9, 1]), [(1, 1), (0, 0)])
+
+        layout = SeatLayout({1: SeatPosition(0, 0, "upper")})
+        self.assertEqual(layout.locate([1]), [SeatPosition(0, 0, "upper")])
+
+
+class BookedSeatsTests(TestCase):
+    def test_booked_seats_are_placed_on_the_trip_seatchart(self):
+        json = copy.deepcopy(SEMICAMA_PROMO)
+        json["lower"]["enabledSeats"] = [60]
+
+        trip = TripTomorrowFactory()
+        trip.layout_seats(SeatChartFactory(json=json), lazy=False)
+        trip.hold_seats("37,60")
+
+        seat_map.get_layout(trip.seatchart_id)
+
+        with self.assertNumQueries(1):
+            booked = trip.get_booked_seats()
+
+        self.assertEqual(
+            booked, [SeatPosition(9, 0, "upper"), SeatPosition(3, 0, "lower")]
+        )
+
+    def test_seats_off_the_layout_are_left_out(self):
+        trip = TripTomorrowFactory()
+        SeatFactory(trip=trip, seat_number=50, seat_status=Seat.BOOKED)
+        SeatFactory(trip=trip, seat_number=5, seat_status=Seat.BOOKED)
+
+        self.assertEqual(trip.get_booked_seats(), [(1, 0)])
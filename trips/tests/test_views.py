@@ -1,3 +1,4 @@
+import uuid
 from datetime import timedelta
 from http import HTTPStatus
 
@@ -8,6 +9,7 @@ from django.test import TestCase
 from django.urls import resolve, reverse_lazy
 from django.utils import timezone
 
+from asgiref.sync import sync_to_async
 from dateutil import rrule
 
 from companies.factories import CompanyFactory, SeatChartFactory
@@ -118,6 +120,139 @@ class LocationDetailViewTests(TestCase):
         self.assertNotContains(response, "Hi I should not be on this page")
 
 
+class LocationAutocompleteViewTests(TestCase):
+    """
+    Test suite for the location autocomplete used by the search form.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.location = LocationFactory(name="Córdoba", abbr="COR")
+        cls.url = reverse_lazy("trips:location-autocomplete")
+
+    def test_autocomplete_returns_matching_locations(self):
+        response = self.client.get(self.url, {"q": "cordo"})
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()[0]["value"], self.location.abbr)
+        self.assertIn("max-age=300", response["Cache-Control"])
+
+    def test_accepts_only_get_request(self):
+        response = self.client.post(self.url, {"q": "cordo"})
+
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+
+class TripSeatsViewTests(TestCase):
+    """
+    Test suite for the seats taken on a trip polled by live seat maps.
+    """
+
+    def setUp(self):
+        self.trip = TripTomorrowFactory()
+        self.trip.create_seats(1, 2, 3)
+        self.url = self.trip.get_seats_url()
+
+        stops = self.trip.trip_stops.select_related("location")
+        self.a, self.b, self.c, self.d = [s.location for s in stops]
+
+    def test_returns_the_taken_seats_with_validators(self):
+        self.trip.hold_seats("2")
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()["booked_seats"], [[0, 1]])
+        self.assertTrue(
+            response["ETag"].startswith(
+                f'"{self.trip.pk}:{self.trip.inventory_version}:'
+            )
+        )
+        self.assertIn("Last-Modified", response)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_unchanged_seats_are_not_modified_without_reading_seats(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with self.assertNumQueries(1):  # <-- only the inventory version
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        self.trip.hold_seats("1")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_lapsed_holds_are_modified_without_inventory_changes(self):
+        self.trip.hold_seats("1")
+        Trip.objects.filter(pk=self.trip.pk).update(
+            updated_on=timezone.now() - timedelta(hours=1)
+        )
+
+        response = self.client.get(self.url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertEqual(len(response.json()["booked_seats"]), 1)
+
+        # The hold lapses, the seat is free with the same inventory version
+        Seat.objects.filter(trip=self.trip).update(
+            held_until=timezone.now() - timedelta(seconds=1)
+        )
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()["booked_seats"], [])
+        self.assertEqual(response.json()["version"], self.trip.inventory_version)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_seats_are_taken_only_on_the_legs_travelled(self):
+        self.trip.hold_seats("1", self.a, self.b)
+
+        response = self.client.get(self.trip.get_seats_url(self.c, self.d))
+        self.assertEqual(response.json()["booked_seats"], [])
+
+        response = self.client.get(self.trip.get_seats_url(self.a, self.c))
+        self.assertEqual(len(response.json()["booked_seats"]), 1)
+
+    def test_invalid_legs_are_a_bad_request(self):
+        response = self.client.get(self.trip.get_seats_url(self.d, self.a))
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_accepts_only_get_request(self):
+        response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+
+class TripEventsViewTests(TestCase):
+    """
+    Test suite for the stream of changes to a trip used by open seat maps.
+    """
+
+    async def test_streams_the_trip_events(self):
+        trip = await sync_to_async(TripTomorrowFactory)()
+
+        response = await self.async_client.get(trip.get_events_url())
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["X-Accel-Buffering"], "no")
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        await stream.aclose()
+
+    async def test_unknown_trips_are_not_found(self):
+        response = await self.async_client.get(
+            reverse_lazy("trips:trip-events", args=[uuid.uuid4()])
+        )
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
 # Public Views
 class TripListViewTests(TestCase):
     """
@@ -1,6 +1,14 @@
 from django.urls import path
 
-from .views import AdminRouteDetailView, TripDetailView, TripListView, TripSearchView
+from .views import (
+    AdminRouteDetailView,
+    TripDetailView,
+    TripListView,
+    TripSearchView,
+    location_autocomplete,
+    trip_events,
+    trip_seats,
+)
 
 app_name = "trips"
 
@@ -9,7 +17,10 @@ urlpatterns = [
     # Public Endpoints
     path("", TripListView.as_view(), name="trip-list"),
     path("<uuid:id>/", TripDetailView.as_view(), name="trip-detail"),
+    path("<uuid:id>/seats/", trip_seats, name="trip-seats"),
+    path("<uuid:id>/events/", trip_events, name="trip-events"),
     path("search/", TripSearchView.as_view(), name="trip-search"),
+    path("autocomplete/", location_autocomplete, name="location-autocomplete"),
     # Custom admin urls
     path(
         "admin/routes/<uuid:route_id>/",
@@ -1,4 +1,5 @@
 import logging
+from calendar import timegm
 from datetime import datetime, timedelta
 from typing import Any, Dict
 
@@ -6,11 +7,17 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.messages.views import SuccessMessageMixin
-from django.db.models import F, QuerySet
+from django.db.models import F, Max, Min, Q, QuerySet
+from django.db.models.functions import Now
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET
 from django.views.generic import (
     CreateView,
     DetailView,
@@ -20,11 +27,14 @@ from django.views.generic import (
     View,
 )
 
-from django_weasyprint import WeasyTemplateResponseMixin
-
+from base.rendering import render_pdf
 from companies.mixins import OwnerMixin
 from companies.models import SeatChart
 
+from . import autocomplete
+from . import cache as search_cache
+from . import events
+from .exceptions import TripException
 from .forms import RecurrenceForm, TripCreateForm, TripSearchForm
 from .models import Location, Route, Trip
 
@@ -101,9 +111,9 @@ class TripListView(ListView):
 
         return super().get(request, *args, **kwargs)
 
-    def get_queryset(self) -> QuerySet[Any]:
+    def get_queryset(self) -> list[Trip]:
         q = self.request.GET
-        qs = Trip.future.search(
+        qs = search_cache.search(
             origin=self.origin,
             destination=self.destination,
             departure=self.departure,
@@ -114,6 +124,87 @@ class TripListView(ListView):
         return qs
 
 
+@require_GET
+@cache_control(public=True, max_age=300)
+def location_autocomplete(request):
+    """
+    Suggest locations for the search form as `[{label, value}]` where value is the
+    location's abbr code. Use `?q=<text>&limit=<n>`.
+    """
+
+    q = request.GET.get("q", "")[:50]
+
+    try:
+        limit = min(max(int(request.GET.get("limit", 10)), 1), 20)
+    except ValueError:
+        limit = 10
+
+    return JsonResponse(autocomplete.search(q, limit=limit), safe=False)
+
+
+@require_GET
+@cache_control(private=True, no_cache=True)
+def trip_seats(request, id):
+    """
+    Seats taken on a trip for live seat maps as `{version, booked_seats}`. Use
+    `?origin=<abbr>&destination=<abbr>` for the seats taken on those legs only.
+
+    Meant to be polled with If-None-Match (or If-Modified-Since): as long as the
+    inventory version of the trip hasn't moved and no hold has lapsed since the
+    answer is a 304 and no seat is read at all.
+    """
+
+    fields = ("id", "schedule", "seatchart", "inventory_version", "updated_on")
+    qs = Trip.objects.only(*fields).annotate(
+        # Expired holds are free seats without any change to the inventory
+        next_lapse=Min("seats__held_until", filter=Q(seats__held_until__gt=Now())),
+        last_lapse=Max("seats__held_until", filter=Q(seats__held_until__lte=Now())),
+    )
+    trip = get_object_or_404(qs, pk=id)
+
+    etag = f"{trip.pk}:{trip.inventory_version}"
+    if trip.next_lapse:
+        etag += f":{timegm(trip.next_lapse.utctimetuple())}"
+    etag = quote_etag(etag)
+
+    modified = max(filter(None, [trip.updated_on, trip.last_lapse]))
+    last_modified = timegm(modified.utctimetuple())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    if response is None:
+        origin = destination = None
+        if "origin" in request.GET or "destination" in request.GET:
+            origin, destination = Location.objects.parse_query(request.GET)
+
+        try:
+            booked_seats = trip.get_booked_seats(origin, destination)
+        except TripException as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        response = JsonResponse(
+            {"version": trip.inventory_version, "booked_seats": booked_seats}
+        )
+
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+
+    return response
+
+
+@require_GET
+async def trip_events(request, id):
+    """
+    Stream of the changes to a trip (see `trips.events`) so open seat maps know
+    when to fetch the taken seats again instead of polling.
+    """
+
+    if not await Trip.objects.filter(pk=id).aexists():
+        raise Http404("No trip found matching the query")
+
+    return events.EventStreamResponse(events.stream(events.trip_topic(id)))
+
+
 class TripDetailView(DetailView):
     model = Trip
     context_object_name = "trip"
@@ -240,9 +331,7 @@ class CompanyTripDetailView(CRUDMixins, DetailView):
         context = super().get_context_data(**kwargs)
         # self.object refers to the trip of this view
         # add seats with related passengers to context
-        context["seats"] = self.object.seats.order_by("seat_number").select_related(
-            "passenger"
-        )
+        context["seats"] = self.object.get_seats()
 
         return context
 
@@ -281,20 +370,11 @@ class TripCreateView(CRUDMixins, CreateView):
         title = self.request.POST.get("seatchart")
         seatchart = get_object_or_404(SeatChart, title=title, company=self.company)
 
-        # Find which seat numbers need to be created for both floors
-        lower = seatchart.json.get("lower", {}).get("enabledSeats", [])
-        upper = seatchart.json.get("upper", {}).get("enabledSeats", [])
-
-        logger.info("lower seats: %s" % lower)
-        logger.info("upper seats: %s" % upper)
-
-        seat_numbers = lower + upper
-
-        if not seat_numbers:
+        if not seatchart.get_seat_numbers():
             messages.warning(self.request, "SeatChart is invalid!")
 
-        # Finally create the seats
-        seats = trip.create_seats(*seat_numbers)
+        # Finally create the seats (or only lay them out, see LAZY_SEATS)
+        seats = trip.layout_seats(seatchart)
         logger.info("created seats: %s" % seats)
 
         return seats
@@ -315,7 +395,7 @@ class TripUpdateView(CRUDMixins, UpdateView):
         return self.object.get_passenger_list_url()  # type:ignore
 
 
-class TripPassengerPdfView(WeasyTemplateResponseMixin, CompanyTripDetailView):
+class TripPassengerPdfView(CompanyTripDetailView):
     """
     Allows company staff to download the passenger list for a departing trip.
 
@@ -329,10 +409,19 @@ class TripPassengerPdfView(WeasyTemplateResponseMixin, CompanyTripDetailView):
     pdf_filename = "passengers.pdf"
 
     def get_pdf_filename(self):
-        context = self.get_context_data()
-        trip = context["trip"]
+        trip = self.object
         return f"{trip.name}-{trip.departure.strftime('%c')}.pdf"
 
+    def render_to_response(self, context, **response_kwargs):
+        pdf = render_pdf(self.template_name, context, request=self.request)
+
+        response = HttpResponse(pdf, content_type="application/pdf")
+        response["Content-Disposition"] = (
+            f'attachment;filename="{self.get_pdf_filename()}"'
+        )
+
+        return response
+
 
 class LocationListView(ListView):
     model = Location
@@ -345,6 +434,9 @@ class LocationDetailView(DetailView):
     context_object_name = "location"
     template_name = "trips/location_detail.html"
 
+    def get_object(self, queryset=None):
+        return Location.objects.get_cached_or_404(slug=self.kwargs["slug"])
+
 
 class RecurrenceView(CRUDMixins, FormView):
     form_class = RecurrenceForm